@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+'''
+Import time benchmark
+=====================
+Measures the time it takes to import psforms, declare a form and validate
+some data in a fresh interpreter. Fails if doing so imports Qt, the
+controls and widgets modules or the compiled resources.
+
+usage::
+
+    python bench_import.py [--runs 10] [--max-ms 100]
+'''
+
+import argparse
+import json
+import subprocess
+import sys
+
+
+SNIPPET = '''
+import json, sys, time
+start = time.time()
+import psforms
+from psforms import Form, StringField, IntField, required
+
+
+class AssetForm(Form):
+    name = StringField('Name', validators=(required,))
+    frames = IntField('Frames', range=(1, 1000))
+
+
+required('asset')
+AssetForm.defaults()
+elapsed = time.time() - start
+loaded = [m for m in ('Qt', 'psforms.controls', 'psforms.widgets',
+                      'psforms.resource') if m in sys.modules]
+print(json.dumps({'elapsed': elapsed, 'loaded': loaded}))
+'''
+
+
+def run_once():
+    output = subprocess.check_output([sys.executable, '-c', SNIPPET])
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    results = [run_once() for i in range(args.runs)]
+    times = sorted(r['elapsed'] * 1000 for r in results)
+    loaded = sorted(set(m for r in results for m in r['loaded']))
+
+    print('import psforms: min {:.1f}ms, median {:.1f}ms, max {:.1f}ms'.format(
+        times[0], times[len(times) // 2], times[-1]))
+
+    failed = False
+    if loaded:
+        print('FAIL: imported ' + ', '.join(loaded))
+        failed = True
+    if args.max_ms is not None and times[len(times) // 2] > args.max_ms:
+        print('FAIL: median exceeds {}ms'.format(args.max_ms))
+        failed = True
+    sys.exit(int(failed))
+
+
+if __name__ == '__main__':
+    main()
@@ -9,10 +9,64 @@ __license__ = 'MIT'
 __description__ = 'Hassle free PySide forms.'
 
 import os
+import sys
+import types
+from importlib import import_module
 
-from . import (controls, exc, fields, resource, widgets)
-from .form import Form, FormMetaData
+from . import exc, fields
+from .form import Form, FormMetaData, generate_form
+from .model import FormModel
+from .fields import (
+    FieldType, create_fieldtype, ListField, ModelListField, BoolField,
+    StringField, IntField, FloatField, Int2Field, Float2Field, IntOptionField,
+    StringOptionField, ButtonOptionField, IntButtonOptionField, FileField,
+    FolderField, SaveFileField, ImageField, TextField
+)
 from .validators import *
+from . import validators as _validators
 
-with open(os.path.join(os.path.dirname(__file__), 'style.css')) as f:
-    stylesheet = f.read()
+# Modules depending on QtWidgets and the stylesheet are loaded on first
+# access, so declaring forms and validating data never imports Qt.
+_lazy_modules = ('controls', 'widgets', 'resource', 'virtual')
+
+# Star imports resolve lazy names through __getattr__ only when listed here
+__all__ = [
+    'exc', 'fields', 'Form', 'FormMetaData', 'generate_form', 'FormModel',
+    'FieldType', 'create_fieldtype', 'ListField', 'ModelListField',
+    'BoolField', 'StringField', 'IntField', 'FloatField', 'Int2Field',
+    'Float2Field', 'IntOptionField', 'StringOptionField', 'ButtonOptionField',
+    'IntButtonOptionField', 'FileField', 'FolderField', 'SaveFileField',
+    'ImageField', 'TextField', 'stylesheet',
+] + list(_lazy_modules) + _validators.__all__
+
+
+def _read_stylesheet():
+    with open(os.path.join(os.path.dirname(__file__), 'style.css')) as f:
+        return f.read()
+
+
+def __getattr__(attr):
+    if attr in _lazy_modules:
+        return import_module('.' + attr, __name__)
+    if attr == 'stylesheet':
+        value = _read_stylesheet()
+        setattr(sys.modules[__name__], 'stylesheet', value)
+        return value
+    raise AttributeError(
+        'module {} has no attribute {}'.format(__name__, attr)
+    )
+
+
+if sys.version_info < (3, 7):
+    # Module level __getattr__ is unsupported, replace this module by an
+    # instance of a module subclass forwarding to it. The original module is
+    # kept alive, Python 2 clears the globals of collected modules.
+    class _LazyModule(types.ModuleType):
+
+        def __getattr__(self, attr):
+            return __getattr__(attr)
+
+    _module = _LazyModule(__name__, __doc__)
+    _module.__dict__.update(sys.modules[__name__].__dict__)
+    _module._original = sys.modules[__name__]
+    sys.modules[__name__] = _module
@@ -0,0 +1,369 @@
+'''
+psforms.batch
+=============
+Validate many records at once, one column at a time.
+
+Records are passed in columnar form, a dict mapping field names to
+sequences or NumPy arrays of equal length. Fields of subforms are named by
+dotted paths like ``"subform.field"``. Builtin validators (required,
+min_length, max_length, regex and email) and the ranges of IntField and
+FloatField run as column operations. Other validators run once per distinct
+value in the column.
+
+NumPy is used when it is installed, otherwise columns are processed as
+python lists with the same results.
+'''
+
+import operator
+from array import array
+from .validators import range_error, run_validators
+
+_unset = object()
+_numpy = _unset
+
+
+def get_numpy():
+    '''Returns the numpy module, or None if it is not installed. Imported on
+    first use, keeping ``import psforms.batch`` cheap.'''
+
+    global _numpy
+    if _numpy is _unset:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def form_columns(form, path=''):
+    '''Returns (column name, field) tuples of all fields of form and its
+    subforms in declaration order.'''
+
+    columns = []
+    for name, field in form.fields():
+        columns.append((path + name, field))
+    for name, subform in form.forms():
+        columns.extend(form_columns(subform, path + name + '.'))
+    return columns
+
+
+def field_checks(field):
+    '''Returns the checks of field in the order they run, as (kind, arg,
+    message) tuples. Validators without a spec become ('scalar', validator,
+    None) checks returning their own messages.'''
+
+    checks = []
+    for validator in field.get_validators():
+        spec = getattr(validator, 'spec', None)
+        if spec is None:
+            checks.append(('scalar', validator, None))
+        else:
+            checks.append(spec)
+    return checks
+
+
+def _distinct(values, fn):
+    '''Apply fn once per distinct hashable value.'''
+
+    results = {}
+    out = []
+    for value in values:
+        try:
+            result = results[value]
+        except KeyError:
+            result = results[value] = fn(value)
+        except TypeError:  # Unhashable
+            result = fn(value)
+        out.append(result)
+    return out
+
+
+class _ListColumn(object):
+    '''Column operations on python lists.'''
+
+    def __init__(self, values):
+        self.values = list(values)
+
+    def take(self, rows):
+        values = self.values
+        return [values[row] for row in rows]
+
+    def lengths(self, rows):
+        return [len(value) for value in self.take(rows)]
+
+    def check(self, kind, arg, msg, rows):
+        '''Returns the error message of each row in rows or None.'''
+
+        values = self.take(rows)
+        if kind == 'required':
+            return [None if value else msg for value in values]
+        if kind == 'min_length':
+            return [None if n >= arg else msg for n in self.lengths(rows)]
+        if kind == 'max_length':
+            return [None if n <= arg else msg for n in self.lengths(rows)]
+        if kind == 'regex':
+            search = arg.search
+            return _distinct(values, lambda v: None if search(v) else msg)
+        if kind == 'range':
+            low, high = arg
+            return [range_error(v, low, high, msg) for v in values]
+        validators = (arg,)
+        return _distinct(values, lambda v: run_validators(validators, v))
+
+
+def _object_array(numpy, values):
+    '''Returns a one dimensional object array of values, keeping sequences
+    like the tuples of Int2Fields as single items.'''
+
+    array = numpy.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+
+class _ArrayColumn(object):
+    '''Column operations on NumPy arrays. Columns of sequences, and lists
+    mixing types numpy would convert to a common one, are kept as object
+    arrays holding the original values.'''
+
+    def __init__(self, values, numpy):
+        self.np = numpy
+        if isinstance(values, numpy.ndarray):
+            array = values
+        elif len(set(type(value) for value in values)) == 1:
+            try:
+                array = numpy.asarray(values)
+            except ValueError:  # Sequences of different lengths
+                array = None
+        else:
+            array = None
+        if (array is None or array.ndim != 1 or
+                array.dtype.kind not in 'biufUS'):
+            array = _object_array(numpy, values)
+        self.values = array
+
+    def take(self, rows):
+        return self.values[rows]
+
+    def lengths(self, rows):
+        np = self.np
+        values = self.take(rows)
+        if values.dtype.kind in 'US':
+            return np.char.str_len(values)
+        return np.fromiter((len(v) for v in values), np.intp, len(values))
+
+    def check(self, kind, arg, msg, rows):
+        '''Returns a boolean array, True where a row in rows fails, or a list
+        of error messages for scalar validators.'''
+
+        np = self.np
+        values = self.take(rows)
+        if kind == 'required':
+            if values.dtype.kind in 'US':
+                return np.char.str_len(values) == 0
+            if values.dtype.kind in 'biuf':
+                return values == 0
+            not_ = np.frompyfunc(operator.not_, 1, 1)
+            return not_(values).astype(bool)
+        if kind == 'min_length':
+            return self.lengths(rows) < arg
+        if kind == 'max_length':
+            return self.lengths(rows) > arg
+        if kind == 'range':
+            return self._check_range(values, arg, msg)
+
+        if kind == 'regex':
+            search = arg.search
+
+            def fn(value):
+                return None if search(value) else msg
+        else:
+            validators = (arg,)
+
+            def fn(value):
+                return run_validators(validators, value)
+        try:
+            uniques, inverse = np.unique(values, return_inverse=True)
+        except TypeError:  # Unorderable values
+            return _distinct(values.tolist(), fn)
+        results = [fn(value) for value in uniques.tolist()]
+        if kind == 'regex':
+            return np.array([r is not None for r in results], bool)[inverse]
+        return [results[i] for i in inverse.ravel().tolist()]
+
+    def _check_range(self, values, value_range, msg):
+        low, high = value_range
+        if values.dtype.kind not in 'biuf':
+            try:
+                values = values.astype(float)
+            except (TypeError, ValueError):  # Mixed in non-numbers
+                return [
+                    range_error(v, low, high, msg)
+                    for v in values.tolist()
+                ]
+        return ~((values >= low) & (values <= high))  # NaN is out of range
+
+
+class BatchResult(object):
+    '''Validation result of a batch of records.
+
+    :attr names: Column names in form declaration order
+    :attr codes: Maps each column to an array of error codes per row, 0 for
+        valid rows. Codes take one byte unless the column has more than 255
+        distinct messages
+    :attr messages: Maps each column to its list of messages, indexed by
+        error code
+    :attr size: Number of rows
+    '''
+
+    def __init__(self, names, codes, messages, size, numpy=None):
+        self.names = names
+        self.codes = codes
+        self.messages = messages
+        self.size = size
+        self._numpy = numpy
+
+    @property
+    def valid(self):
+        '''True if all rows are valid.'''
+
+        return not any(any(codes) for codes in self.codes.values())
+
+    def mask(self):
+        '''Returns a rows by columns error mask. With NumPy a bool array,
+        otherwise a list of bytearrays, one per row.'''
+
+        np = self._numpy
+        columns = [self.codes[name] for name in self.names]
+        if np is not None:
+            if not columns:
+                return np.zeros((self.size, 0), bool)
+            return np.column_stack([np.asarray(c) != 0 for c in columns])
+        return [
+            bytearray(1 if c[row] else 0 for c in columns)
+            for row in range(self.size)
+        ]
+
+    def counts(self):
+        '''Returns the number of invalid rows per column.'''
+
+        return dict(
+            (name, sum(1 for code in codes if code))
+            for name, codes in self.codes.items()
+        )
+
+    def invalid_rows(self):
+        '''Returns the indices of all rows with at least one error.'''
+
+        invalid = set()
+        for codes in self.codes.values():
+            invalid.update(i for i, code in enumerate(codes) if code)
+        return sorted(invalid)
+
+    def errors(self, row):
+        '''Returns the error messages of row by column name.'''
+
+        errors = {}
+        for name in self.names:
+            code = self.codes[name][row]
+            if code:
+                errors[name] = self.messages[name][code]
+        return errors
+
+
+def validate_columns(form, columns, use_numpy=True):
+    '''Validate records in columnar form against a Form class. Columns of
+    fields missing from columns hold the fields default in every row. For
+    each row and field only the first failing check is recorded, just like
+    a controls validator chain.
+
+    :param form: Form class
+    :param columns: Dict of column name to sequence or array of values
+    :param use_numpy: Set to False to process columns as python lists
+    :returns: :class:`BatchResult`
+    '''
+
+    np = get_numpy() if use_numpy else None
+    sizes = set(len(values) for values in columns.values())
+    if len(sizes) > 1:
+        raise ValueError('Columns differ in length: {}'.format(sorted(sizes)))
+    size = sizes.pop() if sizes else 0
+
+    names = []
+    codes = {}
+    messages = {}
+    for name, field in form_columns(form):
+        names.append(name)
+        checks = field_checks(field)
+        if name in columns:
+            values = columns[name]
+            if getattr(values, 'ndim', 1) > 1:  # Rows of Int2Field pairs
+                values = [tuple(row) for row in values.tolist()]
+        else:
+            values = [field.get_default()] * size
+        codes[name], messages[name] = _validate_column(
+            values, checks, size, np
+        )
+    return BatchResult(names, codes, messages, size, np)
+
+
+def _widen(codes, np):
+    '''Returns codes converted to the next wider unsigned integer type.'''
+
+    if np is not None:
+        dtype = np.uint16 if codes.dtype == np.uint8 else np.uint32
+        return codes.astype(dtype)
+    return array('H' if codes.typecode == 'B' else 'L', codes)
+
+
+def _validate_column(values, checks, size, np):
+    messages = [None]
+    index = {}
+    # Codes take one byte per row, widened once a column has more distinct
+    # messages, like validators including the value in their message.
+    state = {}
+
+    def code(message):
+        if message not in index:
+            index[message] = len(messages)
+            messages.append(message)
+            if len(messages) - 1 in (0x100, 0x10000):
+                state['codes'] = _widen(state['codes'], np)
+        return index[message]
+
+    if np is None:
+        column = _ListColumn(values)
+        state['codes'] = array('B', bytes(bytearray(size)))
+        rows = list(range(size))
+        for kind, arg, msg in checks:
+            if not rows:
+                break
+            results = column.check(kind, arg, msg, rows)
+            remaining = []
+            for row, message in zip(rows, results):
+                if message is not None:
+                    value = code(message)
+                    state['codes'][row] = value
+                else:
+                    remaining.append(row)
+            rows = remaining
+        return state['codes'], messages
+
+    column = _ArrayColumn(values, np)
+    state['codes'] = np.zeros(size, np.uint8)
+    rows = np.arange(size)
+    for kind, arg, msg in checks:
+        if not len(rows):
+            break
+        failed = column.check(kind, arg, msg, rows)
+        if isinstance(failed, list):  # Messages of scalar checks
+            row_codes = [0 if m is None else code(m) for m in failed]
+            row_codes = np.array(row_codes, state['codes'].dtype)
+            failed = row_codes != 0
+            state['codes'][rows[failed]] = row_codes[failed]
+        else:
+            value = code(msg)
+            state['codes'][rows[failed]] = value
+        rows = rows[~failed]
+    return state['codes'], messages
@@ -8,15 +8,24 @@ setting their values. Each control implements :meth:`get_value` and
 ``values`` is used to set the default value of the control or in the case
 of :class:`ComboBox` and :class:`IntComboBox` a sequence of items to add to
 the wrapped QComboBox. In addition each control emits a Signal named `changed`
-whenever the value is changed by user interaction.
+whenever the value is changed by user interaction. Values changed without
+emitting `changed`, like those set by :meth:`set_value`, emit `modified`.
 '''
 
 import os
 from copy import deepcopy
 from Qt import QtWidgets, QtCore, QtGui
 from . import resource
-from .widgets import ScalingImage, IconButton
-from .exc import ValidationError
+from .widgets import ScalingImage, IconButton, style_batcher
+from .scheduler import get_scheduler
+from .itemmodels import ListModel, OptionModel, FilterModel, merge_rows
+from .paths import PathCompleter, get_scanner
+from .validators import compile_chain, is_expensive
+
+try:
+    string_types = (str, unicode)
+except NameError:
+    string_types = (str,)
 
 
 class BaseControl(QtCore.QObject):
@@ -25,23 +34,32 @@ class BaseControl(QtCore.QObject):
     '''
 
     changed = QtCore.Signal()
+    modified = QtCore.Signal()
     validate = QtCore.Signal()
     properties = dict(
         valid=True,
     )
 
     def __init__(self, name, labeled=True, label_on_top=True,
-                 default=None, validators=None, *args, **kwargs):
+                 default=None, validators=None, debounce=None,
+                 *args, **kwargs):
         super(BaseControl, self).__init__(*args, **kwargs)
+        resource.load()
 
         self._name = name
         self._labeled = labeled
         self._label_on_top = label_on_top
 
+        self.debounce = debounce
+        self._validation_generation = 0
+        self._validation_timer = None
+        self._validation_future = None
+
         self._init_widgets()
         self._init_properties()
 
         self.validators = validators
+        self.default = default
 
         if default:
             self.set_value(default)
@@ -86,6 +104,25 @@ class BaseControl(QtCore.QObject):
         else:
             self.layout.setDirection(QtWidgets.QBoxLayout.LeftToRight)
 
+    @property
+    def validators(self):
+        '''Validators of this control. Setting them compiles the chains used
+        by :meth:`validate` and the validation scheduler.'''
+
+        return self._validators
+
+    @validators.setter
+    def validators(self, value):
+        self._validators = value
+        value = value or ()
+        self.chain = compile_chain(value)
+        self.cheap_chain = compile_chain(
+            [v for v in value if not is_expensive(v)]
+        )
+        self.expensive_chain = compile_chain(
+            [v for v in value if is_expensive(v)]
+        )
+
     @property
     def valid(self):
         return self.get_property('valid')
@@ -94,28 +131,59 @@ class BaseControl(QtCore.QObject):
     def valid(self, value):
         self.set_property('valid', value)
 
-    def validate(self):
-        '''Validate this control'''
+    def validate(self, block=True):
+        '''Validate this control now, running all validators on the calling
+        thread. Results of pending background validation are discarded.
+
+        :param block: If False only cheap validators run on the calling
+            thread, expensive ones run on a worker thread and their result
+            is applied once available.
+        '''
         if not self.validators:
             return
 
-        value = self.get_value()
+        self._validation_generation += 1
+        if not block:
+            get_scheduler().run(self)
+            return
+        self.set_error(self.chain(self.get_value()))
 
-        for v in self.validators:
-            try:
-                v(value)
-            except ValidationError as e:
-                self.valid = False
-                self.errlabel.setText('*' + e.message)
-                return
+    def schedule_validate(self):
+        '''Validate this control once its debounce interval passed, running
+        expensive validators on a worker thread.'''
 
-        if not self.valid:
+        get_scheduler().schedule(self)
+
+    def set_error(self, error):
+        '''Show a validation error message, or clear it when error is None.'''
+
+        if error is not None:
+            if self.valid:
+                self.valid = False
+            self.errlabel.setText('*' + error)
+        elif not self.valid:
             self.valid = True
             self.errlabel.setText('')
 
     def emit_changed(self, *args):
         self.changed.emit()
-        self.validate()
+        self.schedule_validate()
+
+    def emit_modified(self, *args):
+        '''Emits modified, connected to the widget signals reporting any
+        change, including those made by set_value.'''
+
+        self.modified.emit()
+
+    def reset(self):
+        '''Restore the default value of this control and clear its errors.'''
+
+        if self.default is not None:
+            self.set_value(self.default)
+
+        if not self.valid:
+            self.valid = True
+            self.errlabel.setText('')
 
     def get_property(self, name):
         '''Used to get the value of a property of this control.'''
@@ -128,17 +196,19 @@ class BaseControl(QtCore.QObject):
         manages. Allowing the use of these properties in stylesheets.
         '''
 
+        changed = self.properties.get(name) != value
         for w in self.widgets:
             w.setProperty(name, value)
         self.properties[name] = value
-        self.update_style()
+        if changed:
+            self.update_style()
 
     def update_style(self):
-        '''Used to update the style of all widgets this control manages.'''
+        '''Used to update the style of all widgets this control manages.
+        Widgets are repolished by :data:`psforms.widgets.style_batcher` on the
+        next iteration of the event loop.'''
 
-        for w in self.widgets:
-            w.style().unpolish(w)
-            w.style().polish(w)
+        style_batcher.invalidate(self.widgets)
 
     def init_widgets(self):
         '''Subclasses must implement this method...
@@ -213,7 +283,7 @@ class BaseControl(QtCore.QObject):
         '''Initializes the qt properties on all this controls widgets.'''
 
         self.properties = deepcopy(self.properties)
-        for p, v in self.properties.iteritems():
+        for p, v in self.properties.items():
             self.set_property(p, v)
 
     def get_value(self):
@@ -322,21 +392,72 @@ class Float2Control(Spin2Control):
 
 
 class OptionControl(BaseControl):
+    '''Combo box control. Options are a sequence or iterable of labels or
+    (label, data) tuples, or a :class:`psforms.itemmodels.OptionModel` shared
+    with other controls. Labels are looked up through the models index and
+    the combo box view only draws the visible rows.
+
+    :param options: Options or OptionModel
+    :param filterable: Make the combo box editable, typing shows a popup of
+        the options containing the text typed
+    '''
 
-    def __init__(self, name, options=None, *args, **kwargs):
+    def __init__(self, name, options=None, filterable=False, *args, **kwargs):
+        self.options = options
+        self.filterable = filterable
         super(OptionControl, self).__init__(name, *args, **kwargs)
-        if options:
-            self.set_options(options)
 
     def init_widgets(self):
 
         c = QtWidgets.QComboBox(parent=self.parent())
+        c.view().setUniformItemSizes(True)
         c.activated.connect(self.emit_changed)
+        c.currentIndexChanged.connect(self.emit_modified)
+        self.model = None
+        self.filter_model = None
+
+        if self.filterable:
+            c.setEditable(True)
+            c.setInsertPolicy(QtWidgets.QComboBox.NoInsert)
+            completer = QtWidgets.QCompleter(c)
+            completer.setCompletionMode(
+                QtWidgets.QCompleter.UnfilteredPopupCompletion
+            )
+            completer.popup().setUniformItemSizes(True)
+            completer.activated[str].connect(self._completer_activated)
+            c.setCompleter(completer)
+            c.lineEdit().textEdited.connect(self.set_filter)
+            self.completer = completer
+
+        self.widget = c
+        self.set_options(self.options or ())
         return (c,)
 
     def set_options(self, options):
-        self.widget.clear()
-        self.widget.addItems(options)
+        if isinstance(options, OptionModel):
+            self.model = options
+        else:
+            self.model = OptionModel(options)
+        # Combo boxes never ask their model for more rows, fetch the first
+        # batch so the popup has options and the first one is selected.
+        self.model.fetch_row(self.model.batch_size - 1)
+        self.widget.setModel(self.model)
+        if self.model.rowCount():
+            self.widget.setCurrentIndex(0)
+
+        if self.filterable:
+            self.filter_model = FilterModel(self.model, parent=self.widget)
+            self.completer.setModel(self.filter_model)
+
+    def set_filter(self, text):
+        '''Show the options containing text in the completer popup.'''
+
+        self.filter_model.set_filter(text)
+        self.completer.complete()
+
+    def _completer_activated(self, text):
+        self.set_value(text)
+        self.emit_changed()
 
     def get_data(self):
         return self.widget.itemData(
@@ -345,32 +466,27 @@ class OptionControl(BaseControl):
         )
 
     def get_text(self):
-        return self.widget.currentText()
+        return self.widget.itemText(self.widget.currentIndex())
 
     def set_text(self, value):
-        self.widget.setCurrentIndex(self.widget.findText(value))
+        self.widget.setCurrentIndex(self.model.find(value))
 
     def get_value(self):
-        return self.widget.currentText()
+        return self.widget.itemText(self.widget.currentIndex())
 
     def set_value(self, value):
-        self.widget.setCurrentIndex(self.widget.findText(value))
+        self.widget.setCurrentIndex(self.model.find(value))
 
 StringOptionControl = OptionControl
 
 
 class IntOptionControl(OptionControl):
 
-    def init_widgets(self):
-
-        c = QtWidgets.QComboBox(parent=self.parent())
-        c.activated.connect(self.emit_changed)
-        return (c,)
-
     def get_value(self):
         return self.widget.currentIndex()
 
     def set_value(self, value):
+        self.model.fetch_row(value)
         self.widget.setCurrentIndex(value)
 
 
@@ -404,6 +520,7 @@ class ButtonOptionControl(BaseControl):
             if i == 0:
                 c.setChecked(True)
             c.setFixedSize(20, 20)
+            c.toggled.connect(self.emit_modified)
 
             cl = QtWidgets.QLabel(opt)
             cl.setProperty('clickable', True)
@@ -440,6 +557,7 @@ class BoolControl(BaseControl):
         c = QtWidgets.QCheckBox(parent=self.parent())
         c.setFixedSize(20, 20)
         c.clicked.connect(self.emit_changed)
+        c.toggled.connect(self.emit_modified)
         return (c, )
 
     def get_value(self):
@@ -454,6 +572,7 @@ class StringControl(BaseControl):
     def init_widgets(self):
         le = QtWidgets.QLineEdit(parent=self.parent())
         le.textEdited.connect(self.emit_changed)
+        le.textChanged.connect(self.emit_modified)
         return (le,)
 
     def get_value(self):
@@ -474,14 +593,21 @@ class TextControl(BaseControl):
         return self.widget.toPlainText()
 
     def set_value(self, value):
-        self.blockSignals(True)
-        self.widget.setText(value)
-        self.blockSignals(False)
+        blocked = self.blockSignals(True)
+        try:
+            self.widget.setText(value)
+        finally:
+            self.blockSignals(blocked)
+        self.emit_modified()
 
 
 class BrowseControl(BaseControl):
+    '''Line edit with a browse button. Typed paths are completed from
+    directory listings made in the background, see :mod:`psforms.paths`.
+    '''
 
     browse_method = QtWidgets.QFileDialog.getOpenFileName
+    complete_dirs_only = False
 
     def __init__(self, name, caption=None, filters=None, *args, **kwargs):
         super(BrowseControl, self).__init__(name, *args, **kwargs)
@@ -493,6 +619,8 @@ class BrowseControl(BaseControl):
         le = QtWidgets.QLineEdit(parent=self.parent())
         le.setProperty('browse', True)
         le.textEdited.connect(self.emit_changed)
+        le.textChanged.connect(self.emit_modified)
+        self.completer = PathCompleter(le, self.complete_dirs_only)
         b = IconButton(
             icon=':/icons/browse_hover',
             tip='Browse',
@@ -520,10 +648,14 @@ class BrowseControl(BaseControl):
 
     @property
     def basedir(self):
+        '''Directory of the current value. Only listings made by the
+        background scanner are consulted, the filesystem is never touched.
+        '''
+
         line_text = self.get_value()
         if line_text:
             line_dir = os.path.dirname(line_text)
-            if os.path.exists(line_dir):
+            if get_scanner().exists(line_dir) is not False:
                 return line_dir
         return ''
 
@@ -532,11 +664,11 @@ class BrowseControl(BaseControl):
             self.main_widget,
             caption=self.caption,
             dir=self.basedir)
+        if isinstance(value, tuple):  # File dialogs return (path, filter)
+            value = value[0]
         if value:
-            if self.browse_method is QtWidgets.QFileDialog.getExistingDirectory:
-                self.set_value(value)
-                return
-            self.set_value(value[0])
+            self.set_value(value)
+            self.emit_changed()
 
 
 class FileControl(BrowseControl):
@@ -547,6 +679,7 @@ class FileControl(BrowseControl):
 class FolderControl(BrowseControl):
 
     browse_method = QtWidgets.QFileDialog.getExistingDirectory
+    complete_dirs_only = True
 
 
 class SaveFileControl(BrowseControl):
@@ -561,6 +694,7 @@ class ImageControl(BaseControl):
         i = ScalingImage(parent=w)
         f = FileControl(self.name + '_line', parent=w)
         f.changed.connect(self.emit_changed)
+        f.modified.connect(self.emit_modified)
         self.file_control = f
 
         l = QtWidgets.QVBoxLayout()
@@ -574,13 +708,13 @@ class ImageControl(BaseControl):
 
     def emit_changed(self, *args):
         self.changed.emit()
-        self.widgets[1].set_image(self.get_value())
+        self.widgets[1].load_image(self.get_value())
 
     def get_value(self):
         return self.file_control.get_value()
 
     def set_value(self, value):
-        if QtCore.QFile.exists(value):
+        if not value or QtCore.QFile.exists(value):
             self.file_control.set_value(value)
 
 
@@ -625,9 +759,15 @@ class ListControl(BaseControl):
 
     def set_value(self, value):
         '''Sets the selection of the list to the specified value, label or
-        index'''
-
-        if isinstance(value, (str, unicode)):
+        index. A list or tuple of labels replaces the whole selection.'''
+
+        if isinstance(value, (list, tuple)):
+            self.widget.clearSelection()
+            for label in value:
+                items = self.widget.findItems(label, QtCore.Qt.MatchExactly)
+                for item in items:
+                    item.setSelected(True)
+        elif isinstance(value, string_types):
             items = self.widget.findItems(value)
             if items:
                 self.widget.setCurrentItem(items[0])
@@ -635,4 +775,134 @@ class ListControl(BaseControl):
             self.widget.setCurrentIndex(int)
 
 
+class ModelListControl(BaseControl):
+    '''List control backed by a :class:`psforms.itemmodels.ListModel`.
+    Suited for tens of thousands of items. Options may be any iterable or
+    generator of labels or (label, data) tuples, they are fetched in batches
+    of batch_size as the list is scrolled. The selection is kept as a set of
+    rows and is available as ranges through :meth:`get_ranges`.
+
+    :param options: Iterable of labels or (label, data) tuples
+    :param batch_size: Number of options fetched at once
+    :param filterable: Show a line edit used to filter the options
+    '''
+
+    def __init__(self, name, options=None, batch_size=None, filterable=False,
+                 *args, **kwargs):
+        self.options = options or ()
+        self.batch_size = batch_size or 256
+        self.filterable = filterable
+        self._selected = set()
+        self._syncing = False
+        super(ModelListControl, self).__init__(name, *args, **kwargs)
+
+    def init_widgets(self):
+        self.model = ListModel(self.options, self.batch_size)
+
+        v = QtWidgets.QListView()
+        v.setUniformItemSizes(True)
+        v.setLayoutMode(QtWidgets.QListView.Batched)
+        v.setBatchSize(self.batch_size)
+        v.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        v.setModel(self.model)
+        v.selectionModel().selectionChanged.connect(self._selection_changed)
+        self.view = v
+
+        if not self.filterable:
+            return (v,)
+
+        f = QtWidgets.QLineEdit()
+        f.setPlaceholderText('Filter')
+        f.textChanged.connect(self.set_filter)
+
+        w = QtWidgets.QWidget(parent=self.parent())
+        l = QtWidgets.QVBoxLayout()
+        l.setContentsMargins(0, 0, 0, 0)
+        l.setSpacing(5)
+        l.addWidget(f)
+        l.addWidget(v)
+        w.setLayout(l)
+        return (w, v, f)
+
+    def set_options(self, options):
+        '''Replace all options, clearing the selection.'''
+
+        self._selected.clear()
+        self.model.set_items(options)
+
+    def set_filter(self, text):
+        '''Only show options containing text. Selected options hidden by the
+        filter stay selected.'''
+
+        self._syncing = True
+        try:
+            self.model.filter = text
+            self._select_rows(self._selected)
+        finally:
+            self._syncing = False
+
+    def _selection_changed(self, selected, deselected):
+        if self._syncing:
+            return
+
+        source_row = self.model.source_row
+        for r in deselected:
+            for row in range(r.top(), r.bottom() + 1):
+                self._selected.discard(source_row(row))
+        for r in selected:
+            for row in range(r.top(), r.bottom() + 1):
+                self._selected.add(source_row(row))
+        self.emit_changed()
+
+    def _select_rows(self, rows):
+        '''Select the visible rows of the source rows given, one selection
+        range for each run of consecutive rows.'''
+
+        model = self.model
+        selection = QtCore.QItemSelection()
+        for first, last in merge_rows(model.model_rows(rows)):
+            selection.select(model.index(first), model.index(last))
+        self.view.selectionModel().select(
+            selection,
+            QtCore.QItemSelectionModel.ClearAndSelect
+        )
+
+    def get_ranges(self):
+        ''':return: Selected rows as inclusive (first, last) ranges
+        :rtype: list'''
+
+        return merge_rows(self._selected)
+
+    def get_data(self):
+        ''':return: Data for selected items
+        :rtype: list'''
+
+        return [self.model.item_data(row) for row in sorted(self._selected)]
+
+    def get_value(self):
+        ''':return: Labels of selected items
+        :rtype: list'''
+
+        return [self.model.label(row) for row in sorted(self._selected)]
+
+    def set_value(self, value):
+        '''Sets the selection to the specified labels, label or index.
+        Options are fetched from the source until all labels are found.'''
+
+        if isinstance(value, int):
+            rows = [value if self.model.fetch_row(value) else -1]
+        elif isinstance(value, (list, tuple)):
+            rows = [self.model.find(label) for label in value]
+        else:
+            rows = [self.model.find(value)]
+
+        self._selected = set(row for row in rows if row >= 0)
+        self._syncing = True
+        try:
+            self._select_rows(self._selected)
+        finally:
+            self._syncing = False
+        self.emit_changed()
+
+
 control_map = {cls.__name__: cls for cls in BaseControl.__subclasses__()}
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from .exc import FieldNotInstantiated
-from . import controls
 from .utils import Ordered
+from .validators import compile_chain, in_range
 from copy import deepcopy
 
 
@@ -33,6 +33,44 @@ def get_key(*args):
     raise KeyError('{0} does not exist in {1}'.format(key, dicts))
 
 
+def first_option(field):
+    '''Empty value of option fields, the first of the fields options.'''
+
+    options = field.control_kwargs.get('options')
+    if hasattr(options, 'fetch_row'):  # A shared OptionModel
+        return options.label(0) if options.fetch_row(0) else ''
+    if options:
+        option = options[0]
+        return option[0] if isinstance(option, tuple) else option
+    return ''
+
+
+def clamp_zero(value_type, value_range):
+    '''Returns zero of value_type clamped to value_range, the value a spin
+    box starts at.'''
+
+    value = value_type()
+    if value_range:
+        low, high = value_range
+        value = max(low, min(value, high))
+    return value
+
+
+def spin_empty(field):
+    '''Empty value of spin fields, zero clamped to the fields range.'''
+
+    return clamp_zero(field.value_type, field.control_kwargs.get('range'))
+
+
+def spin2_empty(field):
+    '''Empty value of spin2 fields, zeros clamped to the fields ranges.'''
+
+    return tuple(
+        clamp_zero(field.value_type, field.control_kwargs.get(key))
+        for key in ('range1', 'range2')
+    )
+
+
 class FieldType(Ordered):
     ''':class:`Form` calls the :meth:`create` to retrieve an appropriate
     control.
@@ -43,17 +81,25 @@ class FieldType(Ordered):
     :param label_on_top: Label appears on top of the field control (bool)
         Overrides the parent Forms label_on_top attribute for this field only
     :param default: Default value (str)
+    :param validators: Sequence of validators (see :mod:`psforms.validators`)
+    :param debounce: Milliseconds to wait after the last change before
+        validating the control
     '''
 
     control_cls = None
     control_defaults = None
+    value_type = None
+    empty_value = None
     field_defaults = {
         'labeled': True,
         'label_on_top': True,
         'default': None,
-        'validators': None
+        'validators': None,
+        'debounce': None,
     }
-    field_keys = ('labeled', 'label_on_top', 'default', 'validators')
+    field_keys = (
+        'labeled', 'label_on_top', 'default', 'validators', 'debounce'
+    )
 
     def __init__(self, nice_name, **kwargs):
         super(FieldType, self).__init__()
@@ -67,7 +113,7 @@ class FieldType(Ordered):
             setattr(self, key, value)
 
         if self.control_defaults:  # If the control has defaults, get em
-            for key in self.control_defaults.iterkeys():
+            for key in self.control_defaults:
                 value = get_key(key, (kwargs, self.control_defaults), None)
                 if value:
                     self.control_kwargs[key] = value
@@ -76,22 +122,75 @@ class FieldType(Ordered):
         r = '<{}>(nice_name={}, default={})'
         return r.format(self.__class__.__name__, self.nice_name, self.default)
 
+    def get_default(self):
+        '''Returns the value a freshly created control of this field holds.
+        That is the fields default, or its empty value when no default is set.
+        '''
+
+        if self.default is not None:
+            return deepcopy(self.default)
+        if callable(self.empty_value):
+            return self.empty_value(self)
+        return deepcopy(self.empty_value)
+
+    def get_validators(self):
+        '''Returns the validators values of this field must pass. Fields
+        with a range, like IntField and FloatField, check it first. Their
+        controls clamp values to the range, so for them the check only
+        matters when validating data without controls.'''
+
+        validators = tuple(self.validators or ())
+        value_range = self.control_kwargs.get('range')
+        if value_range and self.value_type in (int, float):
+            key = (validators, tuple(value_range))
+            cached = self.__dict__.get('_validators_cache')
+            if cached is None or cached[0] != key:
+                cached = self._validators_cache = (
+                    key, (in_range(*value_range),) + validators
+                )
+            return cached[1]
+        return validators
+
+    @property
+    def chain(self):
+        '''The compiled :class:`ValidatorChain` of
+        :meth:`get_validators`.'''
+
+        return compile_chain(self.get_validators())
+
+    def get_control_cls(self):
+        '''Returns the control class of this field. A control_cls given by
+        name is looked up in :mod:`psforms.controls`, which is only imported
+        when the first control is created.'''
+
+        control_cls = self.control_cls
+        if isinstance(control_cls, str):
+            from . import controls
+            control_cls = getattr(controls, control_cls)
+        return control_cls
+
     def create(self):
-        control = self.control_cls(**self.control_kwargs)
+        control = self.get_control_cls()(**self.control_kwargs)
+        control.default = self.get_default()
         return control
 
 
 def create_fieldtype(clsname, control_cls, control_defaults=None,
-                     field_defaults=None, bases=(FieldType,)):
+                     field_defaults=None, bases=(FieldType,),
+                     value_type=None, empty_value=None):
     '''Convenience function to create a new subclass of :class:`FieldType`.
     *control_defaults* are passed on to *control_cls*. *field_defaults* are
     used as the values of attributes on the returned :class:`FieldType`
     subclass. The keys for both control_defaults and field_defaults are looked
     up in __init__ kwargs param first.
 
-    :param control_cls: PySide widget used to create the control.
+    :param control_cls: PySide widget used to create the control, or the
+        name of a control class in :mod:`psforms.controls`.
     :param control_defaults: Default kwargs to pass to control_cls
     :param field_defaults: Default attr values (labeled, label_on_top, default)
+    :param value_type: Python type of the values this field holds
+    :param empty_value: Value of the control when no default is given, or a
+        callable taking the field instance and returning that value
 
     .. note::
 
@@ -113,100 +212,146 @@ def create_fieldtype(clsname, control_cls, control_defaults=None,
         'control_defaults': control_defaults,
         'field_defaults': field_defaults,
     }
+    if value_type is not None:
+        attrs['value_type'] = value_type
+    if callable(empty_value):
+        attrs['empty_value'] = staticmethod(empty_value)
+    elif empty_value is not None:
+        attrs['empty_value'] = empty_value
     return type(clsname, bases, attrs)
 
 
 ListField = create_fieldtype(
     'ListField',
-    control_cls=controls.ListControl,
-    control_defaults={'options': None}
+    control_cls='ListControl',
+    control_defaults={'options': None},
+    value_type=list,
+    empty_value=[],
+)
+
+ModelListField = create_fieldtype(
+    'ModelListField',
+    control_cls='ModelListControl',
+    control_defaults={'options': None, 'batch_size': None, 'filterable': None},
+    value_type=list,
+    empty_value=[],
 )
 
 BoolField = create_fieldtype(
     'BoolField',
-    control_cls=controls.BoolControl,
-    field_defaults={'label_on_top': False}
+    control_cls='BoolControl',
+    field_defaults={'label_on_top': False},
+    value_type=bool,
+    empty_value=False,
 )
 
 StringField = create_fieldtype(
     'StringField',
-    control_cls=controls.StringControl,
+    control_cls='StringControl',
+    value_type=str,
+    empty_value='',
 )
 
 IntField = create_fieldtype(
     'IntField',
-    control_cls=controls.IntControl,
+    control_cls='IntControl',
     control_defaults={'range': None},
+    value_type=int,
+    empty_value=spin_empty,
 )
 
 FloatField = create_fieldtype(
     'FloatField',
-    control_cls=controls.FloatControl,
+    control_cls='FloatControl',
     control_defaults={'range': None},
+    value_type=float,
+    empty_value=spin_empty,
 )
 
 Int2Field = create_fieldtype(
     'Int2Field',
-    control_cls=controls.Int2Control,
+    control_cls='Int2Control',
     control_defaults={'range1': None, 'range2': None},
+    value_type=int,
+    empty_value=spin2_empty,
 )
 
 Float2Field = create_fieldtype(
     'Float2Field',
-    control_cls=controls.Float2Control,
+    control_cls='Float2Control',
     control_defaults={'range1': None, 'range2': None},
+    value_type=float,
+    empty_value=spin2_empty,
 )
 
 IntOptionField = create_fieldtype(
     'IntOptionField',
-    control_cls=controls.IntOptionControl,
-    control_defaults={'options': None},
+    control_cls='IntOptionControl',
+    control_defaults={'options': None, 'filterable': None},
+    value_type=int,
+    empty_value=0,
 )
 
 StringOptionField = create_fieldtype(
     'StringOptionField',
-    control_cls=controls.StringOptionControl,
-    control_defaults={'options': None},
+    control_cls='StringOptionControl',
+    control_defaults={'options': None, 'filterable': None},
+    value_type=str,
+    empty_value=first_option,
 )
 
 ButtonOptionField = create_fieldtype(
     'ButtonOptionField',
-    control_cls=controls.ButtonOptionControl,
+    control_cls='ButtonOptionControl',
     control_defaults={'options': None},
+    value_type=str,
+    empty_value=first_option,
 )
 
 IntButtonOptionField = create_fieldtype(
     'IntButtonOptionField',
-    control_cls=controls.IntButtonOptionControl,
+    control_cls='IntButtonOptionControl',
     control_defaults={'options': None},
+    value_type=int,
+    empty_value=0,
 )
 
 FileField = create_fieldtype(
     'FileField',
-    control_cls=controls.FileControl,
+    control_cls='FileControl',
     control_defaults={'caption': None, 'filters': None},
+    value_type=str,
+    empty_value='',
 )
 
 FolderField = create_fieldtype(
     'FolderField',
-    control_cls=controls.FolderControl,
+    control_cls='FolderControl',
     control_defaults={'caption': None, 'filters': None},
+    value_type=str,
+    empty_value='',
 )
 
 SaveFileField = create_fieldtype(
     'SaveFileField',
-    control_cls=controls.SaveFileControl,
+    control_cls='SaveFileControl',
     control_defaults={'caption': None, 'filters': None},
+    value_type=str,
+    empty_value='',
 )
 
 ImageField = create_fieldtype(
     'ImageField',
-    control_cls=controls.ImageControl,
+    control_cls='ImageControl',
+    value_type=str,
+    empty_value='',
 )
 
 TextField = create_fieldtype(
     'TextField',
-    control_cls=controls.TextControl,
+    control_cls='TextControl',
+    value_type=str,
+    empty_value='',
 )
 
 
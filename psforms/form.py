@@ -3,11 +3,9 @@ try:
     from collections import OrderedDict
 except ImportError:
     from ordereddict import OrderedDict
-from Qt import QtWidgets, QtCore, QtGui
 
 from .fields import FieldType, type_map, field_map
-from .widgets import FormDialog, FormWidget, FormGroup
-from .utils import Ordered, itemattrgetter
+from .utils import Ordered, itemattrgetter, with_metaclass
 
 
 class FormMetaData(object):
@@ -22,6 +20,9 @@ class FormMetaData(object):
         labels_on_top=True,
         layout_horizontal=False,
         subforms_as_groups=False,
+        lazy_groups=False,
+        dialog_pool_size=1,
+        virtual=False,
     )
 
     def __init__(self, **kwargs):
@@ -29,52 +30,108 @@ class FormMetaData(object):
         self.__dict__.update(kwargs)
 
 
-class Form(Ordered):
+class FormType(type):
+    '''Metaclass for :class:`Form`. Collects the FieldType and Form attributes
+    of a Form subclass and all of its bases once, at class creation, and
+    stores them in creation order as immutable tuples of (name, attr) pairs.
+    Each Form class also gets its own, initially empty, dialog pool and
+    FormModel slot.
+    '''
+
+    def __init__(cls, name, bases, attrs):
+        super(FormType, cls).__init__(name, bases, attrs)
+
+        members = {}
+        for klass in reversed(cls.__mro__):
+            members.update(klass.__dict__)
+
+        cls_fields = []
+        cls_forms = []
+        for attr_name, attr in members.items():
+            if isinstance(attr, FieldType):
+                cls_fields.append((attr_name, attr))
+            elif (isinstance(attr, Ordered) and
+                  isinstance(type(attr), FormType)):
+                cls_forms.append((attr_name, attr))
+
+        by_order = itemattrgetter(1, '_order')
+        cls._fields = tuple(sorted(cls_fields, key=by_order))
+        cls._forms = tuple(sorted(cls_forms, key=by_order))
+        cls._dialog_pool = None
+        cls._model = None
+
+
+class Form(with_metaclass(FormType, Ordered)):
 
     meta = FormMetaData()
-    _max_width = None
 
     @classmethod
     def fields(cls):
         '''Returns FieldType objects in sorted order'''
 
-        cls_fields = []
-        for name, attr in cls.__dict__.iteritems():
-            if issubclass(attr.__class__, FieldType):
-                cls_fields.append((name, attr))
-        return sorted(cls_fields, key=itemattrgetter(1, '_order'))
+        return cls._fields
 
     @classmethod
     def forms(cls):
         '''Returns Form objects in sorted order'''
 
-        cls_forms = []
-        for name, attr in cls.__dict__.iteritems():
-            if issubclass(attr.__class__, Form):
-                cls_forms.append((name, attr))
-        return sorted(cls_forms, key=itemattrgetter(1, '_order'))
+        return cls._forms
+
+    @classmethod
+    def defaults(cls):
+        '''Returns the default values of this forms fields and subforms.'''
+
+        data = {}
+        for name, field in cls._fields:
+            data[name] = field.get_default()
+        for name, form in cls._forms:
+            data[name] = form.defaults()
+        return data
+
+    @classmethod
+    def has_validators(cls):
+        '''Returns True if any field of this form or a subform validates.'''
+
+        for name, field in cls._fields:
+            if field.validators:
+                return True
+        for name, form in cls._forms:
+            if form.has_validators():
+                return True
+        return False
+
+    @classmethod
+    def as_model(cls):
+        '''Returns the :class:`psforms.model.FormModel` of this form, used
+        to validate and normalize records without Qt.'''
+
+        if cls._model is None:
+            from .model import FormModel
+            cls._model = FormModel(cls)
+        return cls._model
 
     @classmethod
     def max_width(cls):
-        if not cls._max_width:
-            # Get the width of the maximum length label
-            _max_label = max([y.nice_name for x, y in cls.fields()], key=len)
-            _label = QtWidgets.QLabel(_max_label)
-            cls._max_width = _label.sizeHint().width() + 10
-        return cls._max_width
+        '''Returns the rendered width of this forms widest label.'''
+
+        from .widgets import label_metrics
+
+        names = [field.nice_name for name, field in cls._fields]
+        return label_metrics.max_width(names) + 10
 
     @classmethod
     def _create_controls(cls):
         '''Create and return controls from Field objects.'''
 
         controls = OrderedDict()
+        max_width = cls.max_width()
 
-        for name, field in cls.fields():
+        for name, field in cls._fields:
             control = field.create()
             control.setObjectName(name)
             labeled = field.labeled or cls.meta.labeled
             label_on_top = field.label_on_top or cls.meta.labels_on_top
-            control.label.setFixedWidth(cls.max_width())
+            control.label.setFixedWidth(max_width)
             controls[name] = control
 
         return controls
@@ -83,113 +140,140 @@ class Form(Ordered):
     def as_widget(cls, parent=None):
         '''Get this form as a widget'''
 
-        form_widget = FormWidget(
-            cls.meta.title,
-            cls.meta.columns,
-            cls.meta.layout_horizontal,
-            parent=parent)
+        from .widgets import FormWidget, style_batcher
 
-        if cls.meta.header:
-            form_widget.add_header(
+        with style_batcher.batch():
+            form_widget = FormWidget(
                 cls.meta.title,
-                cls.meta.description,
-                cls.meta.icon
-            )
+                cls.meta.columns,
+                cls.meta.layout_horizontal,
+                parent=parent)
+
+            if cls.meta.header:
+                form_widget.add_header(
+                    cls.meta.title,
+                    cls.meta.description,
+                    cls.meta.icon
+                )
+
+            if cls._fields:
+                controls = cls._create_controls()
+                for name, control in controls.items():
+                    form_widget.add_control(name, control)
+
+            lazy = cls.meta.lazy_groups
+            for name, form in cls._forms:
+                if cls.meta.subforms_as_groups:
+                    group = form.as_group(form_widget, lazy=lazy)
+                    form_widget.add_form(name, group)
+                else:
+                    form_widget.add_form(name, form.as_widget(form_widget))
 
-        if cls.fields():
-            controls = cls._create_controls()
-            for name, control in controls.iteritems():
-                form_widget.add_control(name, control)
+        return form_widget
 
-        for name, form in cls.forms():
-            if cls.meta.subforms_as_groups:
-                form_widget.add_form(name, form.as_group(form_widget))
-            else:
-                form_widget.add_form(name, form.as_widget(form_widget))
+    @classmethod
+    def as_virtual_widget(cls, parent=None):
+        '''Get this form as a scrolling widget that only creates controls
+        for the fields in view. Use for forms with hundreds of fields.'''
 
-        return form_widget
+        from .virtual import VirtualFormWidget
+
+        return VirtualFormWidget(cls, parent=parent)
 
     @classmethod
-    def as_group(cls, parent=None):
+    def as_group(cls, parent=None, lazy=False):
+        '''Get this form as a collapsible group. When lazy is True the group
+        starts collapsed and its widget is only built when it is first
+        expanded or needed to get, set or validate values.'''
+
+        from .widgets import FormGroup
+
+        if lazy:
+            return FormGroup(
+                name=cls.meta.title,
+                factory=cls.as_widget,
+                values=cls.defaults(),
+                validates=cls.has_validators(),
+                parent=parent,
+            )
 
         group = FormGroup(cls.as_widget(), parent=parent)
         return group
 
     @classmethod
-    def as_dialog(cls, frameless=False, dim=False, parent=None):
-        '''Get this form as a dialog'''
+    def as_dialog(cls, frameless=False, dim=False, parent=None, cached=False):
+        '''Get this form as a dialog
+
+        :param frameless: Remove the window frame of a parentless dialog
+        :param dim: Dim all monitors while the dialog is visible
+        :param parent: Parent widget
+        :param cached: Reuse a finished dialog from this forms dialog pool,
+            reset to the field defaults, instead of building a new one. The
+            pool keeps up to meta.dialog_pool_size idle dialogs.
+        '''
+
+        from .widgets import DialogPool
+
+        if cached:
+            if cls._dialog_pool is None:
+                cls._dialog_pool = DialogPool(
+                    cls._create_dialog,
+                    cls.meta.dialog_pool_size
+                )
+            return cls._dialog_pool.acquire(frameless, dim, parent)
+
+        dialog = cls._create_dialog(parent)
+        dialog.configure(frameless, dim, parent)
+        return dialog
 
-        dialog = FormDialog(cls.as_widget(), parent=parent)
+    @classmethod
+    def _create_dialog(cls, parent=None):
+        from .widgets import FormDialog
+
+        if cls.meta.virtual:
+            widget = cls.as_virtual_widget()
+        else:
+            widget = cls.as_widget()
+        dialog = FormDialog(widget, parent=parent)
         dialog.setWindowTitle(cls.meta.title)
-        if not parent:
-            window_flags = QtCore.Qt.WindowStaysOnTopHint
-            if frameless:
-                window_flags |= QtCore.Qt.FramelessWindowHint
-            dialog.setWindowFlags(window_flags)
-
-        if dim:  # Dim all monitors when showing the dialog
-            def _bg_widgets():
-                qapp = QtWidgets.QApplication.instance()
-                desktop = qapp.desktop()
-                screens = desktop.screenCount()
-                widgets = []
-
-                for i in xrange(screens):
-                    geo = desktop.screenGeometry(i)
-                    w = QtWidgets.QWidget()
-                    w.setGeometry(geo)
-                    w.setStyleSheet('QWidget {background:black}')
-                    w.setWindowOpacity(0.3)
-                    widgets.append(w)
-
-                def show():
-                    for w in widgets:
-                        w.show()
-
-                def hide():
-                    for w in widgets:
-                        w.hide()
-
-                return show, hide
-
-            old_exec = dialog.exec_
-            old_show = dialog.show
-
-            def _exec_(*args, **kwargs):
-                bgshow, bghide = _bg_widgets()
-                bgshow()
-                result = old_exec(*args, **kwargs)
-                bghide()
-                return result
-
-            def _show(*args, **kwargs):
-                bgshow, bghide = _bg_widgets()
-                bgshow()
-                result = old_show(*args, **kwargs)
-                bghide()
-                return result
-
-            dialog.exec_ = _exec_
-            dialog.show = _show
-
         return dialog
 
+    @classmethod
+    def clear_dialogs(cls):
+        '''Delete all idle dialogs pooled by as_dialog(cached=True).'''
+
+        if cls._dialog_pool is not None:
+            cls._dialog_pool.clear()
+
 
 def generate_form(name, fields, **metadata):
-    '''Generate a form from a name and a list of fields.'''
+    '''Generate a form from a name and a list of fields. Each field is a dict
+    holding the fields type, name, optional label and keyword arguments. A
+    type is a key of :data:`type_map` or the name of a FieldType class. A
+    field of type "form" holds a list of fields of its own and becomes a
+    subform.'''
 
     metadata.setdefault('title', name.title())
 
     bases = (Form,)
     attrs = {'meta': FormMetaData(**metadata)}
     for field in fields:
-        if field['type'] not in type_map:
+        field = dict(field)
+        field_name = field.pop('name')
+        if field['type'] == 'form':
+            del field['type']
+            subform_fields = field.pop('fields')
+            subform = generate_form(field_name, subform_fields, **field)
+            attrs[field_name] = subform()
+            continue
+
+        field_type = type_map.get(field['type'], field_map.get(field['type']))
+        if field_type is None:
             raise Exception('Invalid field type %s', field['type'])
 
-        field_type = type_map[field['type']]
-        name = field.pop('name')
-        label = field.pop('label', name)
+        del field['type']
+        label = field.pop('label', field_name)
         form_field = field_type(label, **field)
-        attrs[name] = form_field
+        attrs[field_name] = form_field
 
-    return type(name, bases, attrs)
+    return FormType(name, bases, attrs)
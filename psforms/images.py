@@ -0,0 +1,378 @@
+'''
+psforms.images
+==============
+Caching and asynchronous decoding of the images shown by
+:class:`psforms.widgets.ScalingImage`.
+
+Images are decoded on a worker thread with :class:`QtGui.QImageReader`,
+scaled down while reading to the size they are displayed at. Only QImages
+are touched off the GUI thread, pixmaps are created by the widgets.
+
+Downscaled images may additionally be kept on disk, see
+:func:`enable_thumbnail_cache`. The cache is enabled on import when the
+PSFORMS_THUMBNAIL_CACHE environment variable names its directory.
+'''
+
+import hashlib
+import os
+import threading
+from Qt import QtCore, QtGui
+from . import utils
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+
+def image_bytes(image):
+    '''Returns the number of bytes a decoded QImage or QPixmap, or a list of
+    them, occupies.'''
+
+    if isinstance(image, (list, tuple)):
+        return sum(image_bytes(level) for level in image)
+    if isinstance(image, QtGui.QPixmap):
+        return image.width() * image.height() * image.depth() // 8
+    size_in_bytes = getattr(image, 'sizeInBytes', None) or image.byteCount
+    return size_in_bytes()
+
+
+def image_key(path):
+    '''Returns the cache key of the image file at path, its path and
+    modification time. Returns None if the file does not exist.'''
+
+    if path.startswith(':'):  # Qt resources never change
+        return (path, 0) if QtCore.QFile.exists(path) else None
+    try:
+        return (path, os.stat(path).st_mtime)
+    except OSError:
+        return None
+
+
+#: Decoded images keyed by :func:`image_key`, plus the decoded size for
+#: downscaled images, mip levels keyed by ('mips', key) and scaled pixmaps
+#: keyed by ('pixmap', key, size).
+#: Limits may be changed at runtime by setting maxsize and maxweight, in
+#: bytes, followed by a call to trim. Hold cache_lock while using it, the
+#: image loader reads it from worker threads.
+image_cache = utils.LRUCache(
+    maxsize=512,
+    maxweight=256 * 1024 * 1024,
+    weigh=image_bytes,
+)
+cache_lock = threading.RLock()
+
+
+class ThumbnailCache(object):
+    '''Stores downscaled images as small files in a directory. Files are
+    named by a hash of the image key, so a modified source image, or a
+    request for another size, never reads a stale thumbnail. Files are
+    written atomically and the least recently read ones are removed once the
+    directory grows beyond max_bytes.
+
+    :param root: Directory holding the thumbnails
+    :param max_bytes: Maximum total size of all thumbnails
+    :param quality: JPEG quality of opaque thumbnails, transparent ones are
+        stored as PNG
+    '''
+
+    suffix = '.thumb'
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024, quality=85):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self._bytes = None
+        self._lock = threading.Lock()
+
+    def filename(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.root, digest + self.suffix)
+
+    def load(self, key):
+        '''Returns the thumbnail stored for key or None.'''
+
+        filename = self.filename(key)
+        if not os.path.isfile(filename):
+            return None
+
+        image = QtGui.QImageReader(filename).read()
+        if image.isNull():
+            return None
+
+        try:
+            os.utime(filename, None)  # Mark as recently used
+        except OSError:
+            pass
+        return image
+
+    def store(self, key, image):
+        '''Store image as the thumbnail of key.'''
+
+        if image.hasAlphaChannel():
+            fmt, quality = 'PNG', -1
+        else:
+            fmt, quality = 'JPG', self.quality
+
+        filename = self.filename(key)
+        tmp = '{}.{}.{}.tmp'.format(
+            filename, os.getpid(), threading.current_thread().ident
+        )
+        try:
+            if not os.path.isdir(self.root):
+                os.makedirs(self.root)
+            if not image.save(tmp, fmt, quality):
+                raise OSError('Failed to write ' + tmp)
+            size = os.path.getsize(tmp)
+            replace = getattr(os, 'replace', None)
+            if replace is None and os.path.exists(filename):
+                os.remove(filename)
+            (replace or os.rename)(tmp, filename)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += size
+                if self._bytes <= self.max_bytes:
+                    return
+        self.cleanup()
+
+    def cleanup(self):
+        '''Remove the least recently used thumbnails until they take up no
+        more than 90% of max_bytes.'''
+
+        with self._lock:
+            entries = []
+            try:
+                names = os.listdir(self.root)
+            except OSError:
+                names = []
+            for name in names:
+                if not name.endswith(self.suffix):
+                    continue
+                filename = os.path.join(self.root, name)
+                try:
+                    st = os.stat(filename)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, filename))
+
+            total = sum(entry[1] for entry in entries)
+            limit = self.max_bytes * 0.9 if total > self.max_bytes else total
+            for _, size, filename in sorted(entries):
+                if total <= limit:
+                    break
+                try:
+                    os.remove(filename)
+                except OSError:
+                    continue
+                total -= size
+            self._bytes = total
+
+    def clear(self):
+        '''Remove all thumbnails.'''
+
+        max_bytes, self.max_bytes = self.max_bytes, 0
+        try:
+            self.cleanup()
+        finally:
+            self.max_bytes = max_bytes
+
+
+thumbnail_cache = None
+
+
+def enable_thumbnail_cache(root=None, max_bytes=512 * 1024 * 1024):
+    '''Keep images downscaled by the image loader on disk, so showing the
+    same image again only reads a small thumbnail.
+
+    :param root: Directory of the cache, defaults to ~/.psforms/thumbnails
+    :param max_bytes: Maximum total size of the cache
+    :returns: The ThumbnailCache
+    '''
+
+    global thumbnail_cache
+    if root is None:
+        root = os.path.join(os.path.expanduser('~'), '.psforms', 'thumbnails')
+    thumbnail_cache = ThumbnailCache(root, max_bytes)
+    return thumbnail_cache
+
+
+def disable_thumbnail_cache():
+    '''Stop using the on disk thumbnail cache, leaving its files as is.'''
+
+    global thumbnail_cache
+    thumbnail_cache = None
+
+
+if os.environ.get('PSFORMS_THUMBNAIL_CACHE'):
+    enable_thumbnail_cache(os.environ['PSFORMS_THUMBNAIL_CACHE'])
+
+
+def read_image(path, size=None):
+    '''Decode the image at path. If size is given the image is scaled while
+    reading to cover a (width, height) rectangle, but never enlarged. Such
+    downscaled images are read from and written to the thumbnail cache when
+    it is enabled.
+
+    :returns: (key, QImage) or (None, None) if the file does not exist
+    '''
+
+    key = image_key(path)
+    if key is None:
+        return None, None
+    if size:
+        key = key + tuple(size)
+
+    with cache_lock:
+        image = image_cache.get(key)
+    if image is not None:
+        return key, image
+
+    thumbnails = thumbnail_cache if size else None
+    if thumbnails is not None:
+        image = thumbnails.load(key)
+        if image is not None:
+            return key, image
+
+    reader = QtGui.QImageReader(path)
+    downscaled = False
+    if size:
+        original = reader.size()
+        if original.isValid():
+            scaled = original.scaled(
+                QtCore.QSize(*size),
+                QtCore.Qt.KeepAspectRatioByExpanding
+            )
+            if scaled.width() < original.width():
+                reader.setScaledSize(scaled)
+                downscaled = True
+    image = reader.read()
+
+    if thumbnails is not None and downscaled and not image.isNull():
+        thumbnails.store(key, image)
+    return key, image
+
+
+def build_mips(image, min_size=128):
+    '''Returns successively halved, smoothly filtered copies of image down
+    to min_size pixels on the shorter side. Largest first, excluding image.
+    '''
+
+    levels = []
+    while min(image.width(), image.height()) // 2 >= min_size:
+        image = image.scaled(
+            image.width() // 2,
+            image.height() // 2,
+            QtCore.Qt.IgnoreAspectRatio,
+            QtCore.Qt.SmoothTransformation
+        )
+        levels.append(image)
+    return levels
+
+
+def nearest_level(levels, width, height):
+    '''Returns the smallest of levels, largest first, still covering a
+    width by height rectangle. Falls back to the largest level.'''
+
+    for level in reversed(levels):
+        if level.width() >= width and level.height() >= height:
+            return level
+    return levels[0]
+
+
+class ImageLoader(QtCore.QObject):
+    '''Decodes images on a pool of worker threads. Each widget only receives
+    the image it requested last, requests superseded by a newer one are
+    cancelled or their results dropped.
+
+    :param max_workers: Number of decoding threads
+    '''
+
+    loaded = QtCore.Signal(object, int, object, object)
+
+    def __init__(self, max_workers=2, parent=None):
+        super(ImageLoader, self).__init__(parent)
+        self.max_workers = max_workers
+        self._executor = None
+        self._futures = {}
+        self._generation = 0
+        self.loaded.connect(self._apply)
+
+    @property
+    def executor(self):
+        if self._executor is None and ThreadPoolExecutor is not None:
+            self._executor = ThreadPoolExecutor(self.max_workers)
+        return self._executor
+
+    def load(self, widget, path, size=None):
+        '''Decode path and pass the image to widget.set_loaded_image once
+        done. Supersedes all pending requests of widget.'''
+
+        self.cancel(widget)
+        self._generation += 1
+        widget._image_generation = self._generation
+
+        if self.executor is None:  # No thread pool available, block
+            key, image = read_image(path, size)
+            self._apply(widget, self._generation, key, image)
+            return
+
+        # Register the request first, the callback runs right away when the
+        # image is decoded before it is added.
+        future = self.executor.submit(read_image, path, size)
+        self._futures[id(widget)] = future
+        future.add_done_callback(self._on_done(widget, self._generation))
+
+    def cancel(self, widget):
+        '''Cancel the pending request of widget.'''
+
+        widget._image_generation = None
+        future = self._futures.pop(id(widget), None)
+        if future is not None:
+            future.cancel()
+
+    def _on_done(self, widget, generation):
+        def on_done(future):
+            if future.cancelled():
+                return
+            if future.exception():
+                key, image = None, None
+            else:
+                key, image = future.result()
+            self.loaded.emit(widget, generation, key, image)
+        return on_done
+
+    def _apply(self, widget, generation, key, image):
+        try:
+            if generation != widget._image_generation:
+                return  # A newer image has been requested
+            self._futures.pop(id(widget), None)
+            widget._image_generation = None
+            if image is not None and not image.isNull():
+                with cache_lock:
+                    image_cache.set(key, image)
+            widget.set_loaded_image(key, image)
+        except RuntimeError:
+            pass  # Widget was deleted while decoding
+
+    def shutdown(self, wait=True):
+        '''Stop the worker threads.'''
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+_loader = None
+
+
+def get_loader():
+    '''Returns the ImageLoader shared by all widgets.'''
+
+    global _loader
+    if _loader is None:
+        _loader = ImageLoader()
+    return _loader
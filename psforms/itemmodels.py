@@ -0,0 +1,376 @@
+'''
+psforms.itemmodels
+==================
+Item models backing controls with large numbers of items. Items are stored
+in flat python lists instead of per item Qt wrappers, rows are fetched from
+their source in batches as the view scrolls, labels are looked up in a dict
+and text filtering is backed by a trigram index.
+'''
+
+import itertools
+from array import array
+from Qt import QtCore
+
+# Editable combo boxes read the text of items with the EditRole
+_text_roles = (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole)
+
+
+def trigrams(text):
+    '''Returns the set of three character substrings of text.'''
+
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+class TextIndex(object):
+    '''Trigram index over a growing list of texts, used to find all texts
+    containing a substring without scanning every one of them. Postings are
+    stored as arrays of row numbers in ascending order.
+
+    :param texts: List of texts the index refers to
+    '''
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.size = 0
+        self._postings = {}
+        self.update()
+
+    def update(self):
+        '''Index texts appended to the list since the last update.'''
+
+        postings = self._postings
+        for row in range(self.size, len(self.texts)):
+            for gram in trigrams(self.texts[row].lower()):
+                rows = postings.get(gram)
+                if rows is None:
+                    rows = postings[gram] = array('l')
+                rows.append(row)
+        self.size = len(self.texts)
+
+    def search(self, text):
+        '''Returns the rows of all texts containing text, ignoring case.'''
+
+        text = text.lower()
+        texts = self.texts
+        grams = trigrams(text)
+        if grams:
+            postings = [self._postings.get(gram, ()) for gram in grams]
+            candidates = min(postings, key=len)
+        else:  # Too short to use the index
+            candidates = range(self.size)
+        return [row for row in candidates if text in texts[row].lower()]
+
+
+class ListModel(QtCore.QAbstractListModel):
+    '''List model fetching its items from an iterable in batches. Items are
+    labels or (label, data) tuples. Only the rows fetched so far are held in
+    memory, views request more as they scroll using :meth:`fetchMore`.
+
+    :param items: Iterable or generator of items
+    :param batch_size: Number of items fetched at once
+    '''
+
+    def __init__(self, items=None, batch_size=256, parent=None):
+        super(ListModel, self).__init__(parent)
+        self.batch_size = batch_size
+        self.set_items(items or ())
+
+    def set_items(self, items):
+        '''Replace all items of this model.'''
+
+        self.beginResetModel()
+        self._labels = []
+        self._data = []
+        self._rows = {}
+        self._source = iter(items)
+        self._exhausted = False
+        self._index = None
+        self._filter = ''
+        self._visible = None
+        self.endResetModel()
+
+    def extend(self, items):
+        '''Append items after all items of the current source.'''
+
+        if self._exhausted:
+            self._source = iter(items)
+        else:
+            self._source = itertools.chain(self._source, items)
+        self._exhausted = False
+        self.fetch()
+
+    def _pull(self, count):
+        '''Pull up to count items from the source. Returns the lists of
+        their labels and data, leaving the items of this model untouched.'''
+
+        labels = []
+        datas = []
+        for item in self._source:
+            if isinstance(item, tuple):
+                label, data = item
+            else:
+                label, data = item, None
+            labels.append(label)
+            datas.append(data)
+            if len(labels) >= count:
+                break
+        else:
+            self._exhausted = True
+        return labels, datas
+
+    def _append(self, labels, datas):
+        rows = self._rows
+        start = len(self._labels)
+        for i, label in enumerate(labels):
+            rows.setdefault(label, start + i)
+        self._labels.extend(labels)
+        self._data.extend(datas)
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not self._exhausted
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        self.fetch(self.batch_size)
+
+    def fetch(self, count=None):
+        '''Fetch count more items from the source, or all remaining items if
+        count is None.'''
+
+        if self._exhausted:
+            return
+
+        labels, datas = self._pull(count or float('inf'))
+        if not labels:
+            return
+
+        start = len(self._labels)
+        end = start + len(labels)
+        if self._visible is None:
+            self.beginInsertRows(QtCore.QModelIndex(), start, end - 1)
+            self._append(labels, datas)
+            self.endInsertRows()
+            return
+
+        self._append(labels, datas)  # Rows stay hidden until matched
+        self._index.update()
+        needle = self._filter.lower()
+        matches = [
+            row for row in range(start, end)
+            if needle in self._labels[row].lower()
+        ]
+        if matches:
+            first = len(self._visible)
+            self.beginInsertRows(
+                QtCore.QModelIndex(), first, first + len(matches) - 1
+            )
+            self._visible.extend(matches)
+            self.endInsertRows()
+
+    def fetch_row(self, row):
+        '''Fetch items from the source until the source row is available.
+        Returns False if the source holds fewer items.'''
+
+        missing = row + 1 - len(self._labels)
+        if missing > 0:
+            self.fetch(missing)
+        return 0 <= row < len(self._labels)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self._visible is None:
+            return len(self._labels)
+        return len(self._visible)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.source_row(index.row())
+        if role in _text_roles:
+            return self._labels[row]
+        if role == QtCore.Qt.UserRole:
+            return self._data[row]
+        return None
+
+    def source_row(self, row):
+        '''Maps a row of this model to a row of its unfiltered items.'''
+
+        if self._visible is None:
+            return row
+        return self._visible[row]
+
+    def model_rows(self, rows):
+        '''Maps rows of the unfiltered items to rows of this model, leaving
+        out rows that are filtered out.'''
+
+        if self._visible is None:
+            return list(rows)
+        lookup = dict((row, i) for i, row in enumerate(self._visible))
+        return [lookup[row] for row in rows if row in lookup]
+
+    def find(self, label):
+        '''Returns the source row of label, fetching items from the source
+        until it is found. Returns -1 if no item has this label.'''
+
+        row = self._rows.get(label)
+        while row is None and not self._exhausted:
+            self.fetch(self.batch_size)
+            row = self._rows.get(label)
+        return -1 if row is None else row
+
+    def label(self, row):
+        return self._labels[row]
+
+    def item_data(self, row):
+        return self._data[row]
+
+    @property
+    def filter(self):
+        '''Only items with labels containing this text are shown.'''
+
+        return self._filter
+
+    @filter.setter
+    def filter(self, text):
+        if text == self._filter:
+            return
+
+        self.beginResetModel()
+        self._filter = text
+        self._visible = self.search(text) if text else None
+        self.endResetModel()
+
+    def search(self, text):
+        '''Returns the source rows of all fetched items with labels containing
+        text, ignoring case.'''
+
+        if self._index is None:
+            self._index = TextIndex(self._labels)
+        self._index.update()
+        return self._index.search(text)
+
+
+class OptionModel(ListModel):
+    '''Options of combo box controls. A single OptionModel may be passed as
+    the options of any number of controls, they then share its items and its
+    index. Models registered by name are available through :meth:`shared`.
+    '''
+
+    _shared = {}
+
+    @classmethod
+    def shared(cls, name, options=None):
+        '''Returns the OptionModel registered as name. If options are given
+        the model is created, or its items are replaced.'''
+
+        model = cls._shared.get(name)
+        if model is None:
+            model = cls._shared[name] = cls(options)
+        elif options is not None:
+            model.set_items(options)
+        return model
+
+
+class FilterModel(QtCore.QAbstractListModel):
+    '''Read only view of the items of a :class:`ListModel` containing some
+    text. Unlike :attr:`ListModel.filter` it leaves the source untouched, so
+    a shared source may be filtered differently by each control.
+
+    :param source: Unfiltered ListModel
+    '''
+
+    def __init__(self, source, parent=None):
+        super(FilterModel, self).__init__(parent)
+        self.source = source
+        self._text = ''
+        self._rows = None
+        source.modelReset.connect(self.refresh)
+        source.rowsAboutToBeInserted.connect(self._before_insert)
+        source.rowsInserted.connect(self._after_insert)
+
+    def _before_insert(self, parent, first, last):
+        if self._rows is None:
+            self.beginInsertRows(QtCore.QModelIndex(), first, last)
+
+    def _after_insert(self, parent, first, last):
+        if self._rows is None:
+            self.endInsertRows()
+        else:
+            self._add_matches(first, last)
+
+    def _add_matches(self, first, last):
+        needle = self._text.lower()
+        label = self.source.label
+        matches = [
+            row for row in range(first, last + 1)
+            if needle in label(row).lower()
+        ]
+        if matches:
+            start = len(self._rows)
+            self.beginInsertRows(
+                QtCore.QModelIndex(), start, start + len(matches) - 1
+            )
+            self._rows.extend(matches)
+            self.endInsertRows()
+
+    def set_filter(self, text):
+        '''Only show items containing text.'''
+
+        self._text = text
+        self.refresh()
+
+    def refresh(self, *args):
+        '''Filter the items fetched by the source so far. Items fetched
+        later are filtered as they arrive.'''
+
+        self.beginResetModel()
+        if self._text:
+            self._rows = self.source.search(self._text)
+        else:
+            self._rows = None
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return self.source.canFetchMore()
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if self._rows is None:
+            self.source.fetchMore()
+            return
+
+        # Views only ask for more once rows were added, so keep fetching
+        # batches until one of them holds a match.
+        count = len(self._rows)
+        while len(self._rows) == count and self.source.canFetchMore():
+            self.source.fetchMore()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self._rows is None:
+            return len(self.source._labels)
+        return len(self._rows)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if self._rows is not None:
+            row = self._rows[row]
+        if role in _text_roles:
+            return self.source.label(row)
+        if role == QtCore.Qt.UserRole:
+            return self.source.item_data(row)
+        return None
+
+
+def merge_rows(rows):
+    '''Merges rows into a list of inclusive (first, last) ranges.'''
+
+    ranges = []
+    for row in sorted(rows):
+        if ranges and ranges[-1][1] + 1 >= row:
+            ranges[-1][1] = max(ranges[-1][1], row)
+        else:
+            ranges.append([row, row])
+    return [tuple(r) for r in ranges]
@@ -0,0 +1,214 @@
+'''
+psforms.model
+=============
+Validate and normalize plain records against a :class:`Form` schema without
+Qt. A :class:`FormModel` uses the same :class:`FieldType` definitions,
+defaults and compiled validator chains as the controls of the form, so a
+record passing :meth:`FormModel.validate` passes validation in a dialog.
+Values of IntFields and FloatFields are also checked against their range,
+which their spin box controls enforce by clamping.
+'''
+
+from copy import deepcopy
+from .exc import FieldNotFound, ValidationError
+from .validators import default_message
+
+try:
+    string_types = (str, unicode)
+except NameError:
+    string_types = (str,)
+
+_true = ('1', 'true', 'yes', 'on')
+_false = ('', '0', 'false', 'no', 'off')
+
+
+def _to_bool(value):
+    if isinstance(value, string_types):
+        text = value.strip().lower()
+        if text in _true:
+            return True
+        if text in _false:
+            return False
+        raise ValueError(value)
+    return bool(value)
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        if isinstance(value, string_types):
+            number = float(value)
+            if number.is_integer():
+                return int(number)
+        raise
+
+
+def _to_str(value):
+    if isinstance(value, string_types):
+        return value
+    return str(value)
+
+
+def _to_list(value):
+    if isinstance(value, string_types):
+        return [value]
+    return list(value)
+
+
+_converters = {
+    bool: _to_bool,
+    int: _to_int,
+    float: float,
+    str: _to_str,
+    list: _to_list,
+}
+
+
+def _run_chain(chain, value):
+    '''Returns the error of value in chain, like the chain itself does. A
+    value of the wrong type, like a number in a regex checked field, fails
+    with :data:`~psforms.validators.default_message` instead of raising.'''
+
+    try:
+        return chain(value)
+    except (TypeError, ValueError):
+        return default_message
+
+
+def converter(field):
+    '''Returns a function converting a value to the value_type of field.
+    Fields holding pairs of values, like Int2Field, convert each item.'''
+
+    value_type = field.value_type
+    if value_type is None:
+        return None
+
+    convert = _converters.get(value_type, value_type)
+    if isinstance(field.get_default(), tuple):
+        def convert_items(value):
+            return tuple(convert(item) for item in value)
+        return convert_items
+    return convert
+
+
+class FormModel(object):
+    '''Headless counterpart of a Form class. Field definitions are compiled
+    once: each field's default, compiled validator chain and value converter
+    are looked up on creation, leaving a flat loop per record.
+
+    Use :meth:`Form.as_model` to get the shared FormModel of a Form.
+
+    :param form: Form class
+    '''
+
+    def __init__(self, form):
+        self.form = form
+        self.fields = []
+        self._mutable = set()
+        for name, field in form.fields():
+            chain = field.chain if field.get_validators() else None
+            default = field.get_default()
+            if isinstance(default, (list, dict, set)):
+                self._mutable.add(name)
+            self.fields.append((name, default, chain, converter(field)))
+        self.forms = [(name, FormModel(subform))
+                      for name, subform in form.forms()]
+        self.names = set(name for name, _, _, _ in self.fields)
+        self.names.update(name for name, _ in self.forms)
+
+    def defaults(self):
+        '''Returns a record holding the default value of every field.'''
+
+        data = {}
+        for name, default, _, _ in self.fields:
+            data[name] = deepcopy(default)
+        for name, model in self.forms:
+            data[name] = model.defaults()
+        return data
+
+    def validate(self, record):
+        '''Validate record, a dict like :meth:`FormWidget.get_value`
+        returns. Missing and None values are validated with their fields
+        default value, like :meth:`coerce` replaces them. Values of the
+        wrong type fail with :data:`~psforms.validators.default_message`.
+
+        :returns: Dict of error messages by field name, with nested dicts
+            for subforms. Empty if record is valid.
+        '''
+
+        errors = {}
+        get = record.get
+        for name, default, chain, _ in self.fields:
+            if chain is None:
+                continue
+            value = get(name)
+            value = default if value is None else value
+            error = _run_chain(chain, value)
+            if error is not None:
+                errors[name] = error
+
+        for name, model in self.forms:
+            suberrors = model.validate(get(name) or {})
+            if suberrors:
+                errors[name] = suberrors
+        return errors
+
+    def is_valid(self, record):
+        '''Returns True if record is valid, stopping at the first error.'''
+
+        get = record.get
+        for name, default, chain, _ in self.fields:
+            if chain is None:
+                continue
+            value = get(name)
+            value = default if value is None else value
+            if _run_chain(chain, value) is not None:
+                return False
+
+        for name, model in self.forms:
+            if not model.is_valid(get(name) or {}):
+                return False
+        return True
+
+    def coerce(self, record, strict=False):
+        '''Returns a normalized copy of record. Values are converted to the
+        value_type of their field, missing and None values are replaced by
+        defaults and unknown names are dropped.
+
+        :param strict: Raise FieldNotFound for unknown names
+        :raises ValidationError: If a value can not be converted
+        '''
+
+        if strict:
+            for name in record:
+                if name not in self.names:
+                    raise FieldNotFound(name + ' does not exist')
+
+        data = {}
+        get = record.get
+        mutable = self._mutable
+        for name, default, _, convert in self.fields:
+            value = get(name)
+            if value is None:
+                if name in mutable:
+                    default = deepcopy(default)
+                data[name] = default
+            elif convert is None:
+                data[name] = value
+            else:
+                try:
+                    data[name] = convert(value)
+                except (TypeError, ValueError):
+                    raise ValidationError(
+                        '{}: invalid value {!r}'.format(name, value)
+                    )
+
+        for name, model in self.forms:
+            value = get(name)
+            if value is not None and not isinstance(value, dict):
+                raise ValidationError(
+                    '{}: expected a dict, got {!r}'.format(name, value)
+                )
+            data[name] = model.coerce(value or {}, strict)
+        return data
@@ -0,0 +1,342 @@
+'''
+psforms.parallel
+================
+Validate large sets of records on a pool of processes.
+
+The form is converted to plain data by :func:`form_schema`, shipped to each
+worker process once when it starts and rebuilt there with
+:func:`psforms.form.generate_form`. Records are then sent in chunks and the
+errors of every record stream back as they are validated. Process pools
+without initializers, before Python 3.7, send the schema along with every
+chunk instead, workers still rebuild the form only once.
+
+Builtin validators are shipped as their specs, validators made by factories
+like :func:`psforms.validators.matches_filters` as the factory and its
+arguments. All other validators must be picklable, that is module level
+functions or instances of module level classes.
+'''
+
+import os
+import pickle
+import sys
+import uuid
+from collections import deque
+from .fields import field_map
+from .form import generate_form
+from .validators import ValidationError, _fuse
+try:
+    from concurrent.futures import (
+        ProcessPoolExecutor, wait, FIRST_COMPLETED
+    )
+except ImportError:
+    ProcessPoolExecutor = None
+
+
+def cpu_count():
+    '''Returns the number of cores usable by this process.'''
+
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    import multiprocessing
+    count = multiprocessing.cpu_count()
+    if sys.platform == 'win32':
+        return min(count, 61)  # ProcessPoolExecutor limit on Windows
+    return count
+
+
+class SpecValidator(object):
+    '''Picklable validator performing the check of a builtin validator spec,
+    like ('min_length', 3, 'Min Length 3').'''
+
+    def __init__(self, spec):
+        self.spec = spec
+        self._check = _fuse((spec,))
+
+    def __getstate__(self):
+        return self.spec
+
+    def __setstate__(self, spec):
+        self.__init__(spec)
+
+    def __call__(self, value):
+        error = self._check(value)
+        if error:
+            raise ValidationError(error)
+        return True
+
+
+def dump_validator(validator):
+    '''Returns validator as picklable data, see :func:`load_validator`.
+
+    :raises ValueError: If validator can not be pickled
+    '''
+
+    spec = getattr(validator, 'spec', None)
+    if spec is not None:
+        return ('spec', spec)
+    factory = getattr(validator, 'factory', None)
+    if factory is not None:
+        return ('factory', factory)
+    try:
+        pickle.dumps(validator, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        raise ValueError(
+            'Validator {!r} can not be pickled, use a module level '
+            'function instead'.format(validator)
+        )
+    return ('object', validator)
+
+
+def load_validator(data):
+    '''Rebuild a validator from the output of :func:`dump_validator`.'''
+
+    kind, value = data
+    if kind == 'spec':
+        return SpecValidator(value)
+    if kind == 'factory':
+        factory, args = value
+        return factory(*args)
+    return value
+
+
+def _dump_kwarg(name, key, value):
+    if hasattr(value, 'fetch_row'):
+        return None  # Shared OptionModel, defaults are resolved already
+    if hasattr(value, '__iter__') and iter(value) is value:
+        raise ValueError(
+            '{}: {} is an iterator, pass a list instead'.format(name, key)
+        )
+    try:
+        pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        raise ValueError('{}: {} can not be pickled'.format(name, key))
+    return value
+
+
+def form_schema(form):
+    '''Returns form as a list of field dicts for :func:`generate_form`,
+    holding only picklable values. Every field has its default resolved and
+    its validators converted by :func:`dump_validator`. Subforms are
+    included as fields of type "form".
+
+    :raises ValueError: If a field, validator or control argument can not
+        be shipped to another process. Control arguments given as
+        iterators, like generator options, are rejected, reading them would
+        leave nothing for the controls of the form.
+    '''
+
+    fields = []
+    for name, field in form.fields():
+        field_type = type(field).__name__
+        if field_map.get(field_type) is not type(field):
+            raise ValueError(
+                '{}: {} can not be generated'.format(name, field_type)
+            )
+
+        data = {
+            'type': field_type,
+            'name': name,
+            'label': field.nice_name,
+            'default': field.get_default(),
+            'validators': [dump_validator(v) for v in field.validators or ()],
+        }
+        for key in field.control_defaults or ():
+            value = field.control_kwargs.get(key)
+            if value is not None:
+                value = _dump_kwarg(name, key, value)
+            if value is not None:
+                data[key] = value
+        fields.append(data)
+
+    for name, subform in form.forms():
+        fields.append({
+            'type': 'form',
+            'name': name,
+            'title': subform.meta.title,
+            'fields': form_schema(subform),
+        })
+    return fields
+
+
+def load_schema(name, schema):
+    '''Rebuild a form from the output of :func:`form_schema`.'''
+
+    return generate_form(name, _load_fields(schema))
+
+
+def _load_fields(schema):
+    fields = []
+    for field in schema:
+        field = dict(field)
+        if field['type'] == 'form':
+            field['fields'] = _load_fields(field['fields'])
+        else:
+            field['validators'] = [
+                load_validator(v) for v in field['validators']
+            ]
+        fields.append(field)
+    return fields
+
+
+_worker_model = None
+_worker_token = None
+
+
+def _init_worker(token, name, schema):
+    global _worker_model, _worker_token
+    _worker_model = load_schema(name, schema).as_model()
+    _worker_token = token
+
+
+def _validate_chunk(start, records, init_args=None):
+    if init_args is not None and init_args[0] != _worker_token:
+        _init_worker(*init_args)
+    validate = _worker_model.validate
+    return start, [validate(record) for record in records]
+
+
+def _chunks(records, chunk_size):
+    chunk = []
+    start = 0
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield start, chunk
+            start += chunk_size
+            chunk = []
+    if chunk:
+        yield start, chunk
+
+
+class ParallelValidator(object):
+    '''Validates records against a Form class on a pool of processes. The
+    pool is started on first use and kept until :meth:`shutdown`, it may be
+    used as a context manager.
+
+    Without concurrent.futures records are validated in this process.
+
+    :param form: Form class
+    :param max_workers: Number of processes, defaults to all cores
+    :param chunk_size: Number of records sent to a worker at once
+    :param ordered: Yield results in the order of the records, otherwise as
+        soon as their chunk is done
+    :param prefetch: Chunks queued per worker, bounds the number of records
+        held in memory
+    :raises ValueError: If chunk_size or prefetch is less than 1
+    '''
+
+    def __init__(self, form, max_workers=None, chunk_size=256, ordered=True,
+                 prefetch=2):
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be at least 1')
+        if prefetch < 1:
+            raise ValueError('prefetch must be at least 1')
+
+        self.form = form
+        self.max_workers = max_workers or cpu_count()
+        self.chunk_size = chunk_size
+        self.ordered = ordered
+        self.prefetch = prefetch
+        self.schema = form_schema(form)
+        self._executor = None
+        self._init_args = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    @property
+    def executor(self):
+        if self._executor is None and ProcessPoolExecutor is not None:
+            init_args = (uuid.uuid4().hex, self.form.__name__, self.schema)
+            try:
+                self._executor = ProcessPoolExecutor(
+                    self.max_workers,
+                    initializer=_init_worker,
+                    initargs=init_args,
+                )
+                self._init_args = None
+            except TypeError:  # No initializers, send the schema along
+                self._executor = ProcessPoolExecutor(self.max_workers)
+                self._init_args = init_args
+        return self._executor
+
+    def validate(self, records):
+        '''Validate records, dicts like :meth:`FormModel.validate` accepts,
+        in chunks. records may be any iterable and is consumed lazily.
+
+        :returns: Iterator of (index, errors) tuples, errors being an empty
+            dict for valid records
+        '''
+
+        chunks = _chunks(records, self.chunk_size)
+        if self.executor is None:  # No process pool available, block
+            model = self.form.as_model()
+            for start, chunk in chunks:
+                for i, record in enumerate(chunk):
+                    yield start + i, model.validate(record)
+            return
+
+        if self.ordered:
+            results = self._ordered(chunks)
+        else:
+            results = self._unordered(chunks)
+        for start, errors in results:
+            for i, record_errors in enumerate(errors):
+                yield start + i, record_errors
+
+    def _submit(self, chunks, count):
+        futures = []
+        for start, chunk in chunks:
+            futures.append(self.executor.submit(
+                _validate_chunk, start, chunk, self._init_args
+            ))
+            if len(futures) == count:
+                break
+        return futures
+
+    def _ordered(self, chunks):
+        limit = self.max_workers * self.prefetch
+        pending = deque(self._submit(chunks, limit))
+        while pending:
+            result = pending.popleft().result()
+            pending.extend(self._submit(chunks, 1))
+            yield result
+
+    def _unordered(self, chunks):
+        limit = self.max_workers * self.prefetch
+        pending = set(self._submit(chunks, limit))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            pending.update(self._submit(chunks, len(done)))
+            for future in done:
+                yield future.result()
+
+    def invalid(self, records):
+        '''Returns an iterator of (index, errors) tuples of invalid records
+        only.'''
+
+        for index, errors in self.validate(records):
+            if errors:
+                yield index, errors
+
+    def shutdown(self, wait=True):
+        '''Stop the worker processes.'''
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+def validate_parallel(form, records, **kwargs):
+    '''Validate records against form on a temporary pool of processes.
+    Takes the keyword arguments of :class:`ParallelValidator`.
+
+    :returns: Iterator of (index, errors) tuples
+    '''
+
+    with ParallelValidator(form, **kwargs) as validator:
+        for result in validator.validate(records):
+            yield result
@@ -0,0 +1,216 @@
+'''
+psforms.paths
+=============
+Path completion for browse controls that never touches the filesystem on
+the GUI thread.
+
+Directories are listed by a :class:`DirectoryScanner` on a worker thread.
+Entries are delivered in chunks as they are read and complete listings are
+kept in a small cache for a few seconds, so typing into a path on a slow
+network mount only costs one listing per directory.
+'''
+
+import os
+from Qt import QtCore, QtWidgets
+from . import utils
+from .itemmodels import ListModel
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+
+def iter_directory(directory):
+    '''Yields (name, is_dir) tuples of the entries of directory. Uses
+    scandir when available, which avoids a stat call per entry on most
+    platforms.'''
+
+    if scandir is None:
+        for name in os.listdir(directory):
+            yield name, os.path.isdir(os.path.join(directory, name))
+        return
+
+    for entry in scandir(directory):
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        yield entry.name, is_dir
+
+
+_missing = object()
+
+
+class DirectoryScanner(QtCore.QObject):
+    '''Lists directories on worker threads. Emits found(directory, entries)
+    for every chunk of entries read, and for all entries at once when the
+    listing is cached. Directories that can not be listed are cached as
+    None.
+
+    :param max_workers: Number of worker threads
+    :param chunk_size: Number of entries per found signal
+    :param maxsize: Maximum number of cached listings
+    :param ttl: Seconds listings stay cached
+    '''
+
+    found = QtCore.Signal(str, object)
+    finished = QtCore.Signal(str, bool)
+    _listed = QtCore.Signal(str, object, object)
+
+    def __init__(self, max_workers=2, chunk_size=256, maxsize=64, ttl=10,
+                 parent=None):
+        super(DirectoryScanner, self).__init__(parent)
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.cache = utils.LRUCache(maxsize=maxsize, ttl=ttl)
+        self._executor = None
+        self._pending = {}
+        self._listed.connect(self._on_listed)
+
+    @property
+    def executor(self):
+        if self._executor is None and ThreadPoolExecutor is not None:
+            self._executor = ThreadPoolExecutor(self.max_workers)
+        return self._executor
+
+    def exists(self, directory):
+        '''Returns True or False if directory is known to exist or not,
+        None if it has not been listed recently.'''
+
+        entries = self.cache.get(directory, _missing)
+        if entries is _missing:
+            return True if directory in self._pending else None
+        return entries is not None
+
+    def scan(self, directory):
+        '''List directory in the background. Cached listings and the chunks
+        already read by a running listing are emitted right away.'''
+
+        entries = self.cache.get(directory, _missing)
+        if entries is not _missing:
+            if entries:
+                self.found.emit(directory, entries)
+            self.finished.emit(directory, entries is not None)
+            return
+
+        if directory in self._pending:
+            if self._pending[directory]:
+                self.found.emit(directory, list(self._pending[directory]))
+            return
+
+        self._pending[directory] = []
+        if self.executor is None:  # No thread pool available, block
+            self._scan(directory)
+        else:
+            self.executor.submit(self._scan, directory)
+
+    def _scan(self, directory):
+        chunk = []
+        listed = False
+        try:
+            for entry in iter_directory(directory):
+                chunk.append(entry)
+                if len(chunk) >= self.chunk_size:
+                    self._listed.emit(directory, chunk, False)
+                    chunk = []
+            listed = True
+        except OSError:
+            pass
+        finally:
+            # Always finish the listing, a directory left pending is never
+            # scanned again. Unexpected errors still propagate.
+            if listed:
+                self._listed.emit(directory, chunk, True)
+            else:
+                self._listed.emit(directory, None, True)
+
+    def _on_listed(self, directory, chunk, done):
+        entries = self._pending.get(directory)
+        if entries is None:
+            return
+
+        if chunk is None:  # Listing failed
+            del self._pending[directory]
+            self.cache.set(directory, None)
+            self.finished.emit(directory, False)
+            return
+
+        entries.extend(chunk)
+        if chunk:
+            self.found.emit(directory, chunk)
+        if done:
+            del self._pending[directory]
+            self.cache.set(directory, entries)
+            self.finished.emit(directory, True)
+
+    def shutdown(self, wait=True):
+        '''Stop the worker threads.'''
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+_scanner = None
+
+
+def get_scanner():
+    '''Returns the DirectoryScanner shared by all controls.'''
+
+    global _scanner
+    if _scanner is None:
+        _scanner = DirectoryScanner()
+    return _scanner
+
+
+class PathCompleter(QtWidgets.QCompleter):
+    '''Completes the paths typed into a QLineEdit. Whenever the directory
+    part of the text changes it is listed by the shared scanner and its
+    entries are added to the completion popup as they arrive.
+
+    :param line_edit: QLineEdit to complete
+    :param dirs_only: Only complete directories
+    '''
+
+    def __init__(self, line_edit, dirs_only=False):
+        super(PathCompleter, self).__init__(line_edit)
+        self.line_edit = line_edit
+        self.dirs_only = dirs_only
+        self.directory = None
+        self.path_model = ListModel(parent=self)
+        self.setModel(self.path_model)
+        self.setCaseSensitivity(QtCore.Qt.CaseInsensitive)
+        self.popup().setUniformItemSizes(True)
+
+        scanner = get_scanner()
+        scanner.found.connect(self._found)
+        line_edit.setCompleter(self)
+        line_edit.textEdited.connect(self.update_path)
+
+    def update_path(self, text):
+        directory = os.path.dirname(text)
+        if not directory or directory == self.directory:
+            return
+
+        self.directory = directory
+        self.path_model.set_items(())
+        get_scanner().scan(directory)
+
+    def _found(self, directory, entries):
+        if directory != self.directory:
+            return
+
+        join = os.path.join
+        self.path_model.extend(
+            join(directory, name) for name, is_dir in entries
+            if is_dir or not self.dirs_only
+        )
+        if self.line_edit.hasFocus():
+            self.complete()
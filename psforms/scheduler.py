@@ -0,0 +1,124 @@
+'''
+psforms.scheduler
+=================
+Schedules control validation off the critical path of user input.
+
+Every change to a control restarts its debounce timer. When the timer fires
+the controls cheap validators run on the GUI thread. If they pass, its
+expensive validators (see :func:`psforms.validators.expensive`) run on a
+thread pool. Results are applied to the control on the GUI thread. A newer
+value always wins, results computed for an older value are dropped.
+'''
+
+from Qt import QtCore
+from .validators import default_message
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+
+class ValidationScheduler(QtCore.QObject):
+    '''Debounces control validation and runs expensive validators on a pool
+    of worker threads.
+
+    :param max_workers: Number of worker threads for expensive validators
+    '''
+
+    finished = QtCore.Signal(object, int, object)
+
+    def __init__(self, max_workers=4, parent=None):
+        super(ValidationScheduler, self).__init__(parent)
+        self.max_workers = max_workers
+        self._executor = None
+        self.finished.connect(self._apply)
+
+    @property
+    def executor(self):
+        if self._executor is None and ThreadPoolExecutor is not None:
+            self._executor = ThreadPoolExecutor(self.max_workers)
+        return self._executor
+
+    def schedule(self, control):
+        '''Validate control once its debounce interval passed without any
+        further changes. Without a debounce interval validate right away.'''
+
+        control._validation_generation += 1
+        if not control.debounce:
+            self.run(control)
+            return
+
+        timer = control._validation_timer
+        if timer is None:
+            timer = QtCore.QTimer(control)
+            timer.setSingleShot(True)
+            timer.timeout.connect(lambda: self.run(control))
+            control._validation_timer = timer
+        timer.start(control.debounce)
+
+    def run(self, control):
+        '''Validate the current value of control now.'''
+
+        if not control.validators:
+            return
+
+        generation = control._validation_generation
+        value = control.get_value()
+
+        error = control.cheap_chain(value)
+        costly = control.expensive_chain
+        if error is not None or not costly:
+            control.set_error(error)
+            return
+
+        if control._validation_future is not None:
+            control._validation_future.cancel()
+            control._validation_future = None
+
+        if self.executor is None:  # No thread pool available, block
+            control.set_error(costly(value))
+            return
+
+        future = self.executor.submit(costly, value)
+        future.add_done_callback(self._on_done(control, generation))
+        control._validation_future = future
+
+    def _on_done(self, control, generation):
+        def on_done(future):
+            if future.cancelled():
+                return
+            exc = future.exception()
+            if exc is not None:
+                error = str(exc) or default_message
+            else:
+                error = future.result()
+            self.finished.emit(control, generation, error)
+        return on_done
+
+    def _apply(self, control, generation, error):
+        try:
+            if generation != control._validation_generation:
+                return  # A newer value has been scheduled
+            control._validation_future = None
+            control.set_error(error)
+        except RuntimeError:
+            pass  # Control was deleted while validating
+
+    def shutdown(self, wait=True):
+        '''Stop the worker threads.'''
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+_scheduler = None
+
+
+def get_scheduler():
+    '''Returns the ValidationScheduler shared by all controls.'''
+
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ValidationScheduler()
+    return _scheduler
@@ -1,6 +1,11 @@
 '''
 General purpose classes and functions.
 '''
+import time
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
 
 
 def itemattrgetter(index, attr):
@@ -21,3 +26,121 @@ class Ordered(object):
     def __init__(self):
         Ordered._count += 1
         self._order = self._count
+
+
+def with_metaclass(meta, *bases):
+    '''Create a base class with a metaclass. Works in Python 2 and 3.'''
+
+    class metaclass(meta):
+
+        def __new__(cls, name, this_bases, attrs):
+            return meta(name, bases, attrs)
+
+    return type.__new__(metaclass, 'temporary_class', (), {})
+
+
+def flatten(data):
+    '''Flattens a dict of form values, merging the values of subforms into
+    the top level dict just like FormWidget.get_value(flatten=True).'''
+
+    flat = {}
+    for name, value in data.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value))
+        else:
+            flat[name] = value
+    return flat
+
+
+class LRUCache(object):
+    '''A mapping holding at most maxsize items. Looking up or storing a key
+    makes it the most recently used. Once full, storing a new key evicts the
+    least recently used one.
+
+    When weigh is given, items are additionally evicted until their total
+    weight is no more than maxweight. An item heavier than maxweight on its
+    own is not stored at all.
+
+    When ttl is given, items expire ttl seconds after they were stored.
+
+    :param maxsize: Maximum number of items
+    :param maxweight: Maximum total weight of all items
+    :param weigh: Callable returning the weight of a value
+    :param ttl: Seconds items stay valid
+    '''
+
+    def __init__(self, maxsize=128, maxweight=None, weigh=None, ttl=None):
+        self.maxsize = maxsize
+        self.maxweight = maxweight
+        self.weigh = weigh
+        self.ttl = ttl
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._weights = {}
+        self._expires = {}
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        if key in self._expires and self._expires[key] < time.time():
+            self.pop(key)
+        return key in self._data
+
+    def get(self, key, default=None):
+        if key in self._expires and self._expires[key] < time.time():
+            self.pop(key)
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data[key] = value
+        return value
+
+    def set(self, key, value):
+        self.pop(key)
+        if self.weigh is not None:
+            weight = self.weigh(value)
+            if self.maxweight is not None and weight > self.maxweight:
+                return
+            self._weights[key] = weight
+            self.weight += weight
+        if self.ttl is not None:
+            self._expires[key] = time.time() + self.ttl
+        self._data[key] = value
+        self.trim()
+
+    def pop(self, key, default=None):
+        self.weight -= self._weights.pop(key, 0)
+        self._expires.pop(key, None)
+        return self._data.pop(key, default)
+
+    def trim(self):
+        '''Evict least recently used items until the cache is within its
+        limits. Call after lowering maxsize or maxweight.'''
+
+        while len(self._data) > self.maxsize or (
+                self.maxweight is not None and self.weight > self.maxweight):
+            key, _ = self._data.popitem(last=False)
+            self.weight -= self._weights.pop(key, 0)
+            self._expires.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+        self._weights.clear()
+        self._expires.clear()
+        self.weight = 0
+
+    def stats(self):
+        '''Returns a dict of hits, misses, items and total weight.'''
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'items': len(self._data),
+            'weight': self.weight,
+        }
@@ -2,17 +2,31 @@
 Standard Validators
 ===================
 '''
+import fnmatch
+import os
 import re
+import stat
+import threading
 from .exc import ValidationError
+from .utils import LRUCache
+
+__all__ = [
+    'ValidationError', 'regex', 'checked', 'email', 'required', 'min_length',
+    'max_length', 'in_range', 'expensive', 'is_expensive', 'exists', 'is_dir',
+    'writable', 'matches_filters', 'run_validators', 'ValidatorChain',
+    'compile_chain',
+]
 
 
 def regex(rstr, msg='Does not match regex'):
     r = re.compile(rstr)
+
     def check_string(value):
         match = r.search(value)
         if not match:
             raise ValidationError(msg)
         return True
+    check_string.spec = ('regex', r, msg)
     return check_string
 
 
@@ -22,32 +36,345 @@ def checked(value):
     return True
 
 
+checked.spec = ('required', None, 'Must be checked')
+
+
+email_regex = re.compile(r'^[\w\d!#$%^&*(){\-_}|]+@[\w\d\-_]+[.][a-z]{2,4}')
+
+
 def email(value):
-    r = re.compile(r'^[\w\d!#$%^&*(){\-_}|]+@[\w\d\-_]+[.][a-z]{2,4}')
-    match = r.search(value)
+    match = email_regex.search(value)
     if not match:
         raise ValidationError('Not a valid email address')
     return True
 
 
+email.spec = ('regex', email_regex, 'Not a valid email address')
+
+
 def required(value):
     if not bool(value):
         raise ValidationError('Missing required field')
     return True
 
 
+required.spec = ('required', None, 'Missing required field')
+
+
 def min_length(num_characters):
 
+    msg = 'Min Length {0}'.format(num_characters)
+
     def check_length(value):
         if len(value) < num_characters:
-            raise ValidationError('Min Length {0}'.format(num_characters))
+            raise ValidationError(msg)
+    check_length.spec = ('min_length', num_characters, msg)
     return check_length
 
 
 def max_length(num_characters):
 
+    msg = 'Max Length {0}'.format(num_characters)
+
     def check_length(value):
         if len(value) > num_characters:
-            raise ValidationError('Max Length {0}'.format(num_characters))
+            raise ValidationError(msg)
+    check_length.spec = ('max_length', num_characters, msg)
     return check_length
 
+
+def range_error(value, low, high, msg):
+    '''Returns msg if value is a number outside of low and high, 'Not a
+    number' if it is no number at all, otherwise None.'''
+
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 'Not a number'
+    if low <= number <= high:
+        return None
+    return msg  # Also for NaN, which compares False with anything
+
+
+def in_range(low, high, msg=None):
+    '''Passes numbers from low to high. IntField and FloatField check their
+    range with it, see :meth:`FieldType.get_validators`.'''
+
+    if msg is None:
+        msg = 'Out of range {0} - {1}'.format(low, high)
+
+    def check_range(value):
+        error = range_error(value, low, high, msg)
+        if error is not None:
+            raise ValidationError(error)
+        return True
+    check_range.spec = ('range', (low, high), msg)
+    return check_range
+
+
+def expensive(validator):
+    '''Decorator marking a validator as expensive. Controls run expensive
+    validators on a worker thread, after all cheap validators passed, so
+    they never block the GUI. Coroutine functions are always expensive.'''
+
+    validator.expensive = True
+    return validator
+
+
+#: Results of filesystem queries made by path validators, kept for a couple
+#: of seconds so validating the same path on every keystroke and again on
+#: accept only hits the filesystem once.
+stat_cache = LRUCache(maxsize=1024, ttl=2)
+_stat_lock = threading.Lock()
+_missing = object()
+
+
+def _cached(key, fn, *args):
+    with _stat_lock:
+        result = stat_cache.get(key, _missing)
+    if result is _missing:
+        result = fn(*args)
+        with _stat_lock:
+            stat_cache.set(key, result)
+    return result
+
+
+def _stat(path):
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def cached_stat(path):
+    '''Returns os.stat(path) or None if path does not exist. Results are
+    cached in :data:`stat_cache`.'''
+
+    return _cached(('stat', path), _stat, path)
+
+
+def _writable(path):
+    if cached_stat(path) is not None:
+        return os.access(path, os.W_OK)
+    parent = os.path.dirname(path) or os.curdir
+    st = cached_stat(parent)
+    return bool(st and stat.S_ISDIR(st.st_mode) and os.access(parent, os.W_OK))
+
+
+@expensive
+def exists(value):
+    if not value or cached_stat(value) is None:
+        raise ValidationError('Path does not exist')
+    return True
+
+
+@expensive
+def is_dir(value):
+    st = cached_stat(value) if value else None
+    if st is None or not stat.S_ISDIR(st.st_mode):
+        raise ValidationError('Not a directory')
+    return True
+
+
+@expensive
+def writable(value):
+    '''Passes if value is a writable path, or could be created because its
+    parent directory is writable.'''
+
+    if not value or not _cached(('writable', value), _writable, value):
+        raise ValidationError('Path is not writable')
+    return True
+
+
+def matches_filters(filters, msg='Does not match file filters'):
+    '''Passes if the file name of value matches one of the filters. Filters
+    are glob patterns or file dialog filters like "Images (*.png *.jpg)".'''
+
+    patterns = []
+    for f in filters:
+        if '(' in f:
+            f = f[f.rindex('(') + 1:f.rindex(')')]
+        patterns.extend(p.lower() for p in f.split())
+
+    def check_filters(value):
+        name = os.path.basename(value).lower()
+        for pattern in patterns:
+            if fnmatch.fnmatchcase(name, pattern):
+                return True
+        raise ValidationError(msg)
+    check_filters.factory = (matches_filters, (filters, msg))
+    return check_filters
+
+
+CO_COROUTINE = 0x0080
+
+
+def is_coroutine_function(fn):
+    '''Returns True if fn is an async def function.'''
+
+    code = getattr(fn, '__code__', None)
+    return bool(code and code.co_flags & CO_COROUTINE)
+
+
+def is_expensive(validator):
+    '''Returns True if validator should run off the GUI thread.'''
+
+    if getattr(validator, 'expensive', False):
+        return True
+    return is_coroutine_function(validator)
+
+
+def _wait(coroutine):
+    import asyncio  # Only needed once a coroutine validator is used
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+#: Message of ValidationErrors raised without one.
+default_message = 'Invalid value'
+
+
+def run_validators(validators, value):
+    '''Run validators against value in order. Returns the message of the
+    first ValidationError raised, or None when all validators pass. Errors
+    raised without a message return :data:`default_message`. Coroutines
+    returned by validators are run to completion.'''
+
+    for v in validators:
+        try:
+            result = v(value)
+            if hasattr(result, '__await__'):
+                _wait(result)
+        except ValidationError as e:
+            return str(e) or default_message
+    return None
+
+
+def _fuse(specs):
+    '''Fuse the specs of consecutive builtin validators into one check.'''
+
+    def check(value):
+        length = None
+        for kind, arg, msg in specs:
+            if kind == 'required':
+                if not value:
+                    return msg
+            elif kind == 'regex':
+                if not arg.search(value):
+                    return msg
+            elif kind == 'range':
+                error = range_error(value, arg[0], arg[1], msg)
+                if error is not None:
+                    return error
+            else:
+                if length is None:
+                    length = len(value)
+                if kind == 'min_length':
+                    if length < arg:
+                        return msg
+                elif length > arg:
+                    return msg
+        return None
+    return check
+
+
+def _step(validator):
+    def check(value):
+        return run_validators((validator,), value)
+    return check
+
+
+class ValidatorChain(object):
+    '''A sequence of validators compiled into a single callable. Calling the
+    chain with a value returns the message of the first failing validator
+    or None.
+
+    Consecutive builtin validators (required, min_length, max_length, regex
+    and email) are fused into one check that uses their precompiled regexes
+    and computes the length of the value once. Results are memoized for the
+    cache_size most recently validated hashable values, unless the chain
+    contains expensive validators, whose results may change over time.
+
+    Use :func:`compile_chain` to share chains between controls and headless
+    validation.
+
+    :param validators: Sequence of validators
+    :param cache_size: Number of (value, result) pairs to remember
+    '''
+
+    def __init__(self, validators, cache_size=128):
+        self.validators = tuple(validators)
+        self.expensive = any(is_expensive(v) for v in self.validators)
+        self.cache = None if self.expensive else LRUCache(cache_size)
+
+        self.steps = []
+        specs = []
+        for v in self.validators:
+            spec = getattr(v, 'spec', None)
+            if spec:
+                specs.append(spec)
+                continue
+            if specs:
+                self.steps.append(_fuse(tuple(specs)))
+                specs = []
+            self.steps.append(_step(v))
+        if specs:
+            self.steps.append(_fuse(tuple(specs)))
+
+    def __len__(self):
+        return len(self.validators)
+
+    def __call__(self, value):
+        if self.cache is None:
+            return self._run(value)
+
+        try:
+            key = (type(value), value)
+            hash(key)
+        except TypeError:
+            return self._run(value)
+
+        if key in self.cache:
+            return self.cache.get(key)
+        error = self._run(value)
+        self.cache.set(key, error)
+        return error
+
+    def _run(self, value):
+        for step in self.steps:
+            error = step(value)
+            if error is not None:
+                return error
+        return None
+
+    def validate(self, value):
+        '''Raise a ValidationError if value fails any validator.'''
+
+        error = self(value)
+        if error is not None:
+            raise ValidationError(error)
+        return True
+
+
+#: Compiled chains by validator sequence. Bounded, so chains of validators
+#: created on the fly, like min_length(i), do not pile up.
+chain_cache = LRUCache(maxsize=1024)
+_chains_lock = threading.Lock()
+
+
+def compile_chain(validators, cache_size=128):
+    '''Returns the :class:`ValidatorChain` for a sequence of validators.
+    Chains are compiled once per distinct sequence and shared while they
+    stay in :data:`chain_cache`.'''
+
+    key = (tuple(validators or ()), cache_size)
+    with _chains_lock:
+        chain = chain_cache.get(key)
+        if chain is None:
+            chain = ValidatorChain(key[0], cache_size)
+            chain_cache.set(key, chain)
+    return chain
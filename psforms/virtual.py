@@ -0,0 +1,375 @@
+'''
+psforms.virtual
+===============
+Virtualized form view for forms with very many fields.
+
+:class:`VirtualFormWidget` keeps the values and validation errors of all
+fields in a plain dict keyed by field path. Controls are only created for
+the rows inside or near the viewport. Rows scrolled out of view hand their
+control back to a pool, from which it is rebound to the next row of a field
+with the same control configuration.
+'''
+
+import bisect
+from functools import partial
+from Qt import QtWidgets, QtCore
+from . import utils
+from .exc import FieldNotFound, FormNotFound
+from .widgets import label_metrics, style_batcher, _block_signals
+
+
+def form_rows(form, path=()):
+    '''Returns (path, field) tuples of all fields of form and its subforms,
+    depth first in declaration order. A path is the tuple of subform names
+    followed by the field name.'''
+
+    rows = []
+    for name, field in form.fields():
+        rows.append((path + (name,), field))
+    for name, subform in form.forms():
+        rows.extend(form_rows(subform, path + (name,)))
+    return rows
+
+
+def _freeze(value):
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+def recycle_key(field):
+    '''Fields with equal recycle keys are shown by interchangeable controls.
+    Names, defaults, validators and debounce intervals differ freely, they
+    are rebound along with the value.'''
+
+    rebound = ('name', 'default', 'validators', 'debounce')
+    kwargs = tuple(sorted(
+        (key, _freeze(value))
+        for key, value in field.control_kwargs.items()
+        if key not in rebound
+    ))
+    return (field.get_control_cls(), kwargs)
+
+
+def _nest(path, value):
+    data = value
+    for name in reversed(path):
+        data = {name: data}
+    return data
+
+
+def _merge(data, nested):
+    for name, value in nested.items():
+        if isinstance(value, dict) and isinstance(data.get(name), dict):
+            _merge(data[name], value)
+        else:
+            data[name] = value
+
+
+class VirtualFormWidget(QtWidgets.QAbstractScrollArea):
+    '''Scrolling form view instantiating controls only for visible rows.
+    Offers the value and validation api of :class:`FormWidget`, working on
+    its value store, so it may be used in place of a FormWidget, for
+    example in a :class:`FormDialog`. Subform fields are listed inline,
+    following the fields of their parent form.
+
+    Row heights are measured once per control class, rows of a class not
+    shown yet are assumed to be default_row_height pixels high.
+
+    :param form: Form class to show
+    :param overscan: Pixels above and below the viewport with bound rows
+    '''
+
+    values_changed = QtCore.Signal(object)
+    default_row_height = 60
+    margin = 20
+
+    def __init__(self, form, overscan=200, parent=None):
+        super(VirtualFormWidget, self).__init__(parent)
+
+        self.form = form
+        self.name = form.meta.title
+        self.overscan = overscan
+        self.rows = form_rows(form)
+        self.paths = dict((path, i) for i, (path, _) in enumerate(self.rows))
+        self.form_paths = set(
+            path[:i] for path in self.paths for i in range(1, len(path))
+        )
+
+        self._values = {}
+        self._errors = {}
+        self._dirty = set()
+        self._touched = set()
+        self._heights = {}
+        self._pool = {}
+        self._keys = {}
+        self._bound = {}
+        self._label_width = label_metrics.max_width(
+            [field.nice_name for _, field in self.rows]
+        ) + 10
+
+        for path, field in self.rows:
+            self._values[path] = field.get_default()
+            if field.validators:
+                self._dirty.add(path)
+
+        self.verticalScrollBar().setSingleStep(20)
+        self.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
+        self.setProperty('form', True)
+        self._update_offsets()
+
+    def _row_height(self, field):
+        return self._heights.get(
+            field.get_control_cls(),
+            self.default_row_height
+        )
+
+    def _update_offsets(self):
+        offsets = [0]
+        for _, field in self.rows:
+            offsets.append(offsets[-1] + self._row_height(field))
+        self._offsets = offsets
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        height = self.viewport().height()
+        bar = self.verticalScrollBar()
+        bar.setRange(0, max(0, self._offsets[-1] + 2 * self.margin - height))
+        bar.setPageStep(height)
+
+    def resizeEvent(self, event):
+        super(VirtualFormWidget, self).resizeEvent(event)
+        self._update_scrollbar()
+        self._layout_rows()
+
+    def showEvent(self, event):
+        super(VirtualFormWidget, self).showEvent(event)
+        self._layout_rows()
+
+    def scrollContentsBy(self, dx, dy):
+        self._layout_rows()
+
+    def visible_rows(self):
+        '''Returns the range of rows inside or near the viewport.'''
+
+        top = self.verticalScrollBar().value() - self.margin
+        bottom = top + self.viewport().height()
+        first = bisect.bisect_right(self._offsets, top - self.overscan) - 1
+        last = bisect.bisect_left(self._offsets, bottom + self.overscan)
+        return range(max(first, 0), min(last, len(self.rows)))
+
+    def _layout_rows(self):
+        with style_batcher.batch():
+            visible = self.visible_rows()
+            for row in list(self._bound):
+                if row not in visible:
+                    self._release(row)
+
+            remeasure = False
+            for row in visible:
+                if row not in self._bound:
+                    remeasure = self._bind(row) or remeasure
+            if remeasure:  # Row heights changed, place rows again
+                self._update_offsets()
+                return self._layout_rows()
+
+            top = self.verticalScrollBar().value() - self.margin
+            width = self.viewport().width() - 2 * self.margin
+            offsets = self._offsets
+            for row in visible:
+                self._bound[row].main_widget.setGeometry(
+                    self.margin,
+                    offsets[row] - top,
+                    width,
+                    offsets[row + 1] - offsets[row],
+                )
+
+    def _recycle_key(self, field):
+        key = self._keys.get(id(field))
+        if key is None:
+            key = self._keys[id(field)] = recycle_key(field)
+        return key
+
+    def _create_control(self, field):
+        control = field.create()
+        control.changed.connect(partial(self._control_changed, control))
+        control.main_widget.setParent(self.viewport())
+        control.label.setFixedWidth(self._label_width)
+        control._virtual_row = None
+        return control
+
+    def _bind(self, row):
+        '''Show row with a pooled or new control. Returns True if this was
+        the first control of its class and its height was measured.'''
+
+        path, field = self.rows[row]
+        pool = self._pool.get(self._recycle_key(field))
+        control = pool.pop() if pool else self._create_control(field)
+
+        control._name = field.nice_name
+        control.label.setText(field.nice_name)
+        control.validators = field.validators
+        control.debounce = field.debounce
+
+        blocked = _block_signals(control, True)
+        try:
+            control.set_value(self._values[path])
+        finally:
+            _block_signals(control, blocked)
+
+        if path in self._touched and field.validators:
+            control.schedule_validate()  # Changed, but not validated yet
+        else:
+            control.set_error(self._errors.get(path))
+
+        control._virtual_row = row
+        self._bound[row] = control
+        control.main_widget.show()
+
+        control_cls = field.get_control_cls()
+        if control_cls in self._heights:
+            return False
+        height = control.main_widget.sizeHint().height()
+        self._heights[control_cls] = height
+        return height != self.default_row_height
+
+    def _release(self, row):
+        control = self._bound.pop(row)
+        control._virtual_row = None
+        control._validation_generation += 1  # Drop pending results
+        if control._validation_timer is not None:
+            control._validation_timer.stop()
+        control.main_widget.hide()
+        path, field = self.rows[row]
+        self._pool.setdefault(self._recycle_key(field), []).append(control)
+
+    def _control_changed(self, control, *args):
+        row = control._virtual_row
+        if row is None:
+            return
+
+        path = self.rows[row][0]
+        value = control.get_value()
+        self._values[path] = value
+        self._errors.pop(path, None)
+        self._dirty.add(path)
+        self._touched.add(path)
+        self.values_changed.emit(_nest(path, value))
+
+    def scroll_to(self, name):
+        '''Scroll the row of the field name, a dotted path for subform
+        fields, into view.'''
+
+        row = self.paths[tuple(name.split('.'))]
+        self.verticalScrollBar().setValue(self._offsets[row])
+
+    @property
+    def clean(self):
+        return not self._dirty
+
+    @property
+    def valid(self):
+        '''Validates all dirty fields, returns True if all fields are valid.
+        '''
+
+        self._validate_dirty()
+        return not self._errors
+
+    def _validate_dirty(self):
+        for path in self._dirty:
+            field = self.rows[self.paths[path]][1]
+            error = field.chain(self._values[path])
+            if error is not None:
+                self._errors[path] = error
+            else:
+                self._errors.pop(path, None)
+
+            row = self.paths[path]
+            if row in self._bound:
+                self._bound[row].set_error(error)
+        self._dirty.clear()
+        self._touched.clear()
+
+    def invalid_fields(self, flatten=False):
+        '''Returns the names of all invalid fields.
+
+        :param flatten: If set to True, omit subform names. Otherwise fields
+            of subforms are named by dotted paths.
+        '''
+
+        self._validate_dirty()
+        if flatten:
+            return [path[-1] for path in sorted(self._errors)]
+        return ['.'.join(path) for path in sorted(self._errors)]
+
+    def get_value(self, flatten=False):
+        '''Returns the values of all fields, whether bound to a control or
+        not, as a nested dict like :meth:`FormWidget.get_value`.'''
+
+        data = {}
+        for path, value in self._values.items():
+            _merge(data, _nest(path, value))
+        if flatten:
+            return utils.flatten(data)
+        return data
+
+    def set_value(self, strict=True, **data):
+        '''Set the values of fields and subforms by name, see
+        :meth:`FormWidget.set_value`. Emits values_changed once.'''
+
+        changes = {}
+        self._set_values((), data, strict, changes)
+        if changes:
+            self.values_changed.emit(changes)
+
+    def _set_values(self, path, data, strict, changes):
+        for name, value in data.items():
+            field_path = path + (name,)
+            if isinstance(value, dict):
+                if field_path not in self.form_paths:
+                    if strict:
+                        raise FormNotFound(name + ' does not exist')
+                    continue
+                self._set_values(field_path, value, strict, changes)
+                continue
+
+            row = self.paths.get(field_path)
+            if row is None:
+                if strict:
+                    raise FieldNotFound(name + ' does not exist')
+                continue
+
+            self._values[field_path] = value
+            self._errors.pop(field_path, None)
+            self._dirty.add(field_path)
+            self._touched.add(field_path)
+            _merge(changes, _nest(field_path, value))
+
+            control = self._bound.get(row)
+            if control is not None:
+                blocked = _block_signals(control, True)
+                try:
+                    control.set_value(value)
+                finally:
+                    _block_signals(control, blocked)
+                control.schedule_validate()
+
+    def reset(self):
+        '''Restore the defaults of all fields and clear their errors.'''
+
+        for path, field in self.rows:
+            self._values[path] = field.get_default()
+            if field.validators:
+                self._dirty.add(path)
+        self._errors.clear()
+        self._touched.clear()
+
+        for row, control in self._bound.items():
+            control.default = self._values[self.rows[row][0]]
+            blocked = _block_signals(control, True)
+            try:
+                control.reset()
+            finally:
+                _block_signals(control, blocked)
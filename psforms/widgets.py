@@ -1,10 +1,172 @@
 from Qt import QtWidgets, QtCore, QtGui
-import math
-from . import resource
+import itertools
+import weakref
+from contextlib import contextmanager
+from copy import deepcopy
+from functools import partial
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+from . import resource, utils
+from .images import (
+    image_cache, image_key, cache_lock, get_loader, build_mips, nearest_level
+)
 from .exc import *
 
 
+class LabelMetrics(object):
+    '''Measures the rendered width of label text using QFontMetrics.
+
+    Widths are memoized by (font, text). The font is read from a single
+    hidden probe label, so stylesheet fonts are respected without creating a
+    widget per measurement. The cache is invalidated whenever the
+    application font or stylesheet changes.
+    '''
+
+    def __init__(self):
+        self._probe = None
+        self._signature = None
+        self._font = None
+        self._widths = {}
+
+    def invalidate(self):
+        '''Clear all cached fonts and widths.'''
+
+        self._font = None
+        self._widths.clear()
+
+    def font(self):
+        '''Returns the QFont labels are currently drawn with.'''
+
+        app = QtWidgets.QApplication.instance()
+        signature = (app.styleSheet(), app.font().key())
+        if signature != self._signature:
+            self._signature = signature
+            self.invalidate()
+
+        if self._font is None:
+            if self._probe is None:
+                self._probe = QtWidgets.QLabel()
+            style = self._probe.style()
+            style.unpolish(self._probe)
+            style.polish(self._probe)
+            self._font = QtGui.QFont(self._probe.font())
+        return self._font
+
+    def width(self, text):
+        '''Returns the rendered width of text in pixels.'''
+
+        return self.max_width((text,))
+
+    def max_width(self, texts):
+        '''Returns the largest rendered width of a sequence of texts.'''
+
+        font = self.font()
+        font_key = font.key()
+        measure = None
+        widths = [0]
+        for text in texts:
+            key = (font_key, text)
+            if key not in self._widths:
+                if measure is None:
+                    metrics = QtGui.QFontMetrics(font)
+                    measure = (getattr(metrics, 'horizontalAdvance', None) or
+                               metrics.width)
+                self._widths[key] = measure(text)
+            widths.append(self._widths[key])
+        return max(widths)
+
+
+label_metrics = LabelMetrics()
+
+
+class StyleBatcher(object):
+    '''Collects widgets whose style is invalidated by a property change and
+    repolishes each of them once, on the next iteration of the event loop.
+
+    Widgets that have not been polished yet are skipped, Qt polishes them
+    with their current properties when they are first shown. Use
+    :meth:`batch` to group bulk operations, the widgets invalidated inside
+    the batch are repolished once when the outermost batch exits.
+    '''
+
+    def __init__(self):
+        self._dirty = set()
+        self._depth = 0
+        self._scheduled = False
+
+    def invalidate(self, widgets):
+        '''Mark widgets for repolishing.'''
+
+        for w in widgets:
+            if w.testAttribute(QtCore.Qt.WA_WState_Polished):
+                self._dirty.add(w)
+
+        if self._dirty and not self._depth and not self._scheduled:
+            self._scheduled = True
+            QtCore.QTimer.singleShot(0, self.flush)
+
+    def flush(self):
+        '''Repolish all invalidated widgets now.'''
+
+        self._scheduled = False
+        dirty, self._dirty = self._dirty, set()
+        for w in dirty:
+            try:
+                w.style().unpolish(w)
+                w.style().polish(w)
+            except RuntimeError:
+                pass  # Widget was deleted before the flush
+
+    @contextmanager
+    def batch(self):
+        '''Defer repolishing until the outermost batch exits.'''
+
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if not self._depth:
+                self.flush()
+
+
+style_batcher = StyleBatcher()
+
+
+# Revisions stamped on cached form values, shared by all forms so change
+# tokens can be compared across subforms.
+_revisions = itertools.count(1)
+
+
+def _block_signals(control, block):
+    '''Block the signals of a control and all of its widgets, returns the
+    previous state.'''
+
+    blocked = control.blockSignals(block)
+    for w in control.widgets:
+        w.blockSignals(block)
+    return blocked
+
+
+def _copy_value(value):
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
 class ControlLayout(QtWidgets.QGridLayout):
+    '''Grid layout placing widgets in reading order over a number of
+    columns.
+
+    The position of each widget is indexed, so finding a widgets cell,
+    appending a widget and removing the last one take constant time. Grid
+    cells are derived from positions, so removing, inserting or moving a
+    widget re-places only the widgets after it, and changing the number of
+    columns re-places all widgets in a single pass with updates of the
+    parent widget suspended.
+    '''
 
     def __init__(self, columns=1, parent=None):
         super(ControlLayout, self).__init__(parent)
@@ -14,6 +176,7 @@ class ControlLayout(QtWidgets.QGridLayout):
         self.setHorizontalSpacing(20)
         self.setRowStretch(1000, 1)
         self.widgets = []
+        self._positions = {}
 
     @property
     def columns(self):
@@ -21,43 +184,138 @@ class ControlLayout(QtWidgets.QGridLayout):
 
     @columns.setter
     def columns(self, value):
+        if value == self._columns:
+            return
         self._columns = value
-        widgets = list(self.widgets)
-        for w in widgets:
-            self.takeWidget(w)
-        for w in widgets:
-            self.addWidget(w)
+        with self._suspended():
+            self._take_from(0)
+            self._place_from(0)
 
     @property
     def count(self):
         return len(self.widgets)
 
+    def position(self, widget):
+        '''Returns the index of widget in reading order or -1.'''
+
+        return self._positions.get(widget, -1)
+
+    def cell(self, widget):
+        '''Returns the (row, column) of widget.'''
+
+        return divmod(self._positions[widget], self._columns)
+
     def takeWidget(self, widget):
-        if widget not in self.widgets:
+        position = self._positions.get(widget)
+        if position is None:
             return None
 
-        self.widgets.pop(self.widgets.index(widget))
-        self.takeAt(self.indexOf(widget))
+        with self._suspended():
+            self._take_from(position)
+            self.widgets.pop(position)
+            del self._positions[widget]
+            self._place_from(position)
         return widget
 
     def addWidget(self, widget):
-        count = self.count
-        row = math.floor(count / self.columns)
-        column = (count % self.columns)
-        super(ControlLayout, self).addWidget(widget, row, column)
+        position = len(self.widgets)
         self.widgets.append(widget)
+        self._positions[widget] = position
+        row, column = divmod(position, self._columns)
+        super(ControlLayout, self).addWidget(widget, row, column)
+
+    def insertWidget(self, index, widget):
+        '''Insert widget at index in reading order.'''
+
+        index = min(index, len(self.widgets))
+        with self._suspended():
+            self._take_from(index)
+            self.widgets.insert(index, widget)
+            self._place_from(index)
+
+    def moveWidget(self, widget, index):
+        '''Move widget to index in reading order.'''
+
+        position = self._positions[widget]
+        index = min(index, len(self.widgets) - 1)
+        if index == position:
+            return
+
+        start = min(index, position)
+        with self._suspended():
+            self._take_from(start)
+            self.widgets.pop(position)
+            self.widgets.insert(index, widget)
+            self._place_from(start)
+
+    def _take_from(self, position):
+        '''Take the layout items of all widgets from position on. Items are
+        taken from the end, which is cheap for the grids item list.'''
+
+        count = super(ControlLayout, self).count()
+        for i in range(count - 1, position - 1, -1):
+            self.takeAt(i)
+
+    def _place_from(self, position):
+        columns = self._columns
+        add_widget = super(ControlLayout, self).addWidget
+        for i in range(position, len(self.widgets)):
+            widget = self.widgets[i]
+            self._positions[widget] = i
+            row, column = divmod(i, columns)
+            add_widget(widget, row, column)
+
+    @contextmanager
+    def _suspended(self):
+        parent = self.parentWidget()
+        if parent is None or not parent.updatesEnabled():
+            yield
+            return
+
+        parent.setUpdatesEnabled(False)
+        try:
+            yield
+        finally:
+            parent.setUpdatesEnabled(True)
 
 
 class FormWidget(QtWidgets.QWidget):
+    '''Widget holding the controls and subforms of a :class:`Form`.
+
+    Validity is tracked incrementally. A control is dirty from the moment
+    it is added or changed until :attr:`valid` validates it again, and the
+    validity of clean controls is cached. A subform emits dirtied when it
+    goes from clean to dirty, so its parent only revisits dirty subforms.
+
+    Values are cached as well. The cache is updated whenever a control
+    emits changed or modified, so :meth:`get_value` never reads the
+    wrapped Qt widgets. Each update is stamped with a revision,
+    :meth:`get_changes` returns the fields modified after a
+    :meth:`change_token`.
+    '''
+
+    dirtied = QtCore.Signal()
+    values_changed = QtCore.Signal(object)
 
     def __init__(self, name, columns=1, layout_horizontal=False, parent=None):
         super(FormWidget, self).__init__(parent)
+        resource.load()
 
         self.name = name
-        self.controls = {}
-        self.forms = {}
+        self.controls = OrderedDict()
+        self.forms = OrderedDict()
         self.parent = parent
 
+        self._dirty = set()
+        self._dirty_forms = set()
+        self._invalid = set()
+        self._invalid_forms = set()
+        self._values = {}
+        self._modified = {}
+        self._pending = set()
+        self._pending_validation = set()
+        self._transaction_depth = 0
+
         self.layout = QtWidgets.QVBoxLayout()
         self.layout.setContentsMargins(0, 0, 0, 0)
         self.layout.setSpacing(0)
@@ -81,18 +339,70 @@ class FormWidget(QtWidgets.QWidget):
         self.setProperty('form', True)
         self.setAttribute(QtCore.Qt.WA_StyledBackground, True)
 
+    @property
+    def clean(self):
+        '''True if no control or subform changed since the last validation.'''
+
+        return not self._dirty and not self._dirty_forms
+
     @property
     def valid(self):
-        is_valid = []
+        '''Validates the dirty controls and subforms of this form, returns
+        True if all controls and subforms are valid.'''
+
+        self._validate_dirty()
+        return not self._invalid and not self._invalid_forms
+
+    def _validate_dirty(self):
+        while self._dirty:
+            name = self._dirty.pop()
+            control = self.controls[name]
+            if control.validators:
+                control.validate()
+            if control.valid:
+                self._invalid.discard(name)
+            else:
+                self._invalid.add(name)
 
-        for name, control in self.controls.iteritems():
-            control.validate()
-            is_valid.append(control.valid)
+        while self._dirty_forms:
+            name = self._dirty_forms.pop()
+            if self.forms[name].valid:
+                self._invalid_forms.discard(name)
+            else:
+                self._invalid_forms.add(name)
+
+    def invalid_fields(self, flatten=False):
+        '''Returns the names of all invalid fields. Only dirty controls are
+        validated, the cached results of clean controls are reused.
 
-        for name, form in self.forms.iteritems():
-            is_valid.append(form.valid)
+        :param flatten: If set to True, omit subform names. Otherwise fields
+            of subforms are named subform.field
+        '''
+
+        self._validate_dirty()
+        names = [name for name in self.controls if name in self._invalid]
+        for form_name in self.forms:
+            if form_name not in self._invalid_forms:
+                continue
+            for name in self.forms[form_name].invalid_fields(flatten):
+                names.append(name if flatten else form_name + '.' + name)
+        return names
 
-        return all(is_valid)
+    def mark_dirty(self, name, *args):
+        '''Mark a control for validation on the next read of valid.'''
+
+        was_clean = self.clean
+        self._dirty.add(name)
+        if was_clean:
+            self.dirtied.emit()
+
+    def mark_form_dirty(self, name, *args):
+        '''Mark a subform for validation on the next read of valid.'''
+
+        was_clean = self.clean
+        self._dirty_forms.add(name)
+        if was_clean:
+            self.dirtied.emit()
 
     def get_value(self, flatten=False):
         '''Get the value of this forms fields and subforms fields.
@@ -101,10 +411,10 @@ class FormWidget(QtWidgets.QWidget):
         '''
 
         form_data = {}
-        for name, control in self.controls.iteritems():
-            form_data[name] = control.get_value()
+        for name, value in self._values.items():
+            form_data[name] = _copy_value(value)
 
-        for name, form in self.forms.iteritems():
+        for name, form in self.forms.items():
             form_value = form.get_value(flatten=flatten)
             if flatten:
                 form_data.update(form_value)
@@ -113,6 +423,115 @@ class FormWidget(QtWidgets.QWidget):
 
         return form_data
 
+    def refresh(self):
+        '''Re-read the value of every control into the value cache. Only
+        needed after changing widgets while their signals were blocked.
+        '''
+
+        for name in self.controls:
+            self._store(name)
+
+        for name, form in self.forms.items():
+            if hasattr(form, 'refresh'):
+                form.refresh()
+
+    def change_token(self):
+        '''Returns a token marking the current state of this form. Pass it to
+        :meth:`get_changes` to get the fields modified afterwards.'''
+
+        return next(_revisions)
+
+    def get_changes(self, since=0, flatten=False):
+        '''Get the values of the fields modified after a change token.
+
+        :param since: Token returned by :meth:`change_token`, by default
+            all fields modified after the form was built are returned
+        :param flatten: If set to True, return a flattened dict
+        '''
+
+        changes = {}
+        for name, revision in self._modified.items():
+            if revision > since:
+                changes[name] = _copy_value(self._values[name])
+
+        for name, form in self.forms.items():
+            form_changes = form.get_changes(since=since, flatten=flatten)
+            if not form_changes:
+                continue
+            if flatten:
+                changes.update(form_changes)
+            else:
+                changes[name] = form_changes
+
+        return changes
+
+    def _restore_values(self, values):
+        '''Set the values of fields and subforms like :meth:`reset` does,
+        without validating them. Used when a lazy :class:`FormGroup` is
+        built, so untouched fields show no errors.'''
+
+        with self.transaction():
+            for name, value in values.items():
+                if name in self.forms:
+                    form = self.forms[name]
+                    blocked = form.blockSignals(True)
+                    try:
+                        form._restore_values(value)
+                    finally:
+                        form.blockSignals(blocked)
+                    self.mark_form_dirty(name)
+                elif name in self.controls:
+                    control = self.controls[name]
+                    blocked = _block_signals(control, True)
+                    try:
+                        control.set_value(value)
+                    finally:
+                        _block_signals(control, blocked)
+                    self._pending.add(name)
+
+    def _restore_revisions(self, revisions):
+        '''Stamp values with the revisions they were modified at before this
+        form was built, used when a lazy :class:`FormGroup` is built.'''
+
+        for name in self.controls:
+            revision = revisions.get(name, 0)
+            self._modified[name] = revision if isinstance(revision, int) else 0
+
+        for name, form in self.forms.items():
+            form._restore_revisions(revisions.get(name) or {})
+
+    def _store(self, name):
+        value = self.controls[name].get_value()
+        if name in self._values and self._values[name] == value:
+            return
+        self._values[name] = value
+        self._modified[name] = next(_revisions)
+
+    def _flush_pending(self):
+        pending, self._pending = self._pending, set()
+        validate, self._pending_validation = self._pending_validation, set()
+        for name in pending:
+            self._store(name)
+            self.mark_dirty(name)
+        for name in validate:
+            if self.controls[name].validators:
+                self.controls[name].schedule_validate()
+
+    def _control_changed(self, name, *args):
+        if self._transaction_depth:
+            self._pending.add(name)
+            self._pending_validation.add(name)
+            return
+        self._store(name)
+        self.mark_dirty(name)
+
+    def _control_modified(self, name, *args):
+        if self._transaction_depth:
+            self._pending.add(name)
+            return
+        self._store(name)
+        self.mark_dirty(name)
+
     def set_value(self, strict=True, **data):
         '''Set the value of all the forms subforms and fields. You can pass
         an additional keyword argument strict to False to ignore mismatched
@@ -133,21 +552,94 @@ class FormWidget(QtWidgets.QWidget):
                         'subform_intfield': 2,}},
             )
         '''
-        for name, value in data.iteritems():
+        with self.transaction():
+            for name, value in data.items():
+
+                if isinstance(value, dict):
+                    try:
+                        form = self.forms[name]
+                    except KeyError:
+                        if strict:
+                            raise FormNotFound(name + ' does not exist')
+                        continue
+                    blocked = form.blockSignals(True)
+                    try:
+                        form.set_value(strict=strict, **value)
+                    finally:
+                        form.blockSignals(blocked)
+                    self.mark_form_dirty(name)
+                    continue
 
-            if isinstance(value, dict):
                 try:
-                    self.forms[name].set_value(**value)
+                    control = self.controls[name]
                 except KeyError:
                     if strict:
-                        raise FormNotFound(name + ' does not exist')
-                continue
+                        raise FieldNotFound(name + ' does not exist')
+                    continue
+                blocked = _block_signals(control, True)
+                try:
+                    control.set_value(value)
+                finally:
+                    _block_signals(control, blocked)
+                self._pending.add(name)
+                self._pending_validation.add(name)
+
+    @contextmanager
+    def transaction(self):
+        '''Group changes to this form. Values set with :meth:`set_value`
+        inside a transaction do not emit per control signals. Caching their
+        values, validating them and repolishing styles happens once, when
+        the outermost transaction exits. Then a single values_changed signal
+        is emitted with the changes made during the transaction. Controls
+        restored by :meth:`reset` are not validated, so they show no errors.
 
+        usage::
+
+            with myform.transaction():
+                myform.set_value(**preset)
+                myform.set_value(strfield='ABCDEFG')
+        '''
+
+        if self._transaction_depth:
+            self._transaction_depth += 1
+            try:
+                yield self
+            finally:
+                self._transaction_depth -= 1
+            return
+
+        token = self.change_token()
+        self._transaction_depth = 1
+        with style_batcher.batch():
             try:
-                self.controls[name].set_value(value)
-            except KeyError:
-                if strict:
-                    raise FieldNotFound(name + ' does not exist')
+                yield self
+            finally:
+                self._transaction_depth = 0
+                self._flush_pending()
+
+        changes = self.get_changes(since=token)
+        if changes:
+            self.values_changed.emit(changes)
+
+    def reset(self):
+        '''Restore all fields to their defaults and clear any errors.'''
+
+        with self.transaction():
+            for name, control in self.controls.items():
+                blocked = _block_signals(control, True)
+                try:
+                    control.reset()
+                finally:
+                    _block_signals(control, blocked)
+                self._pending.add(name)
+
+            for name, form in self.forms.items():
+                blocked = form.blockSignals(True)
+                try:
+                    form.reset()
+                finally:
+                    form.blockSignals(blocked)
+                self.mark_form_dirty(name)
 
     def add_header(self, title, description=None, icon=None):
         '''Add a header'''
@@ -161,6 +653,8 @@ class FormWidget(QtWidgets.QWidget):
         self.form_layout.addWidget(form)
         self.forms[name] = form
         setattr(self, name, form)
+        form.dirtied.connect(partial(self.mark_form_dirty, name))
+        self.mark_form_dirty(name)
 
     def add_control(self, name, control):
         '''Add a control'''
@@ -168,6 +662,13 @@ class FormWidget(QtWidgets.QWidget):
         self.control_layout.addWidget(control.main_widget)
         self.controls[name] = control
         setattr(self, name, control)
+        control.changed.connect(partial(self._control_changed, name))
+        modified = getattr(control, 'modified', None)
+        if modified is not None:  # Custom controls may only emit changed
+            modified.connect(partial(self._control_modified, name))
+        self._values[name] = control.get_value()
+        self._modified[name] = 0
+        self.mark_dirty(name)
 
 
 class FormDialog(QtWidgets.QDialog):
@@ -176,6 +677,9 @@ class FormDialog(QtWidgets.QDialog):
         super(FormDialog, self).__init__(*args, **kwargs)
 
         self.widget = widget
+        self.dim = False
+        self._dim_widgets = []
+        self._config = None
         self.cancel_button = QtWidgets.QPushButton('&cancel')
         self.accept_button = QtWidgets.QPushButton('&accept')
         self.cancel_button.clicked.connect(self.reject)
@@ -200,21 +704,188 @@ class FormDialog(QtWidgets.QDialog):
         except AttributeError:
             raise AttributeError('FormDialog has no attr: {}'.format(attr))
 
+    def configure(self, frameless=False, dim=False, parent=None):
+        '''Set the parent and window flags of this dialog. Dialogs without a
+        parent stay on top of other windows and may be frameless.
+
+        :param frameless: Remove the window frame of a parentless dialog
+        :param dim: Dim all monitors while the dialog is visible
+        :param parent: Parent widget
+        '''
+
+        self.dim = dim
+        config = (frameless, parent)
+        if config == self._config:
+            return
+        self._config = config
+
+        if parent:
+            if self.parentWidget() is not parent:
+                self.setParent(parent, QtCore.Qt.Dialog)
+            return
+
+        window_flags = QtCore.Qt.WindowStaysOnTopHint
+        if frameless:
+            window_flags |= QtCore.Qt.FramelessWindowHint
+        if self.parentWidget() is not None:
+            self.setParent(None, window_flags)
+        else:
+            self.setWindowFlags(window_flags)
+
+    def reset(self):
+        '''Restore all fields to their defaults and clear any errors.'''
+
+        self.widget.reset()
+
+    def disconnect_signals(self):
+        '''Disconnect all receivers of accepted, rejected and finished.'''
+
+        for signal in (self.accepted, self.rejected, self.finished):
+            try:
+                signal.disconnect()
+            except (RuntimeError, TypeError):
+                pass  # No receivers connected
+
+    def _show_dim_widgets(self):
+        qapp = QtWidgets.QApplication.instance()
+        desktop = qapp.desktop()
+
+        for i in range(desktop.screenCount()):
+            geo = desktop.screenGeometry(i)
+            w = QtWidgets.QWidget()
+            w.setGeometry(geo)
+            w.setStyleSheet('QWidget {background:black}')
+            w.setWindowOpacity(0.3)
+            w.show()
+            self._dim_widgets.append(w)
+
+    def _hide_dim_widgets(self):
+        while self._dim_widgets:
+            w = self._dim_widgets.pop()
+            w.hide()
+            w.deleteLater()
+
+    def showEvent(self, event):
+        if self.dim and not self._dim_widgets:
+            self._show_dim_widgets()
+            self.raise_()
+        super(FormDialog, self).showEvent(event)
+
+    def hideEvent(self, event):
+        self._hide_dim_widgets()
+        super(FormDialog, self).hideEvent(event)
+
     def on_accept(self):
         if self.widget.valid:
             self.accept()
         return
 
 
+class DialogPool(object):
+    '''Keeps finished dialogs around for reuse.
+
+    :meth:`acquire` returns an idle dialog, reset to its defaults and
+    configured for the requested parent and window options, or builds a new
+    one using factory. Dialogs return to the pool when they finish. At most
+    size idle dialogs are kept, the least recently used are evicted first.
+    Idle dialogs matching the requested parent and options are preferred,
+    avoiding a change of window flags.
+
+    :param factory: Callable returning a new :class:`FormDialog`
+    :param size: Maximum number of idle dialogs to keep
+    '''
+
+    def __init__(self, factory, size=1):
+        self.factory = factory
+        self.size = size
+        self.idle = []
+
+    def acquire(self, frameless=False, dim=False, parent=None):
+        '''Returns a dialog ready to be shown.'''
+
+        config = (frameless, parent)
+        dialog = None
+        for candidate in reversed(self.idle):
+            if candidate._config == config:
+                dialog = candidate
+                break
+        if dialog is None and self.idle:
+            dialog = self.idle[-1]
+
+        if dialog is None:
+            dialog = self.factory()
+            dialog.destroyed.connect(self._discard(weakref.ref(dialog)))
+        else:
+            self.idle.remove(dialog)
+            dialog.disconnect_signals()
+            dialog.reset()
+
+        dialog.configure(frameless=frameless, dim=dim, parent=parent)
+        dialog.finished.connect(self._release(weakref.ref(dialog)))
+        return dialog
+
+    def _release(self, ref):
+        def release(*args):
+            dialog = ref()
+            if dialog is not None and dialog not in self.idle:
+                self.idle.append(dialog)
+                self.evict()
+        return release
+
+    def _discard(self, ref):
+        def discard(*args):
+            dialog = ref()
+            if dialog is not None and dialog in self.idle:
+                self.idle.remove(dialog)
+        return discard
+
+    def evict(self, size=None):
+        '''Delete least recently used idle dialogs until at most size remain.
+
+        :param size: Number of idle dialogs to keep, defaults to self.size
+        '''
+
+        size = self.size if size is None else size
+        while len(self.idle) > size:
+            self.idle.pop(0).deleteLater()
+
+    def clear(self):
+        '''Delete all idle dialogs.'''
+
+        self.evict(0)
+
+
 class FormGroup(QtWidgets.QWidget):
+    '''A collapsible group wrapping a :class:`FormWidget`.
+
+    Pass a factory instead of a widget to build the group lazily. A lazy
+    group starts collapsed and holds only its title button and a copy of
+    the forms values. The widget is built by calling factory the first time
+    the group is expanded, the first time valid needs it, or when any other
+    FormWidget attribute is accessed through the group.
+
+    :param widget: FormWidget to wrap
+    :param factory: Callable returning the FormWidget to wrap
+    :param name: Title of the group, defaults to the widgets name
+    :param values: Values of a lazy group until its widget is built
+    :param validates: False if a lazy groups form has no validators
+    '''
 
     toggled = QtCore.Signal(bool)
+    dirtied = QtCore.Signal()
+    values_changed = QtCore.Signal(object)
 
-    def __init__(self, widget, *args, **kwargs):
+    def __init__(self, widget=None, factory=None, name=None, values=None,
+                 validates=True, *args, **kwargs):
         super(FormGroup, self).__init__(*args, **kwargs)
+        resource.load()
 
-        self.widget = widget
-        self.widget.setProperty('groupwidget', True)
+        self._widget = None
+        self._factory = factory
+        self._defaults = values or {}
+        self._values = deepcopy(self._defaults)
+        self._modified = {}
+        self._validates = validates
 
         self.layout = QtWidgets.QVBoxLayout()
         self.layout.setContentsMargins(0, 0, 0, 0)
@@ -222,7 +893,7 @@ class FormGroup(QtWidgets.QWidget):
         self.layout.setSpacing(0)
         self.setLayout(self.layout)
 
-        self.title = QtWidgets.QPushButton(self.widget.name)
+        self.title = QtWidgets.QPushButton(name or widget.name)
         icon = QtGui.QIcon()
         icon.addPixmap(
             QtGui.QPixmap(':/icons/plus'),
@@ -237,26 +908,169 @@ class FormGroup(QtWidgets.QWidget):
         self.title.setIcon(icon)
         self.title.setProperty('grouptitle', True)
         self.title.setCheckable(True)
-        self.title.setChecked(True)
+        self.title.setChecked(widget is not None)
         self.title.toggled.connect(self.toggle_collapsed)
         self.layout.addWidget(self.title)
-        self.layout.addWidget(self.widget)
+
+        if widget is not None:
+            self._set_widget(widget)
+
+    @property
+    def built(self):
+        '''True once this groups FormWidget exists.'''
+
+        return self._widget is not None
+
+    @property
+    def widget(self):
+        '''The wrapped FormWidget, built on first access in lazy groups.'''
+
+        if self._widget is None:
+            widget = self._factory()
+            widget._restore_values(self._values)
+            widget._restore_revisions(self._modified)
+            self._set_widget(widget)
+        return self._widget
+
+    def _set_widget(self, widget):
+        self._widget = widget
+        self._widget.setProperty('groupwidget', True)
+        self._widget.dirtied.connect(self.dirtied.emit)
+        self._widget.values_changed.connect(self.values_changed.emit)
+        self.layout.addWidget(self._widget)
+        if not self.title.isChecked():
+            self._widget.hide()
+
+    @property
+    def valid(self):
+        if not self.built and not self._validates:
+            return True
+        return self.widget.valid
+
+    def invalid_fields(self, flatten=False):
+        if not self.built and not self._validates:
+            return []
+        return self.widget.invalid_fields(flatten)
+
+    def get_value(self, flatten=False):
+        '''Get the value of this groups form without building it.'''
+
+        if self.built:
+            return self.widget.get_value(flatten=flatten)
+
+        if flatten:
+            return utils.flatten(self._values)
+        return deepcopy(self._values)
+
+    def set_value(self, strict=True, **data):
+        '''Set the value of this groups form without building it.'''
+
+        if self.built:
+            return self.widget.set_value(strict=strict, **data)
+
+        token = self.change_token()
+        self._update_values(self._values, self._modified, strict, data)
+        self.dirtied.emit()
+        changes = self.get_changes(since=token)
+        if changes:
+            self.values_changed.emit(changes)
+
+    def _update_values(self, values, modified, strict, data):
+        for name, value in data.items():
+
+            if isinstance(value, dict):
+                if isinstance(values.get(name), dict):
+                    self._update_values(
+                        values[name],
+                        modified.setdefault(name, {}),
+                        strict,
+                        value
+                    )
+                elif strict:
+                    raise FormNotFound(name + ' does not exist')
+                continue
+
+            if name in values:
+                if values[name] != value:
+                    values[name] = deepcopy(value)
+                    modified[name] = next(_revisions)
+            elif strict:
+                raise FieldNotFound(name + ' does not exist')
+
+    def reset(self):
+        '''Restore all fields to their defaults and clear any errors.'''
+
+        if self.built:
+            self.widget.reset()
+        else:
+            self._update_values(
+                self._values, self._modified, False, self._defaults
+            )
+            self.dirtied.emit()
+
+    def refresh(self):
+        if self.built:
+            self.widget.refresh()
+
+    def change_token(self):
+        return next(_revisions)
+
+    def get_changes(self, since=0, flatten=False):
+        '''Get the values modified after a change token without building
+        this groups form.'''
+
+        if self.built:
+            return self.widget.get_changes(since=since, flatten=flatten)
+        return self._changes(self._values, self._modified, since, flatten)
+
+    def _changes(self, values, modified, since, flatten):
+        changes = {}
+        for name, revision in modified.items():
+            if isinstance(revision, dict):
+                form_changes = self._changes(
+                    values[name], revision, since, flatten
+                )
+                if not form_changes:
+                    continue
+                if flatten:
+                    changes.update(form_changes)
+                else:
+                    changes[name] = form_changes
+            elif revision > since:
+                changes[name] = _copy_value(values[name])
+        return changes
+
+    def _restore_values(self, values):
+        if self.built:
+            self.widget._restore_values(values)
+        else:
+            self._values = deepcopy(values)
+
+    def _restore_revisions(self, revisions):
+        if self.built:
+            self.widget._restore_revisions(revisions)
+        else:
+            self._modified = deepcopy(revisions)
 
     def set_enabled(self, value):
         self.title.blockSignals(True)
         self.title.setChecked(value)
-        self.widget.setVisible(value)
+        if value or self.built:
+            self.widget.setVisible(value)
         self.title.blockSignals(False)
 
     def toggle_collapsed(self, collapsed):
         self.toggled.emit(collapsed)
-        self.widget.setVisible(self.title.isChecked())
+        if self.title.isChecked() or self.built:
+            self.widget.setVisible(self.title.isChecked())
 
     def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError('FormGroup has no attr: {}'.format(attr))
         try:
             return getattr(self.widget, attr)
         except AttributeError:
-            raise AttributeError('FormDialog has no attr: {}'.format(attr))
+            raise AttributeError('FormGroup has no attr: {}'.format(attr))
 
 
 class Header(QtWidgets.QWidget):
@@ -318,53 +1132,149 @@ class Header(QtWidgets.QWidget):
 
 
 class ScalingImage(QtWidgets.QLabel):
+    '''Label drawing an image scaled to cover its whole area.
+
+    A pyramid of halved copies is built once per image and pixmaps are
+    scaled from the level nearest to the size of the widget. While the widget
+    is being resized the current pixmap is stretched by the painter, a
+    smooth rescale happens once no resize happened for resize_delay ms.
+    '''
 
-    __images = {}
+    placeholder = ':/images/noimg'
+    #: Images loaded by :meth:`load_image` are decoded at no less than the
+    #: size of this widget and no less than decode_size
+    decode_size = (1024, 1024)
+    resize_delay = 150
 
     def __init__(self, image=None, parent=None):
         super(ScalingImage, self).__init__(parent)
-        self.images = self.__images
+        resource.load()
+        self.img = None
+        self.key = None
+        self.do_resize = False
+        self.mips = None
+        self._image_generation = None
+        self._resize_timer = QtCore.QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.timeout.connect(self._resize_finished)
         if not image:
-            image = ':/images/noimg'
+            image = self.placeholder
         self.set_image(image)
         self.setSizePolicy(QtWidgets.QSizePolicy.Expanding,
                            QtWidgets.QSizePolicy.Expanding)
 
     def set_image(self, image):
-        if image not in self.images:
-            if not isinstance(image, QtGui.QImage):
-                if not QtCore.QFile.exists(image):
-                    return
-                self.img = QtGui.QImage(image)
-            self.images[image] = self.img
+        '''Show image, a QImage or a path decoded on the calling thread.'''
+
+        if isinstance(image, QtGui.QImage):
+            self.img = image
+            self.key = None
+            self.mips = None
         else:
-            self.img = self.images[image]
+            key = image_key(image)
+            if key is None:
+                return
+            with cache_lock:
+                img = image_cache.get(key)
+            if img is None:
+                img = QtGui.QImage(image)
+                with cache_lock:
+                    image_cache.set(key, img)
+            self.img = img
+            self.key = key
+            self.mips = None
 
         self.setMinimumSize(227, 128)
         self.scale_pixmap()
         self.repaint()
 
+    def load_image(self, path):
+        '''Show the image at path once it is decoded on a worker thread. The
+        placeholder is shown until then. Loading another image before this
+        one finished cancels it.'''
+
+        loader = get_loader()
+        loader.cancel(self)
+        self.set_image(self.placeholder)
+        if not path:
+            return
+
+        size = (
+            max(self.width(), self.decode_size[0]),
+            max(self.height(), self.decode_size[1]),
+        )
+        loader.load(self, path, size)
+
+    def set_loaded_image(self, key, image):
+        '''Called by the image loader once an image is decoded.'''
+
+        if image is None or image.isNull():
+            return
+        self.img = image
+        self.key = key
+        self.mips = None
+        self.scale_pixmap()
+        self.update()
+
+    def get_mips(self):
+        '''Returns the mip levels of the current image, largest first.'''
+
+        if self.mips is not None:
+            return self.mips
+
+        key = None if self.key is None else ('mips', self.key)
+        with cache_lock:
+            levels = None if key is None else image_cache.get(key)
+        if levels is None:
+            levels = build_mips(self.img)
+            if key is not None:
+                with cache_lock:
+                    image_cache.set(key, levels)
+        self.mips = [self.img] + list(levels)
+        return self.mips
+
     def scale_pixmap(self):
-        scaled_image = self.img.scaled(
-            self.width(),
-            self.height(),
-            QtCore.Qt.KeepAspectRatioByExpanding,
-            QtCore.Qt.FastTransformation)
-        self.pixmap = QtGui.QPixmap(scaled_image)
+        size = (self.width(), self.height())
+        key = None if self.key is None else ('pixmap', self.key, size)
+        with cache_lock:
+            pixmap = None if key is None else image_cache.get(key)
+        if pixmap is None:
+            level = nearest_level(self.get_mips(), *size)
+            scaled_image = level.scaled(
+                size[0],
+                size[1],
+                QtCore.Qt.KeepAspectRatioByExpanding,
+                QtCore.Qt.SmoothTransformation)
+            pixmap = QtGui.QPixmap(scaled_image)
+            if key is not None:
+                with cache_lock:
+                    image_cache.set(key, pixmap)
+        self.pixmap = pixmap
 
     def resizeEvent(self, event):
         self.do_resize = True
+        self._resize_timer.start(self.resize_delay)
         super(ScalingImage, self).resizeEvent(event)
 
+    def _resize_finished(self):
+        self.update()
+
     def paintEvent(self, event):
-        if self.do_resize:
+        if self.do_resize and not self._resize_timer.isActive():
             self.scale_pixmap()
             self.do_resize = False
 
-        offsetX = -((self.pixmap.width() - self.width()) * 0.5)
-        offsetY = -((self.pixmap.height() - self.height()) * 0.5)
+        size = QtCore.QSize(self.pixmap.width(), self.pixmap.height())
+        size.scale(
+            self.width(),
+            self.height(),
+            QtCore.Qt.KeepAspectRatioByExpanding)
+        offsetX = (self.width() - size.width()) // 2
+        offsetY = (self.height() - size.height()) // 2
         painter = QtGui.QPainter(self)
-        painter.drawPixmap(offsetX, offsetY, self.pixmap)
+        painter.drawPixmap(
+            QtCore.QRect(offsetX, offsetY, size.width(), size.height()),
+            self.pixmap)
 
 
 class IconButton(QtWidgets.QPushButton):
@@ -378,6 +1288,7 @@ class IconButton(QtWidgets.QPushButton):
 
     def __init__(self, icon, tip, name, size=(32, 32), *args, **kwargs):
         super(IconButton, self).__init__(*args, **kwargs)
+        resource.load()
 
         self.setObjectName(name)
         self.setIcon(QtGui.QIcon(icon))
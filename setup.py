@@ -54,7 +54,7 @@ setup(
     packages=find_packages(),
     package_data={
         '': ['LICENSE', 'README.rst'],
-        'psforms': ['style.css']
+        'psforms': ['style.css', 'resource.rcc']
     },
     include_package_data=True,
     classifiers=(
@@ -0,0 +1,32 @@
+'''Helpers for tests needing a Qt binding. Tests importing this module are
+skipped when none is installed.'''
+
+import os
+from unittest import SkipTest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+try:
+    from Qt import QtCore, QtWidgets
+except ImportError:
+    raise SkipTest('No Qt binding available')
+
+
+def get_app():
+    '''Returns the QApplication, creating it if needed.'''
+
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def process_events(condition=None, timeout=2.0):
+    '''Process events until condition returns True or timeout seconds
+    passed.'''
+
+    import time
+    app = get_app()
+    end = time.time() + timeout
+    while time.time() < end:
+        app.processEvents()
+        if condition is not None and condition():
+            return True
+        time.sleep(0.005)
+    return condition is None
@@ -0,0 +1,191 @@
+from unittest import SkipTest
+from psforms.batch import form_columns, get_numpy, validate_columns
+from psforms.exc import ValidationError
+from psforms.fields import (
+    FloatField, Int2Field, IntField, ListField, StringField
+)
+from psforms.form import Form
+from psforms.validators import email, max_length, min_length, regex, required
+
+
+def silent(value):
+    raise ValidationError()
+
+
+def even_sum(value):
+    if sum(value) % 2:
+        raise ValidationError('Odd sum')
+
+
+def no_spaces(value):
+    if ' ' in str(value):
+        raise ValidationError('Has spaces')
+
+
+class Shot(Form):
+    code = StringField('Code', validators=(regex(r'^\d+$', 'Digits'),))
+
+
+class Asset(Form):
+    name = StringField(
+        'Name', validators=(required, min_length(3), max_length(6))
+    )
+    mail = StringField('Mail', validators=(email,))
+    age = IntField('Age', range=(0, 120), validators=(no_spaces,))
+    ratio = FloatField('Ratio', range=(0.0, 1.0))
+    size = Int2Field('Size', validators=(even_sum,))
+    tags = ListField('Tags', validators=(required, min_length(2)))
+    note = StringField('Note', validators=(silent,))
+    shot = Shot()
+
+
+COLUMNS = {
+    'name': ['bob', '', 'al', 'robertson', 'alice', 0],
+    'mail': ['a@b.com', 'nope', 'a@b.com', '', 'c@d.org', 'x@y.io'],
+    'age': [1, 200, -1, 3, 5, 120],
+    'ratio': [0.5, float('nan'), 2.0, 0.1, 'x', 1.0],
+    'size': [(1, 1), (1, 2), (2, 2), (0, 3), (4, 4), (5, 5)],
+    'tags': [['a', 'b'], [], ['a'], ['a', 'b', 'c'], ['x', 'y'], ['z', 'z']],
+    'shot.code': ['1', 'a', '22', '', '3', '42'],
+}
+
+EXPECTED = [
+    {},
+    {'name': 'Missing required field', 'mail': 'Not a valid email address',
+     'age': 'Out of range 0 - 120', 'ratio': 'Out of range 0.0 - 1.0',
+     'size': 'Odd sum', 'tags': 'Missing required field',
+     'shot.code': 'Digits'},
+    {'name': 'Min Length 3', 'age': 'Out of range 0 - 120',
+     'ratio': 'Out of range 0.0 - 1.0', 'tags': 'Min Length 2'},
+    {'name': 'Max Length 6', 'mail': 'Not a valid email address',
+     'size': 'Odd sum', 'shot.code': 'Digits'},
+    {'ratio': 'Not a number'},
+    {'name': 'Missing required field'},
+]
+
+
+class Note(Form):
+    note = StringField('Note', validators=(silent,))
+
+
+def check_result(result):
+    assert result.size == 6
+    for row, expected in enumerate(EXPECTED):
+        errors = result.errors(row)
+        errors.pop('note')  # Fails in every row
+        assert errors == expected, (row, errors)
+    assert result.invalid_rows() == [0, 1, 2, 3, 4, 5]
+    assert result.counts()['name'] == 4
+    assert not result.valid
+
+
+def require_numpy():
+    np = get_numpy()
+    if np is None:
+        raise SkipTest('NumPy is not installed')
+    return np
+
+
+def test_form_columns():
+    names = [name for name, _ in form_columns(Asset)]
+    assert names[-1] == 'shot.code'
+    assert names[0] == 'name'
+
+
+def test_list_path():
+    check_result(validate_columns(Asset, COLUMNS, use_numpy=False))
+
+
+def test_numpy_path():
+    require_numpy()
+    check_result(validate_columns(Asset, COLUMNS))
+
+
+def test_numpy_arrays_match_list_path():
+    np = require_numpy()
+    columns = dict(
+        name=np.array(['bob', '', 'al', 'robertson', 'alice', 'x']),
+        age=np.array([1, 200, -1, 3, 5, 120]),
+        ratio=np.array([0.5, np.nan, 2.0, 0.1, -0.5, 1.0]),
+        size=np.array([[1, 1], [1, 2], [2, 2], [0, 3], [4, 4], [5, 5]]),
+    )
+    columns['shot.code'] = np.array(['1', 'a', '22', '', '3', '42'])
+    lists = dict((name, values.tolist()) for name, values in columns.items())
+    lists['size'] = [tuple(row) for row in lists['size']]
+
+    with_numpy = validate_columns(Asset, columns)
+    without = validate_columns(Asset, lists, use_numpy=False)
+    for row in range(6):
+        assert with_numpy.errors(row) == without.errors(row), row
+    assert with_numpy.errors(1)['ratio'] == 'Out of range 0.0 - 1.0'
+    assert with_numpy.errors(1)['size'] == 'Odd sum'
+
+    mask = with_numpy.mask()
+    assert mask.shape == (6, len(with_numpy.names))
+    assert mask.tolist() == [
+        [bool(c) for c in row] for row in without.mask()
+    ]
+
+
+def test_mixed_types_are_not_converted():
+    require_numpy()
+    columns = {'name': ['abc', 0, 'abcd']}
+    with_numpy = validate_columns(Asset, columns)
+    without = validate_columns(Asset, columns, use_numpy=False)
+    for row in range(3):
+        assert with_numpy.errors(row) == without.errors(row)
+    assert with_numpy.errors(1)['name'] == 'Missing required field'
+
+
+def test_missing_columns_use_defaults():
+    result = validate_columns(Note, {'note': []}, use_numpy=False)
+    assert result.size == 0 and result.valid
+    result = validate_columns(Asset, {'age': [500]}, use_numpy=False)
+    assert result.errors(0)['name'] == 'Missing required field'
+    assert result.errors(0)['age'] == 'Out of range 0 - 120'
+
+
+def test_empty_message_is_an_error():
+    for use_numpy in (False, True):
+        result = validate_columns(Note, {'note': ['a', 'b']}, use_numpy)
+        assert result.errors(0) == {'note': 'Invalid value'}
+        assert result.invalid_rows() == [0, 1]
+
+
+def test_columns_must_have_equal_length():
+    try:
+        validate_columns(Asset, {'name': ['a'], 'age': [1, 2]})
+    except ValueError:
+        pass
+    else:
+        assert False
+
+
+def unknown_shot(value):
+    raise ValidationError('Unknown shot {}'.format(value))
+
+
+class Manifest(Form):
+    shot = StringField('Shot', validators=(unknown_shot,))
+
+
+def check_many_messages(use_numpy, size):
+    shots = ['sh{:05d}'.format(i) for i in range(size)]
+    result = validate_columns(Manifest, {'shot': shots}, use_numpy)
+    assert len(result.messages['shot']) == size + 1
+    assert result.counts() == {'shot': size}
+    assert result.errors(size - 1) == {
+        'shot': 'Unknown shot sh{:05d}'.format(size - 1)
+    }
+    assert result.errors(0) == {'shot': 'Unknown shot sh00000'}
+
+
+def test_many_messages_list_path():
+    check_many_messages(False, 300)
+    check_many_messages(False, 70000)
+
+
+def test_many_messages_numpy_path():
+    require_numpy()
+    check_many_messages(True, 300)
+    check_many_messages(True, 70000)
@@ -0,0 +1,99 @@
+import os
+import tempfile
+from qtapp import get_app, process_events
+from psforms.controls import (
+    IntOptionControl, ModelListControl, OptionControl, StringControl
+)
+from psforms.fields import IntOptionField, StringOptionField
+from psforms.itemmodels import OptionModel
+from psforms.validators import exists, required, stat_cache
+
+
+def setup_module():
+    get_app()
+
+
+def numbered(count):
+    for i in range(count):
+        yield 'item {}'.format(i), i
+
+
+def test_model_list_control_fetches_lazily():
+    control = ModelListControl('Items', options=numbered(100000),
+                               batch_size=100)
+    assert len(control.model._labels) <= 100
+    control.set_value(['item 5', 'item 6', 'item 1500'])
+    assert len(control.model._labels) < 2000
+    assert control.get_value() == ['item 5', 'item 6', 'item 1500']
+    assert control.get_data() == [5, 6, 1500]
+    assert control.get_ranges() == [(5, 6), (1500, 1500)]
+
+
+def test_model_list_control_filter_keeps_selection():
+    control = ModelListControl('Items', options=numbered(50),
+                               filterable=True)
+    control.set_value(['item 3', 'item 12'])
+    control.set_filter('item 1')
+    assert control.model.rowCount() == 11
+    assert control.get_value() == ['item 3', 'item 12']
+    selected = control.view.selectionModel().selectedRows()
+    assert [control.model.source_row(i.row()) for i in selected] == [12]
+    control.set_filter('')
+    assert control.get_value() == ['item 3', 'item 12']
+
+
+def test_option_controls_share_a_model():
+    model = OptionModel.shared('test_controls', ['a', 'b', 'c'])
+    first = OptionControl('First', options=model)
+    second = OptionControl('Second', options=model, filterable=True)
+    assert first.model is second.model is model
+    first.set_value('b')
+    second.set_value('c')
+    assert (first.get_value(), second.get_value()) == ('b', 'c')
+
+    second.filter_model.set_filter('a')
+    assert second.filter_model.rowCount() == 1
+    assert model.rowCount() == 3
+    assert first.widget.count() == 3
+
+
+def test_expensive_validators_run_in_the_background():
+    control = StringControl('Path', validators=(required, exists),
+                            debounce=20)
+    control.validate(block=False)
+    assert control.errlabel.text() == '*Missing required field'
+
+    stat_cache.clear()
+    control.set_value(os.path.join(tempfile.gettempdir(), 'psforms_none'))
+    control.validate(block=False)
+    assert process_events(
+        lambda: control.errlabel.text() == '*Path does not exist'
+    )
+
+    control.set_value(tempfile.gettempdir())
+    control.emit_changed()
+    control.emit_changed()
+    assert not control.valid  # Debounced
+    assert process_events(lambda: control.valid)
+
+
+def test_new_option_controls_select_the_first_option():
+    control = OptionControl('Letters', options=['a', 'b', 'c'])
+    assert control.widget.count() == 3
+    assert control.get_value() == 'a'
+    assert IntOptionControl('Index', options=['a', 'b']).get_value() == 0
+
+    many = OptionControl('Many', options=('o{}'.format(i)
+                                          for i in range(10000)))
+    assert 0 < many.widget.count() < 10000
+    assert many.get_value() == 'o0'
+    many.set_value('o9999')
+    assert many.get_value() == 'o9999'
+
+
+def test_option_field_defaults_match_the_control():
+    field = StringOptionField('Letters', options=['a', 'b'])
+    control = field.create()
+    assert control.get_value() == field.get_default() == 'a'
+    field = IntOptionField('Index', options=['a', 'b'])
+    assert field.create().get_value() == field.get_default() == 0
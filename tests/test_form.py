@@ -0,0 +1,80 @@
+from psforms.fields import FloatField, Int2Field, IntField, StringField
+from psforms.form import Form, FormMetaData, generate_form
+from psforms.validators import required
+
+
+class Address(Form):
+    meta = FormMetaData(title='Address')
+    street = StringField('Street')
+
+
+class Base(Form):
+    meta = FormMetaData(title='Base')
+    name = StringField('Name', default='anon')
+    age = IntField('Age', range=(18, 99))
+    home = Address()
+
+
+class Child(Base):
+    email = StringField('Email', validators=(required,))
+    work = Address()
+
+
+def test_fields_in_declaration_order():
+    names = [name for name, field in Child.fields()]
+    assert names == ['name', 'age', 'email']
+    assert [name for name, form in Child.forms()] == ['home', 'work']
+
+
+def test_schema_is_built_once():
+    assert isinstance(Child.fields(), tuple)
+    assert Child.fields() is Child.fields()
+    assert Base.fields() is not Child.fields()
+    assert [name for name, field in Base.fields()] == ['name', 'age']
+
+
+def test_defaults():
+    assert Child.defaults() == {
+        'name': 'anon',
+        'age': 18,
+        'email': '',
+        'home': {'street': ''},
+        'work': {'street': ''},
+    }
+
+
+def test_has_validators():
+    assert not Address.has_validators()
+    assert not Base.has_validators()
+    assert Child.has_validators()
+
+    class Outer(Form):
+        inner = Child()
+
+    assert Outer.has_validators()
+
+
+def test_generate_form():
+    form = generate_form('person', [
+        {'type': 'str', 'name': 'name', 'label': 'Name'},
+        {'type': 'IntField', 'name': 'age'},
+        {'type': 'form', 'name': 'home', 'fields': [
+            {'type': 'str', 'name': 'street'},
+        ]},
+    ])
+    assert form.meta.title == 'Person'
+    assert [name for name, field in form.fields()] == ['name', 'age']
+    assert form.fields()[0][1].nice_name == 'Name'
+    assert form.defaults() == {'name': '', 'age': 0, 'home': {'street': ''}}
+
+
+def test_spin_defaults_match_the_controls():
+    class Spins(Form):
+        centered = IntField('Centered', range=(-5, 5))
+        positive = FloatField('Positive', range=(1.5, 3.0))
+        negative = IntField('Negative', range=(-9, -2))
+        pair = Int2Field('Pair', range1=(2, 4))
+
+    assert Spins.defaults() == {
+        'centered': 0, 'positive': 1.5, 'negative': -2, 'pair': (2, 0),
+    }
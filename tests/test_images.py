@@ -0,0 +1,279 @@
+import os
+import shutil
+import tempfile
+import threading
+from qtapp import QtCore, get_app, process_events
+from Qt import QtGui
+from psforms import images, resource
+from psforms.images import image_bytes, image_cache, image_key
+
+
+def setup_module():
+    global tmpdir
+    get_app()
+    resource.load()
+    tmpdir = tempfile.mkdtemp()
+
+
+def teardown_module():
+    shutil.rmtree(tmpdir)
+
+
+def make_image(name, width=64, height=32, color=QtCore.Qt.red):
+    '''Write a solid color image to the temp dir, returns its path.'''
+
+    image = QtGui.QImage(width, height, QtGui.QImage.Format_RGB32)
+    image.fill(color)
+    path = os.path.join(tmpdir, name)
+    assert image.save(path)
+    return path
+
+
+def test_image_bytes():
+    image = QtGui.QImage(10, 4, QtGui.QImage.Format_ARGB32)
+    assert image_bytes(image) == 160
+    assert image_bytes([image, image]) == 320
+    assert image_bytes(QtGui.QPixmap(10, 4)) > 0
+
+
+def test_image_key_follows_modification_time():
+    path = make_image('key.png')
+    key = image_key(path)
+    assert key[0] == path
+    mtime = os.stat(path).st_mtime
+    os.utime(path, (mtime + 10, mtime + 10))
+    assert image_key(path) != key
+    assert image_key(os.path.join(tmpdir, 'missing.png')) is None
+    assert image_key(':/images/noimg') == (':/images/noimg', 0)
+
+
+def test_scaling_image_uses_image_cache():
+    from psforms.widgets import ScalingImage
+
+    path = make_image('cached.png')
+    image_cache.clear()
+    widget = ScalingImage(path)
+    key = image_key(path)
+    assert key in image_cache
+    assert widget.key == key
+    assert widget.img is image_cache.get(key)
+    assert ('pixmap', key, (widget.width(), widget.height())) in image_cache
+
+    other = ScalingImage(path)
+    assert other.img is widget.img
+    assert image_cache.weight == sum(
+        image_bytes(value) for value in image_cache._data.values()
+    )
+
+
+class Receiver(object):
+    '''Stands in for a ScalingImage, recording the images it receives.'''
+
+    def __init__(self):
+        self._image_generation = None
+        self.received = []
+
+    def set_loaded_image(self, key, image):
+        self.received.append((key, image))
+
+
+def test_read_image_downscales():
+    path = make_image('large.png', 400, 200)
+    key, image = images.read_image(path, (100, 100))
+    assert key == image_key(path) + (100, 100)
+    assert (image.width(), image.height()) == (200, 100)
+
+    key, image = images.read_image(path, (1000, 1000))
+    assert (image.width(), image.height()) == (400, 200)
+    assert images.read_image(os.path.join(tmpdir, 'missing.png')) == (
+        None, None
+    )
+
+
+def test_loader_delivers_latest_request():
+    first = make_image('first.png', color=QtCore.Qt.green)
+    second = make_image('second.png', color=QtCore.Qt.blue)
+    loader = images.ImageLoader(max_workers=1)
+    receiver = Receiver()
+    busy = threading.Event()
+    try:
+        loader.executor.submit(busy.wait, 2)  # Keep requests queued
+        loader.load(receiver, first)
+        loader.load(receiver, second)
+        busy.set()
+        assert process_events(lambda: receiver.received)
+        process_events(timeout=0.1)
+    finally:
+        loader.shutdown()
+
+    assert len(receiver.received) == 1
+    key, image = receiver.received[0]
+    assert key == image_key(second)
+    assert image.pixelColor(0, 0) == QtGui.QColor(QtCore.Qt.blue)
+    assert image_cache.get(key) is image
+    assert receiver._image_generation is None
+
+
+def test_loader_cancel():
+    path = make_image('cancelled.png')
+    loader = images.ImageLoader(max_workers=1)
+    receiver = Receiver()
+    busy = threading.Event()
+    try:
+        loader.executor.submit(busy.wait, 2)
+        loader.load(receiver, path)
+        loader.cancel(receiver)
+        busy.set()
+        process_events(timeout=0.2)
+    finally:
+        loader.shutdown()
+    assert receiver.received == []
+
+
+def test_load_image_shows_placeholder_until_decoded():
+    from psforms.widgets import ScalingImage
+
+    path = make_image('async.png', color=QtCore.Qt.yellow)
+    widget = ScalingImage()
+    loader = images.get_loader()
+    busy = threading.Event()
+    for i in range(loader.max_workers):
+        loader.executor.submit(busy.wait, 2)
+    widget.load_image(path)
+    assert widget.key == image_key(ScalingImage.placeholder)
+    assert id(widget) in loader._futures
+    busy.set()
+    assert process_events(lambda: widget.key and widget.key[0] == path)
+    assert widget.img.pixelColor(0, 0) == QtGui.QColor(QtCore.Qt.yellow)
+    assert id(widget) not in loader._futures
+
+
+class DoneExecutor(object):
+    '''Executor running tasks on submit, so their futures are done before
+    any callback is added.'''
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def test_loader_forgets_finished_requests():
+    path = make_image('finished.png')
+    loader = images.ImageLoader()
+    loader._executor = DoneExecutor()
+    receiver = Receiver()
+    loader.load(receiver, path)
+    assert len(receiver.received) == 1
+    assert loader._futures == {}
+
+
+def test_build_mips():
+    image = QtGui.QImage(1024, 512, QtGui.QImage.Format_RGB32)
+    levels = images.build_mips(image)
+    sizes = [(level.width(), level.height()) for level in levels]
+    assert sizes == [(512, 256), (256, 128)]
+    small = QtGui.QImage(200, 200, QtGui.QImage.Format_RGB32)
+    assert images.build_mips(small) == []
+
+
+def test_nearest_level():
+    image = QtGui.QImage(1024, 512, QtGui.QImage.Format_RGB32)
+    levels = [image] + images.build_mips(image)
+    assert images.nearest_level(levels, 100, 100) is levels[2]
+    assert images.nearest_level(levels, 300, 200) is levels[1]
+    assert images.nearest_level(levels, 600, 100) is levels[0]
+    assert images.nearest_level(levels, 4000, 4000) is levels[0]
+
+
+def test_mips_are_cached_per_image():
+    from psforms.widgets import ScalingImage
+
+    path = make_image('mips.png', 1024, 512)
+    image_cache.clear()
+    widget = ScalingImage(path)
+    mips = widget.get_mips()
+    assert len(mips) == 3 and mips[0] is widget.img
+    assert image_cache.get(('mips', widget.key)) == mips[1:]
+
+    other = ScalingImage(path)
+    assert other.get_mips()[1] is mips[1]
+
+
+def test_resizes_are_coalesced():
+    from psforms.widgets import ScalingImage
+
+    widget = ScalingImage(make_image('resize.png', 512, 512))
+    widget.resize(300, 200)
+    widget.show()
+    process_events(timeout=0.05)
+    scaled = []
+    scale_pixmap = widget.scale_pixmap
+    widget.scale_pixmap = lambda: scaled.append(1) or scale_pixmap()
+    for width in range(301, 311):
+        widget.resize(width, 200)
+        widget.repaint()
+    assert scaled == []
+    assert process_events(lambda: scaled, timeout=1.0)
+    assert len(scaled) == 1
+    assert widget.pixmap.width() == 310
+    widget.close()
+
+
+def test_thumbnail_cache_round_trip():
+    cache = images.ThumbnailCache(os.path.join(tmpdir, 'thumbs'))
+    opaque = QtGui.QImage(32, 16, QtGui.QImage.Format_RGB32)
+    opaque.fill(QtCore.Qt.red)
+    cache.store(('a.png', 1, 32, 16), opaque)
+    loaded = cache.load(('a.png', 1, 32, 16))
+    assert (loaded.width(), loaded.height()) == (32, 16)
+    assert cache.load(('a.png', 2, 32, 16)) is None
+
+    transparent = QtGui.QImage(8, 8, QtGui.QImage.Format_ARGB32)
+    transparent.fill(QtCore.Qt.transparent)
+    cache.store(('b.png', 1), transparent)
+    assert cache.load(('b.png', 1)).pixelColor(0, 0).alpha() == 0
+    assert not [
+        name for name in os.listdir(cache.root) if name.endswith('.tmp')
+    ]
+    cache.clear()
+    assert os.listdir(cache.root) == []
+
+
+def test_thumbnail_cache_removes_least_recently_used():
+    cache = images.ThumbnailCache(os.path.join(tmpdir, 'lru'))
+    image = QtGui.QImage(64, 64, QtGui.QImage.Format_RGB32)
+    image.fill(QtCore.Qt.blue)
+    for i in range(3):
+        cache.store(i, image)
+        stamp = 1000000 + i * 10
+        os.utime(cache.filename(i), (stamp, stamp))
+    size = os.path.getsize(cache.filename(0))
+    cache.load(0)  # Now the most recently used
+
+    cache.max_bytes = size * 2
+    cache.cleanup()
+    assert cache.load(1) is None
+    assert cache.load(0) is not None
+
+
+def test_read_image_uses_thumbnail_cache():
+    path = make_image('thumbnailed.png', 400, 400)
+    image_cache.clear()
+    cache = images.enable_thumbnail_cache(os.path.join(tmpdir, 'enabled'))
+    try:
+        key, image = images.read_image(path, (100, 100))
+        assert cache.load(key) is not None
+        mtime = os.stat(path).st_mtime + 10
+        os.utime(path, (mtime, mtime))
+        assert images.read_image(path, (100, 100))[0] != key
+
+        key, image = images.read_image(path, (1000, 1000))
+        assert cache.load(key) is None  # Not downscaled
+    finally:
+        images.disable_thumbnail_cache()
+    assert images.thumbnail_cache is None
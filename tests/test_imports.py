@@ -0,0 +1,67 @@
+import json
+import subprocess
+import sys
+from unittest import SkipTest
+
+SNIPPET = '''
+import json, sys
+import psforms
+from psforms import Form, StringField, required
+
+
+class AssetForm(Form):
+    name = StringField('Name', validators=(required,))
+
+
+AssetForm.as_model().validate({'name': 'asset'})
+print(json.dumps([m for m in ('Qt', 'psforms.controls', 'psforms.widgets',
+                              'psforms.resource') if m in sys.modules]))
+'''
+
+
+def test_import_is_headless():
+    output = subprocess.check_output([sys.executable, '-c', SNIPPET])
+    loaded = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+    assert loaded == [], loaded
+
+
+def test_stylesheet_is_read_on_access():
+    import psforms
+    assert 'QWidget' in psforms.stylesheet
+
+
+def test_missing_attribute():
+    import psforms
+    try:
+        psforms.does_not_exist
+    except AttributeError:
+        pass
+    else:
+        assert False, 'Expected AttributeError'
+
+
+STAR_SNIPPET = '''
+from psforms import *
+print(len(stylesheet), controls.__name__, widgets.__name__,
+      resource.__name__, Form.__name__, required.__name__)
+'''
+
+
+def test_star_import():
+    try:
+        import Qt  # noqa, star imports load the Qt modules
+    except ImportError:
+        raise SkipTest('No Qt binding available')
+    output = subprocess.check_output([sys.executable, '-c', STAR_SNIPPET])
+    words = output.decode('utf-8').split()
+    assert int(words[0]) > 0
+    assert words[1:] == ['psforms.controls', 'psforms.widgets',
+                         'psforms.resource', 'Form', 'required']
+
+
+def test_all_names_exist():
+    import psforms
+    eager = [name for name in psforms.__all__
+             if name not in psforms._lazy_modules and name != 'stylesheet']
+    for name in eager:
+        assert hasattr(psforms, name), name
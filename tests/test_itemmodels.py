@@ -0,0 +1,127 @@
+from qtapp import get_app
+from psforms.itemmodels import (
+    FilterModel, ListModel, OptionModel, TextIndex, merge_rows, trigrams
+)
+
+
+def setup_module():
+    get_app()
+
+
+def test_trigrams():
+    assert trigrams('abcd') == set(['abc', 'bcd'])
+    assert trigrams('ab') == set()
+
+
+def test_text_index_search():
+    texts = ['Apple', 'Banana', 'Pineapple']
+    index = TextIndex(texts)
+    assert index.search('apple') == [0, 2]
+    texts.append('Snapple')
+    index.update()
+    assert index.search('APP') == [0, 2, 3]
+    assert index.search('an') == [1]
+
+
+def test_merge_rows():
+    assert merge_rows([5, 1, 2, 3, 7, 6]) == [(1, 3), (5, 7)]
+    assert merge_rows([]) == []
+
+
+def test_list_model_fetches_in_batches():
+    model = ListModel(('item{}'.format(i) for i in range(10)), batch_size=4)
+    assert model.rowCount() == 0
+    assert model.canFetchMore()
+    model.fetchMore()
+    assert model.rowCount() == 4
+    assert model.find('item8') == 8
+    assert model.rowCount() == 10
+    assert model.find('missing') == -1
+    assert not model.canFetchMore()
+
+
+def test_list_model_items_with_data():
+    model = ListModel([('One', 1), ('Two', 2)])
+    model.fetch()
+    assert model.label(1) == 'Two'
+    assert model.item_data(1) == 2
+    assert model.fetch_row(1)
+    assert not model.fetch_row(2)
+
+
+def test_list_model_inserts_after_begin_insert_rows():
+    model = ListModel(['a', 'b', 'c'], batch_size=2)
+    seen = []
+
+    def before(parent, first, last):
+        seen.append(('before', model.rowCount(), first, last))
+
+    def after(parent, first, last):
+        seen.append(('after', model.rowCount(), first, last))
+
+    model.rowsAboutToBeInserted.connect(before)
+    model.rowsInserted.connect(after)
+    model.fetchMore()
+    model.fetchMore()
+    assert seen == [
+        ('before', 0, 0, 1), ('after', 2, 0, 1),
+        ('before', 2, 2, 2), ('after', 3, 2, 2),
+    ]
+
+
+def test_list_model_filter():
+    model = ListModel(['red', 'green', 'blue', 'dark red'], batch_size=2)
+    model.fetchMore()
+    model.filter = 're'
+    assert model.rowCount() == 2
+    model.fetchMore()
+    assert [model.label(model.source_row(r)) for r in range(3)] == [
+        'red', 'green', 'dark red'
+    ]
+    assert model.model_rows([0, 2, 3]) == [0, 2]
+    model.filter = ''
+    assert model.rowCount() == 4
+
+
+def test_option_model_shared():
+    model = OptionModel.shared('test_colors', ['red', 'green'])
+    assert OptionModel.shared('test_colors') is model
+    OptionModel.shared('test_colors', ['blue'])
+    assert model.find('blue') == 0
+
+
+def test_filter_model_filters_incrementally():
+    pulled = []
+
+    def items():
+        for i in range(10000):
+            pulled.append(i)
+            yield 'item{}'.format(i)
+
+    source = ListModel(items(), batch_size=100)
+    source.fetchMore()
+    filtered = FilterModel(source)
+    filtered.set_filter('item5')
+    assert len(pulled) == 100
+    assert filtered.rowCount() == 11  # item5, item50 - item59
+
+    assert filtered.canFetchMore()
+    filtered.fetchMore()
+    assert len(pulled) == 600
+    assert filtered.rowCount() == 11 + 100
+    assert source.rowCount() == 600
+
+    filtered.set_filter('')
+    assert filtered.rowCount() == 600
+
+
+def test_filter_model_leaves_source_untouched():
+    source = ListModel(['red', 'green', 'blue'])
+    source.fetch()
+    filtered = FilterModel(source)
+    filtered.set_filter('e')
+    assert filtered.rowCount() == 3
+    filtered.set_filter('bl')
+    index = filtered.index(0, 0)
+    assert filtered.data(index) == 'blue'
+    assert source.rowCount() == 3
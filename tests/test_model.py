@@ -0,0 +1,129 @@
+from psforms.exc import FieldNotFound, ValidationError
+from psforms.fields import (
+    BoolField, FloatField, Int2Field, IntField, ListField, StringField
+)
+from psforms.form import Form
+from psforms.validators import email, in_range, min_length, required
+
+
+def silent(value):
+    raise ValidationError()
+
+
+class Shot(Form):
+    code = StringField('Code', validators=(required, min_length(3)))
+    frames = IntField('Frames', range=(1, 1000))
+
+
+class Asset(Form):
+    name = StringField('Name', validators=(required,))
+    age = IntField('Age', range=(0, 120))
+    ratio = FloatField('Ratio', range=(0.0, 1.0))
+    size = Int2Field('Size', default=(1920, 1080))
+    enabled = BoolField('Enabled')
+    tags = ListField('Tags')
+    note = StringField('Note', validators=(silent,))
+    shot = Shot()
+
+
+def valid_record(**values):
+    record = {'name': 'tree', 'note': 'x', 'shot': {'code': 'sh010'}}
+    record.update(values)
+    return record
+
+
+def test_defaults():
+    model = Asset.as_model()
+    defaults = model.defaults()
+    assert defaults['size'] == (1920, 1080)
+    assert defaults['shot'] == {'code': '', 'frames': 1}
+    defaults['tags'].append('changed')
+    assert model.defaults()['tags'] == []
+
+
+def test_validate_nested():
+    model = Asset.as_model()
+    errors = model.validate({'shot': {'code': 'ab'}})
+    assert errors['name'] == 'Missing required field'
+    assert errors['note'] == 'Invalid value'  # Raised without a message
+    assert errors['shot'] == {'code': 'Min Length 3'}
+    assert not model.is_valid({})
+
+
+def test_validate_checks_ranges():
+    model = Asset.as_model()
+    assert model.validate(valid_record(note=None)) == {'note': 'Invalid value'}
+
+    errors = model.validate(valid_record(age=500, ratio=float('nan')))
+    assert errors['age'] == 'Out of range 0 - 120'
+    assert errors['ratio'] == 'Out of range 0.0 - 1.0'
+    assert not model.is_valid(valid_record(age=500))
+    assert model.validate(valid_record(age='old'))['age'] == 'Not a number'
+    errors = model.validate(valid_record(shot={'code': 'sh010', 'frames': 0}))
+    assert errors['shot'] == {'frames': 'Out of range 1 - 1000'}
+
+
+def test_validate_values_of_the_wrong_type():
+    class Contact(Form):
+        name = StringField('Name', validators=(min_length(3),))
+        mail = StringField('Mail', validators=(required, email))
+
+    model = Contact.as_model()
+    errors = model.validate({'name': None, 'mail': None})
+    assert errors == {'name': 'Min Length 3', 'mail': 'Missing required field'}
+    errors = model.validate({'name': 5, 'mail': 5})
+    assert errors == {'name': 'Invalid value', 'mail': 'Invalid value'}
+    assert not model.is_valid({'name': 5, 'mail': 'a@b.com'})
+    assert model.is_valid({'name': 'abc', 'mail': 'a@b.com'})
+
+
+def test_field_validators_include_range():
+    validators = Asset.age.get_validators()
+    assert validators[0].spec == ('range', (0, 120), 'Out of range 0 - 120')
+    assert Asset.age.get_validators() is validators
+    assert Asset.name.get_validators() == Asset.name.validators
+    assert Asset.age.chain(121) == 'Out of range 0 - 120'
+
+
+def test_in_range():
+    check = in_range(1, 3)
+    assert check(2)
+    for value in (0, 4, 'x', None):
+        try:
+            check(value)
+        except ValidationError:
+            pass
+        else:
+            assert False, value
+
+
+def test_coerce():
+    model = Asset.as_model()
+    data = model.coerce({
+        'age': '42', 'ratio': '0.5', 'size': ['1', '2'], 'enabled': 'yes',
+        'tags': 'one', 'unknown': 1, 'shot': {'frames': '12.0'},
+    })
+    assert data['age'] == 42
+    assert data['ratio'] == 0.5
+    assert data['size'] == (1, 2)
+    assert data['enabled'] is True
+    assert data['tags'] == ['one']
+    assert data['shot'] == {'code': '', 'frames': 12}
+    assert 'unknown' not in data
+
+
+def test_coerce_errors():
+    model = Asset.as_model()
+    for record in ({'age': 'old'}, {'enabled': 'maybe'}, {'shot': 1}):
+        try:
+            model.coerce(record)
+        except ValidationError:
+            pass
+        else:
+            assert False, record
+    try:
+        model.coerce({'unknown': 1}, strict=True)
+    except FieldNotFound:
+        pass
+    else:
+        assert False
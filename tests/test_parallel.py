@@ -0,0 +1,173 @@
+import pickle
+from psforms import parallel
+from psforms.exc import ValidationError
+from psforms.fields import FileField, IntField, ListField, StringField
+from psforms.form import Form, generate_form
+from psforms.parallel import (
+    ParallelValidator, dump_validator, form_schema, load_schema,
+    load_validator, validate_parallel
+)
+from psforms.validators import matches_filters, min_length, regex, required
+
+
+def convention(value):
+    if not value.endswith('_v001'):
+        raise ValidationError('Bad name')
+
+
+class Shot(Form):
+    code = StringField('Code', validators=(regex(r'^\d+$', 'Digits'),))
+
+
+class Asset(Form):
+    name = StringField(
+        'Name', validators=(required, min_length(3), convention)
+    )
+    age = IntField('Age', range=(0, 120))
+    path = FileField('Path', validators=(matches_filters(['*.png']),))
+    shot = Shot()
+
+
+def records(count):
+    for i in range(count):
+        yield {
+            'name': 'tree_v001' if i % 4 else 'tree',
+            'age': 500 if i % 5 == 0 else 10,
+            'path': 'a.png' if i % 3 else 'a.jpg',
+            'shot': {'code': str(i) if i % 7 else 'x'},
+        }
+
+
+def expected(count):
+    model = Asset.as_model()
+    return [(i, model.validate(r)) for i, r in enumerate(records(count))]
+
+
+def test_matches_filters_round_trip():
+    validator = matches_filters(['Images (*.png *.jpg)'], 'Not an image')
+    data = pickle.loads(pickle.dumps(dump_validator(validator)))
+    assert data[0] == 'factory'
+    loaded = load_validator(data)
+    assert loaded('a.PNG')
+    try:
+        loaded('a.exr')
+    except ValidationError as e:
+        assert str(e) == 'Not an image'
+    else:
+        assert False
+
+
+def test_spec_validators_round_trip():
+    for validator in (required, min_length(2), regex('^a', 'No a')):
+        data = pickle.loads(pickle.dumps(dump_validator(validator)))
+        loaded = load_validator(data)
+        assert loaded.spec[0] == validator.spec[0]
+        assert pickle.loads(pickle.dumps(loaded)).spec == loaded.spec
+
+
+def test_unpicklable_validator_is_rejected():
+    try:
+        dump_validator(lambda value: None)
+    except ValueError:
+        pass
+    else:
+        assert False
+
+
+def test_form_schema_round_trip():
+    schema = pickle.loads(pickle.dumps(form_schema(Asset)))
+    form = load_schema('Asset', schema)
+    assert [name for name, _ in form.fields()] == ['name', 'age', 'path']
+    assert [name for name, _ in form.forms()] == ['shot']
+    model = form.as_model()
+    for i, record in enumerate(records(20)):
+        assert model.validate(record) == Asset.as_model().validate(record)
+    assert model.validate({'age': 500})['age'] == 'Out of range 0 - 120'
+
+
+def test_form_schema_rejects_iterators():
+    class Lazy(Form):
+        items = ListField('Items', options=(str(i) for i in range(3)))
+
+    try:
+        form_schema(Lazy)
+    except ValueError as e:
+        assert 'options' in str(e)
+    else:
+        assert False
+
+    class Listed(Form):
+        items = ListField('Items', options=['a', 'b'])
+
+    assert form_schema(Listed)[0]['options'] == ['a', 'b']
+
+
+def test_generate_form_accepts_class_names_and_subforms():
+    fields = [
+        {'type': 'IntField', 'name': 'age', 'range': (0, 10)},
+        {'type': 'form', 'name': 'sub', 'fields': [
+            {'type': 'str', 'name': 'code'},
+        ]},
+    ]
+    form = generate_form('Generated', fields)
+    assert fields[0]['type'] == 'IntField'  # Left untouched
+    assert [name for name, _ in form.forms()] == ['sub']
+    assert form.defaults() == {'age': 0, 'sub': {'code': ''}}
+
+
+def test_invalid_arguments():
+    for kwargs in ({'prefetch': 0}, {'chunk_size': 0}):
+        try:
+            ParallelValidator(Asset, **kwargs)
+        except ValueError:
+            pass
+        else:
+            assert False, kwargs
+
+
+def test_serial_fallback():
+    executor = parallel.ProcessPoolExecutor
+    parallel.ProcessPoolExecutor = None
+    try:
+        results = list(validate_parallel(Asset, records(30), chunk_size=7))
+    finally:
+        parallel.ProcessPoolExecutor = executor
+    assert results == expected(30)
+
+
+def test_process_pool_ordered():
+    if parallel.ProcessPoolExecutor is None:
+        return
+    with ParallelValidator(Asset, max_workers=2, chunk_size=7) as validator:
+        assert list(validator.validate(records(100))) == expected(100)
+        invalid = list(validator.invalid(records(100)))
+    assert invalid == [r for r in expected(100) if r[1]]
+    assert invalid[0][1]['age'] == 'Out of range 0 - 120'
+
+
+def test_process_pool_unordered():
+    if parallel.ProcessPoolExecutor is None:
+        return
+    results = list(validate_parallel(
+        Asset, records(100), max_workers=2, chunk_size=3, ordered=False,
+        prefetch=1,
+    ))
+    assert sorted(results, key=lambda r: r[0]) == expected(100)
+
+
+def test_records_are_consumed_lazily():
+    if parallel.ProcessPoolExecutor is None:
+        return
+    pulled = []
+
+    def tracked():
+        for i, record in enumerate(records(1000)):
+            pulled.append(i)
+            yield record
+
+    with ParallelValidator(Asset, max_workers=2, chunk_size=10,
+                           prefetch=1) as validator:
+        results = validator.validate(tracked())
+        next(results)
+        assert len(pulled) <= 2 * 10 + 10
+        assert len(list(results)) == 999
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+from qtapp import get_app, process_events
+from psforms import paths
+from psforms.paths import DirectoryScanner, iter_directory
+
+
+def setup_module():
+    get_app()
+
+
+class TempDir(object):
+
+    def __enter__(self):
+        self.path = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.path, 'sub'))
+        for name in ('a.txt', 'b.txt'):
+            open(os.path.join(self.path, name), 'w').close()
+        return self.path
+
+    def __exit__(self, *exc_info):
+        shutil.rmtree(self.path)
+
+
+def scan(scanner, directory):
+    found = []
+    finished = []
+    scanner.found.connect(lambda d, entries: found.extend(entries))
+    scanner.finished.connect(lambda d, ok: finished.append(ok))
+    scanner.scan(directory)
+    assert process_events(lambda: finished)
+    return sorted(found), finished[0]
+
+
+def test_iter_directory():
+    with TempDir() as path:
+        entries = sorted(iter_directory(path))
+    assert entries == [('a.txt', False), ('b.txt', False), ('sub', True)]
+
+
+def test_scanner_lists_and_caches():
+    scanner = DirectoryScanner(chunk_size=1)
+    with TempDir() as path:
+        assert scanner.exists(path) is None
+        entries, ok = scan(scanner, path)
+        assert ok
+        assert entries == [('a.txt', False), ('b.txt', False), ('sub', True)]
+        assert scanner.exists(path) is True
+        # Served from the cache
+        assert scan(scanner, path) == (entries, True)
+    scanner.shutdown()
+
+
+def test_scanner_missing_directory():
+    scanner = DirectoryScanner()
+    missing = os.path.join(tempfile.gettempdir(), 'psforms_missing_dir')
+    assert scan(scanner, missing) == ([], False)
+    assert scanner.exists(missing) is False
+    scanner.shutdown()
+
+
+def test_scanner_unexpected_error_finishes_listing():
+    def broken(directory):
+        yield ('ok', False)
+        raise UnicodeDecodeError('utf-8', b'\xff', 0, 1, 'invalid')
+
+    original = paths.iter_directory
+    paths.iter_directory = broken
+    try:
+        scanner = DirectoryScanner()
+        found, ok = scan(scanner, 'broken')
+        assert not ok
+        assert 'broken' not in scanner._pending
+        assert scanner.exists('broken') is False
+        scanner.shutdown()
+    finally:
+        paths.iter_directory = original
@@ -0,0 +1,22 @@
+from qtapp import QtCore, get_app
+from psforms import resource
+
+
+def setup_module():
+    get_app()
+
+
+def test_load_registers_resources():
+    resource.unload()
+    assert not QtCore.QFile.exists(':/icons/plus')
+    assert resource.load()
+    assert resource.load()
+    assert QtCore.QFile.exists(':/icons/plus')
+
+
+def test_unload():
+    resource.load()
+    resource.unload()
+    assert not resource._loaded
+    assert not QtCore.QFile.exists(':/icons/plus')
+    resource.load()
@@ -0,0 +1,57 @@
+from qtapp import get_app, process_events
+from psforms.exc import ValidationError
+from psforms.scheduler import ValidationScheduler
+from psforms.validators import compile_chain, expensive
+
+
+def silent(value):
+    raise ValidationError()
+
+
+@expensive
+def slow_silent(value):
+    raise ValidationError()
+
+
+class FakeControl(object):
+
+    debounce = None
+
+    def __init__(self, validators, value):
+        self.validators = validators
+        self.chain = compile_chain(validators)
+        self.cheap_chain = compile_chain(
+            [v for v in validators if not getattr(v, 'expensive', False)]
+        )
+        self.expensive_chain = compile_chain(
+            [v for v in validators if getattr(v, 'expensive', False)]
+        )
+        self.value = value
+        self.errors = []
+        self._validation_generation = 0
+        self._validation_timer = None
+        self._validation_future = None
+
+    def get_value(self):
+        return self.value
+
+    def set_error(self, error):
+        self.errors.append(error)
+
+
+def test_empty_message_is_an_error():
+    get_app()
+    scheduler = ValidationScheduler()
+    control = FakeControl((silent,), 'value')
+    scheduler.run(control)
+    assert control.errors == ['Invalid value']
+
+
+def test_expensive_empty_message_is_an_error():
+    get_app()
+    scheduler = ValidationScheduler()
+    control = FakeControl((slow_silent,), 'value')
+    scheduler.run(control)
+    assert process_events(lambda: control.errors)
+    assert control.errors == ['Invalid value']
+    scheduler.shutdown()
@@ -0,0 +1,66 @@
+from psforms.utils import LRUCache, flatten
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert len(cache) == 2
+
+
+def test_lru_get_default_and_pop():
+    cache = LRUCache()
+    assert cache.get('missing', 'default') == 'default'
+    cache.set('a', None)
+    assert 'a' in cache
+    assert cache.pop('a') is None
+    assert 'a' not in cache
+
+
+def test_lru_stats():
+    cache = LRUCache()
+    cache.set('a', 1)
+    cache.get('a')
+    cache.get('b')
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1
+    assert stats['items'] == 1
+
+
+def test_lru_evicts_by_weight():
+    cache = LRUCache(maxsize=10, maxweight=10, weigh=len)
+    cache.set('a', 'xxxx')
+    cache.set('b', 'xxxx')
+    assert cache.weight == 8
+    cache.get('a')
+    cache.set('c', 'xxxx')
+    assert 'b' not in cache
+    assert cache.weight == 8
+    cache.set('a', 'x')
+    assert cache.weight == 5
+    cache.set('huge', 'x' * 11)
+    assert 'huge' not in cache
+    assert cache.stats()['weight'] == 5
+
+
+def test_lru_trim_after_lowering_limits():
+    cache = LRUCache(maxsize=10, maxweight=10, weigh=len)
+    for key in 'abc':
+        cache.set(key, 'xxx')
+    cache.maxweight = 6
+    cache.trim()
+    assert list(cache._data) == ['b', 'c']
+    cache.maxsize = 1
+    cache.trim()
+    assert list(cache._data) == ['c']
+    assert cache.weight == 3
+    cache.clear()
+    assert cache.weight == 0 and len(cache) == 0
+
+
+def test_flatten():
+    assert flatten({'a': 1, 'sub': {'b': 2}}) == {'a': 1, 'b': 2}
@@ -0,0 +1,172 @@
+import os
+import shutil
+import tempfile
+import time
+from psforms.exc import ValidationError
+from psforms.validators import (
+    chain_cache, compile_chain, default_message, email, exists, expensive,
+    is_dir, is_expensive, matches_filters, max_length, min_length, regex,
+    required, run_validators, stat_cache, writable
+)
+
+
+def silent(value):
+    raise ValidationError()
+
+
+def test_run_validators_returns_first_message():
+    validators = (required, min_length(3))
+    assert run_validators(validators, '') == 'Missing required field'
+    assert run_validators(validators, 'ab') == 'Min Length 3'
+    assert run_validators(validators, 'abc') is None
+
+
+def test_run_validators_empty_message():
+    assert run_validators((silent,), 'value') == default_message
+    assert run_validators((required, silent), '') == 'Missing required field'
+
+
+def test_builtin_specs():
+    assert required.spec[0] == 'required'
+    assert min_length(2).spec == ('min_length', 2, 'Min Length 2')
+    assert max_length(2).spec == ('max_length', 2, 'Max Length 2')
+    assert regex('^a', 'No a').spec[2] == 'No a'
+    assert email.spec[0] == 'regex'
+
+
+def test_expensive():
+    @expensive
+    def slow(value):
+        pass
+
+    assert is_expensive(slow)
+    assert not is_expensive(required)
+
+
+def test_chain_fuses_builtin_validators():
+    chain = compile_chain((required, min_length(2), regex('^a', 'No a')))
+    assert len(chain.steps) == 1
+    assert chain('') == 'Missing required field'
+    assert chain('a') == 'Min Length 2'
+    assert chain('bb') == 'No a'
+    assert chain('ab') is None
+    assert chain.validate('ab')
+
+
+def test_chain_keeps_order_of_custom_validators():
+    def no_x(value):
+        if 'x' in value:
+            raise ValidationError('Has x')
+
+    chain = compile_chain((required, no_x, max_length(3)))
+    assert len(chain.steps) == 3
+    assert chain('xxxx') == 'Has x'
+    assert chain('aaaa') == 'Max Length 3'
+
+
+def test_chain_empty_message():
+    chain = compile_chain((silent, required))
+    assert chain('value') == default_message
+    try:
+        chain.validate('value')
+    except ValidationError as e:
+        assert str(e) == default_message
+    else:
+        assert False, 'Expected ValidationError'
+
+
+def test_chain_memoizes_results():
+    calls = []
+
+    def counted(value):
+        calls.append(value)
+
+    chain = compile_chain((counted,))
+    chain('a')
+    chain('a')
+    chain(['unhashable'])
+    assert calls == ['a', ['unhashable']]
+
+
+def test_chain_is_not_memoized_when_expensive():
+    @expensive
+    def slow(value):
+        pass
+
+    chain = compile_chain((slow,))
+    assert chain.expensive and chain.cache is None
+
+
+def test_compile_chain_shares_chains():
+    validators = (required, email)
+    assert compile_chain(validators) is compile_chain(list(validators))
+
+
+def test_compile_chain_is_bounded():
+    for i in range(chain_cache.maxsize + 100):
+        compile_chain((min_length(i),))
+    assert len(chain_cache) <= chain_cache.maxsize
+
+
+def fails(validator, value):
+    '''Returns True if validator raises a ValidationError for value.'''
+
+    try:
+        validator(value)
+    except ValidationError:
+        return True
+    return False
+
+
+def test_path_validators():
+    root = tempfile.mkdtemp()
+    try:
+        stat_cache.clear()
+        filename = os.path.join(root, 'file.txt')
+        open(filename, 'w').close()
+        missing = os.path.join(root, 'missing', 'file.txt')
+
+        assert not fails(exists, filename) and not fails(exists, root)
+        assert fails(exists, missing) and fails(exists, '')
+        assert not fails(is_dir, root)
+        assert fails(is_dir, filename) and fails(is_dir, missing)
+        assert not fails(writable, filename)
+        assert not fails(writable, os.path.join(root, 'new.txt'))
+        assert fails(writable, missing) and fails(writable, '')
+        assert is_expensive(exists) and is_expensive(writable)
+    finally:
+        shutil.rmtree(root)
+
+
+def test_stat_cache():
+    root = tempfile.mkdtemp()
+    ttl = stat_cache.ttl
+    try:
+        stat_cache.clear()
+        filename = os.path.join(root, 'late.txt')
+        assert fails(exists, filename)
+        open(filename, 'w').close()
+        assert fails(exists, filename)  # Cached result
+        stat_cache.ttl = 0.01
+        stat_cache.clear()
+        assert not fails(exists, filename)
+        os.remove(filename)
+        time.sleep(0.02)
+        assert fails(exists, filename)
+    finally:
+        stat_cache.ttl = ttl
+        stat_cache.clear()
+        shutil.rmtree(root)
+
+
+def test_matches_filters():
+    check = matches_filters(['Images (*.png *.JPG)', '*.exr'])
+    assert not fails(check, '/tmp/a.png')
+    assert not fails(check, 'B.jpg')
+    assert not fails(check, 'c.EXR')
+    assert fails(check, 'd.tif')
+    assert fails(check, 'png')
+    assert not is_expensive(check)
+    assert run_validators((matches_filters(['*.a'], 'Need a'),), 'x') == (
+        'Need a'
+    )
@@ -0,0 +1,153 @@
+from qtapp import QtCore, QtWidgets, get_app, process_events
+from psforms.exc import ValidationError
+from psforms.fields import IntField, StringField, create_fieldtype
+from psforms.form import Form
+from psforms.validators import compile_chain, required
+from psforms.virtual import VirtualFormWidget, form_rows
+
+
+class SpinControl(QtCore.QObject):
+    '''Minimal control wired like BaseControl, counting validations.'''
+
+    changed = QtCore.Signal()
+
+    def __init__(self, name, default=None, validators=None, debounce=None,
+                 **kwargs):
+        super(SpinControl, self).__init__()
+        self.default = default
+        self.validators = validators
+        self.debounce = debounce
+        self.main_widget = QtWidgets.QWidget()
+        self.label = QtWidgets.QLabel(name)
+        self.spin = QtWidgets.QSpinBox()
+        layout = QtWidgets.QHBoxLayout(self.main_widget)
+        layout.addWidget(self.label)
+        layout.addWidget(self.spin)
+        self.spin.setRange(0, 100000)
+        self.spin.valueChanged.connect(self.emit_changed)
+        self.widgets = (self.spin, self.label)
+        self.scheduled = 0
+        self.errors = []
+        self._validation_generation = 0
+        self._validation_timer = None
+
+    def emit_changed(self, *args):
+        self.changed.emit()
+        self.schedule_validate()
+
+    def schedule_validate(self):
+        self.scheduled += 1
+
+    def set_error(self, error):
+        self.errors.append(error)
+
+    def get_value(self):
+        return self.spin.value()
+
+    def set_value(self, value):
+        self.spin.setValue(value)
+
+    def reset(self):
+        self.set_value(self.default)
+
+
+SpinField = create_fieldtype(
+    'SpinField', control_cls=SpinControl, value_type=int, empty_value=0
+)
+
+
+def odd(value):
+    if value % 2 == 0:
+        raise ValidationError()
+
+
+class Sub(Form):
+    inner = SpinField('Inner', default=3)
+
+
+def make_form(count):
+    attrs = dict(
+        ('field{:03d}'.format(i), SpinField('Field', default=i,
+                                            validators=(odd,)))
+        for i in range(count)
+    )
+    attrs['sub'] = Sub()
+    return type('Big', (Form,), attrs)
+
+
+def setup_module():
+    get_app()
+
+
+def controls(widget):
+    pooled = [c for pool in widget._pool.values() for c in pool]
+    return pooled + list(widget._bound.values())
+
+
+def test_form_rows():
+    rows = form_rows(make_form(2))
+    assert [path for path, _ in rows] == [
+        ('field000',), ('field001',), ('sub', 'inner')
+    ]
+
+
+def test_rebinding_does_not_schedule_validation():
+    widget = VirtualFormWidget(make_form(200))
+    widget.resize(300, 400)
+    widget.show()
+    process_events(timeout=0.05)
+    bar = widget.verticalScrollBar()
+    for value in range(0, bar.maximum(), 150):
+        bar.setValue(value)
+        process_events(timeout=0.01)
+
+    assert len(controls(widget)) < 200
+    assert sum(c.scheduled for c in controls(widget)) == 0
+    row = min(widget._bound)
+    control = widget._bound[row]
+    assert control.get_value() == widget._values[widget.rows[row][0]]
+    widget.close()
+
+
+def test_values_and_errors():
+    widget = VirtualFormWidget(make_form(10))
+    widget.set_value(field001=5, sub={'inner': 4})
+    assert widget.get_value()['field001'] == 5
+    assert widget.get_value()['sub'] == {'inner': 4}
+    assert not widget.valid
+    invalid = widget.invalid_fields()
+    assert 'field001' not in invalid
+    assert 'field000' in invalid and 'sub.inner' not in invalid
+    assert widget._errors[('field000',)] == 'Invalid value'
+    widget.reset()
+    assert widget.get_value()['field001'] == 1
+
+
+def test_empty_message_is_an_error():
+    chain = compile_chain((odd,))
+    assert chain(2) == 'Invalid value'
+
+
+def test_builtin_controls():
+    attrs = dict(
+        ('name{:03d}'.format(i), StringField('Name', validators=(required,)))
+        for i in range(100)
+    )
+    attrs['count'] = IntField('Count', range=(0, 10))
+    form = type('Names', (Form,), attrs)
+    widget = form.as_virtual_widget()
+    widget.resize(300, 400)
+    widget.show()
+    process_events(timeout=0.05)
+    assert 0 < len(widget._bound) < 100
+
+    widget.set_value(name000='a', count=4)
+    assert widget.get_value()['name000'] == 'a'
+    assert widget.get_value()['count'] == 4
+    assert 'name000' not in widget.invalid_fields()
+    assert 'name001' in widget.invalid_fields()
+    widget.scroll_to('count')
+    process_events(timeout=0.05)
+    bound = [widget.rows[row][0] for row in widget._bound]
+    assert ('count',) in bound
+    widget.close()
@@ -0,0 +1,469 @@
+from qtapp import QtWidgets, get_app, process_events
+from psforms.exc import FieldNotFound, ValidationError
+from psforms.fields import (
+    BoolField, FileField, IntField, StringField, StringOptionField, TextField
+)
+from psforms.form import Form, FormMetaData
+from psforms.validators import required
+from psforms.widgets import ControlLayout, LabelMetrics, StyleBatcher
+
+
+def setup_module():
+    get_app()
+
+
+def test_label_metrics_memoized():
+    metrics = LabelMetrics()
+    width = metrics.width('Name')
+    assert width > 0
+    assert metrics.width('Name') == width
+    assert len(metrics._widths) == 1
+    assert metrics.max_width(['Name', 'A much longer label']) > width
+    assert metrics.max_width([]) == 0
+    assert len(metrics._widths) == 2
+
+
+def test_label_metrics_follow_stylesheet():
+    app = get_app()
+    metrics = LabelMetrics()
+    style = app.styleSheet()
+    try:
+        small = metrics.width('Name')
+        app.setStyleSheet('QLabel { font-size: 40px; }')
+        assert metrics.width('Name') > small
+        assert len(metrics._widths) == 1
+    finally:
+        app.setStyleSheet(style)
+
+
+class Address(Form):
+    meta = FormMetaData(title='Address')
+    street = StringField('Street', default='Main St')
+    number = IntField('Number', range=(1, 100))
+
+
+class Plain(Form):
+    meta = FormMetaData(title='Plain')
+    note = StringField('Note')
+
+
+class Person(Form):
+    meta = FormMetaData(
+        title='Person', subforms_as_groups=True, lazy_groups=True
+    )
+    name = StringField('Name', validators=(required,))
+    home = Address()
+    extra = Plain()
+
+
+def test_lazy_group_unbuilt():
+    widget = Person.as_widget()
+    home = widget.forms['home']
+    assert not home.built
+    assert not home.title.isChecked()
+    assert widget.get_value()['home'] == {'street': 'Main St', 'number': 1}
+
+    home.set_value(number=5)
+    assert not home.built
+    assert home.get_value() == {'street': 'Main St', 'number': 5}
+    assert home.get_value(flatten=True) == {'street': 'Main St', 'number': 5}
+    try:
+        home.set_value(missing=1)
+    except FieldNotFound:
+        pass
+    else:
+        assert False, 'Expected FieldNotFound'
+
+    home.reset()
+    assert home.get_value()['number'] == 1
+    assert not home.built
+
+
+def test_lazy_group_without_validators_stays_unbuilt():
+    widget = Person.as_widget()
+    extra = widget.forms['extra']
+    assert extra.valid
+    assert extra.invalid_fields() == []
+    assert not extra.built
+
+
+def test_lazy_group_builds_with_values():
+    widget = Person.as_widget()
+    home = widget.forms['home']
+    home.set_value(street='Elm St')
+    token = home.change_token()
+    home.set_value(number=7)
+
+    home.title.setChecked(True)
+    assert home.built
+    assert home.widget.get_value() == {'street': 'Elm St', 'number': 7}
+    assert home.get_changes(since=token) == {'number': 7}
+
+
+def test_group_attribute_access_builds():
+    widget = Person.as_widget()
+    home = widget.forms['home']
+    assert 'street' in home.controls
+    assert home.built
+
+
+class Settings(Form):
+    meta = FormMetaData(title='Settings', dialog_pool_size=2)
+    name = StringField('Name', default='untitled')
+
+
+def test_cached_dialog_is_reused_and_reset():
+    Settings.clear_dialogs()
+    dialog = Settings.as_dialog(cached=True)
+    received = []
+    dialog.accepted.connect(lambda: received.append('first'))
+    dialog.set_value(name='changed')
+    dialog.reject()
+
+    again = Settings.as_dialog(cached=True)
+    assert again is dialog
+    assert again.get_value() == {'name': 'untitled'}
+    again.accept()
+    assert received == []
+    Settings.clear_dialogs()
+
+
+def test_cached_dialogs_in_use_are_not_shared():
+    Settings.clear_dialogs()
+    first = Settings.as_dialog(cached=True)
+    second = Settings.as_dialog(cached=True)
+    assert first is not second
+    assert Settings.as_dialog() is not first
+    Settings.clear_dialogs()
+
+
+def test_dialog_pool_evicts_least_recently_used():
+    Settings.clear_dialogs()
+    dialogs = [Settings.as_dialog(cached=True) for i in range(3)]
+    for dialog in dialogs:
+        dialog.reject()
+    pool = Settings._dialog_pool
+    assert pool.idle == dialogs[1:]
+    Settings.clear_dialogs()
+    assert pool.idle == []
+
+
+class FakeStyle(object):
+
+    def __init__(self):
+        self.polished = []
+
+    def unpolish(self, widget):
+        pass
+
+    def polish(self, widget):
+        self.polished.append(widget)
+
+
+class FakeWidget(object):
+    '''Stands in for a widget, recording when it is repolished.'''
+
+    def __init__(self, style, polished=True):
+        self._style = style
+        self._polished = polished
+
+    def testAttribute(self, attribute):
+        return self._polished
+
+    def style(self):
+        return self._style
+
+
+def test_style_batcher_repolishes_once_per_tick():
+    style = FakeStyle()
+    widget = FakeWidget(style)
+    batcher = StyleBatcher()
+    batcher.invalidate([widget])
+    batcher.invalidate([widget])
+    assert style.polished == []
+    process_events(lambda: style.polished)
+    assert style.polished == [widget]
+
+
+def test_style_batcher_batch():
+    style = FakeStyle()
+    widgets = [FakeWidget(style), FakeWidget(style, polished=False)]
+    batcher = StyleBatcher()
+    with batcher.batch():
+        with batcher.batch():
+            batcher.invalidate(widgets)
+        assert style.polished == []
+    assert style.polished == widgets[:1]
+    assert not batcher._scheduled
+
+
+def negative(value):
+    if value < 0:
+        raise ValidationError('Negative')
+    return True
+
+
+class Counts(Form):
+    meta = FormMetaData(title='Counts')
+    total = IntField('Total', range=(-10, 10), validators=(negative,))
+    label = StringField('Label', validators=(required,))
+
+
+class Report(Form):
+    meta = FormMetaData(title='Report')
+    count = IntField('Count', range=(-10, 10), validators=(negative,))
+    counts = Counts()
+
+
+def spy_validate(widget, calls):
+    '''Record the names of the controls of widget and its subforms as they
+    are validated.'''
+
+    def spy(name, validate):
+        def wrapper(*args, **kwargs):
+            calls.append(name)
+            return validate(*args, **kwargs)
+        return wrapper
+
+    for name, control in widget.controls.items():
+        control.validate = spy(name, control.validate)
+    for form in widget.forms.values():
+        spy_validate(form, calls)
+
+
+def test_valid_only_validates_dirty_controls():
+    widget = Report.as_widget()
+    calls = []
+    spy_validate(widget, calls)
+    assert not widget.valid
+    assert sorted(calls) == ['count', 'label', 'total']
+    assert widget.clean
+    assert not widget.valid
+    assert len(calls) == 3
+
+    dirtied = []
+    widget.dirtied.connect(lambda: dirtied.append(True))
+    widget.counts.label.widget.setText('x')
+    widget.counts.label.emit_changed()
+    widget.counts.total.widget.setValue(-1)
+    assert not widget.clean
+    assert dirtied == [True]
+    assert not widget.valid
+    assert sorted(calls[3:]) == ['label', 'total']
+    assert widget.invalid_fields() == ['counts.total']
+    assert widget.invalid_fields(flatten=True) == ['total']
+    assert len(calls) == 5
+
+
+def test_get_value_reads_the_cache():
+    widget = Report.as_widget()
+    reads = []
+    control = widget.controls['count']
+    get_value = control.get_value
+    control.get_value = lambda: reads.append(True) or get_value()
+    assert widget.get_value() == {
+        'count': 0, 'counts': {'total': 0, 'label': ''}
+    }
+    assert reads == []
+
+    control.widget.setValue(3)
+    count = len(reads)
+    assert widget.get_value()['count'] == 3
+    assert widget.get_value(flatten=True)['count'] == 3
+    assert len(reads) == count
+
+
+def test_get_changes_since_token():
+    widget = Report.as_widget()
+    assert widget.get_changes() == {}
+    token = widget.change_token()
+    widget.counts.total.widget.setValue(4)
+    assert widget.get_changes(since=token) == {'counts': {'total': 4}}
+    assert widget.get_changes(since=token, flatten=True) == {'total': 4}
+
+    token = widget.change_token()
+    widget.counts.total.widget.setValue(4)
+    assert widget.get_changes(since=token) == {}
+
+
+def test_refresh_reads_controls_set_directly():
+    widget = Report.as_widget()
+    control = widget.controls['count']
+    control.widget.blockSignals(True)
+    control.widget.setValue(6)
+    control.widget.blockSignals(False)
+    assert widget.get_value()['count'] == 0
+    widget.refresh()
+    assert widget.get_value()['count'] == 6
+
+
+def test_set_value_emits_one_change():
+    widget = Report.as_widget()
+    emitted = []
+    changed = []
+    widget.values_changed.connect(emitted.append)
+    widget.controls['count'].changed.connect(lambda: changed.append(True))
+    widget.set_value(count=2, counts={'total': 3, 'label': 'a'})
+    assert emitted == [{'count': 2, 'counts': {'total': 3, 'label': 'a'}}]
+    assert changed == []
+    assert widget.get_value()['counts']['total'] == 3
+
+    widget.set_value(count=2)
+    assert len(emitted) == 1
+    try:
+        widget.set_value(missing=1)
+    except FieldNotFound:
+        pass
+    else:
+        assert False, 'Expected FieldNotFound'
+    widget.set_value(strict=False, missing=1)
+
+
+def test_transaction_flushes_once():
+    widget = Report.as_widget()
+    emitted = []
+    widget.values_changed.connect(emitted.append)
+    scheduled = []
+    control = widget.controls['count']
+    control.schedule_validate = lambda: scheduled.append(True)
+
+    with widget.transaction():
+        widget.set_value(count=1)
+        with widget.transaction():
+            widget.set_value(count=-2)
+        assert emitted == [] and scheduled == []
+        assert widget.get_value()['count'] == 0
+    assert emitted == [{'count': -2}]
+    assert scheduled == [True]
+    assert widget.invalid_fields() == ['count', 'counts.label']
+
+
+def test_reset_restores_defaults_without_errors():
+    widget = Report.as_widget()
+    widget.set_value(count=-3, counts={'total': 5})
+    assert not widget.valid
+    widget.reset()
+    assert widget.get_value() == {
+        'count': 0, 'counts': {'total': 0, 'label': ''}
+    }
+    assert widget.controls['count'].valid
+
+
+def grid_cells(layout):
+    '''Returns the (row, column) the grid holds each widget of layout at.'''
+
+    cells = []
+    for widget in layout.widgets:
+        row, column, _, _ = layout.getItemPosition(layout.indexOf(widget))
+        cells.append((row, column))
+    return cells
+
+
+def test_control_layout_places_in_reading_order():
+    parent = QtWidgets.QWidget()
+    layout = ControlLayout(columns=2)
+    parent.setLayout(layout)
+    widgets = [QtWidgets.QLabel(str(i)) for i in range(5)]
+    for widget in widgets:
+        layout.addWidget(widget)
+    assert layout.count == 5
+    assert layout.cell(widgets[3]) == (1, 1)
+    assert grid_cells(layout) == [(0, 0), (0, 1), (1, 0), (1, 1), (2, 0)]
+
+    assert layout.takeWidget(widgets[1]) is widgets[1]
+    assert layout.takeWidget(widgets[1]) is None
+    assert layout.position(widgets[1]) == -1
+    assert layout.widgets == [widgets[0]] + widgets[2:]
+    assert grid_cells(layout) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+
+    layout.insertWidget(0, widgets[1])
+    assert layout.position(widgets[1]) == 0
+    assert layout.position(widgets[4]) == 4
+    assert grid_cells(layout)[-1] == (2, 0)
+
+    layout.moveWidget(widgets[1], 10)
+    assert layout.widgets[-1] is widgets[1]
+    assert layout.cell(widgets[1]) == (2, 0)
+    assert layout.cell(widgets[0]) == (0, 0)
+
+    layout.columns = 3
+    assert grid_cells(layout) == [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1)]
+    assert parent.updatesEnabled()
+
+
+class Shot(Form):
+    meta = FormMetaData(title='Shot')
+    path = FileField('Path')
+    name = StringField('Name', validators=(required,))
+    kind = StringOptionField('Kind', options=['plate', 'render'])
+    done = BoolField('Done')
+    notes = TextField('Notes')
+
+
+def test_browse_updates_the_form():
+    widget = Shot.as_widget()
+    control = widget.controls['path']
+    changed = []
+    control.changed.connect(lambda: changed.append(True))
+    control.browse_method = lambda *args, **kwargs: ('/tmp/picked.txt', '')
+    control.browse()
+    assert changed == [True]
+    assert widget.get_value()['path'] == '/tmp/picked.txt'
+
+    control.browse_method = lambda *args, **kwargs: ('', '')
+    control.browse()
+    assert widget.get_value()['path'] == '/tmp/picked.txt'
+
+
+def test_controls_set_directly_update_the_form():
+    widget = Shot.as_widget()
+    assert not widget.valid
+    controls = widget.controls
+    controls['name'].set_value('sh010')
+    controls['kind'].set_value('render')
+    controls['done'].set_value(True)
+    controls['notes'].set_value('final')
+    assert widget.get_value() == {
+        'path': '', 'name': 'sh010', 'kind': 'render', 'done': True,
+        'notes': 'final',
+    }
+    assert widget.valid
+
+    emitted = []
+    widget.values_changed.connect(emitted.append)
+    with widget.transaction():
+        controls['name'].set_value('sh020')
+        assert widget.get_value()['name'] == 'sh010'
+    assert emitted == [{'name': 'sh020'}]
+
+
+class Contact(Form):
+    meta = FormMetaData(title='Contact')
+    phone = StringField('Phone', validators=(required,))
+
+
+class Client(Form):
+    meta = FormMetaData(title='Client')
+    name = StringField('Name', validators=(required,))
+    contact = Contact()
+
+
+class Account(Form):
+    meta = FormMetaData(
+        title='Account', subforms_as_groups=True, lazy_groups=True
+    )
+    client = Client()
+
+
+def test_expanding_a_lazy_group_shows_no_errors():
+    widget = Account.as_widget()
+    group = widget.forms['client']
+    group.set_value(contact={'phone': '555'})
+    group.title.setChecked(True)
+    process_events(timeout=0.05)
+    built = group.widget
+    assert built.controls['name'].errlabel.text() == ''
+    assert built.controls['name'].valid
+    assert built.get_value() == {'name': '', 'contact': {'phone': '555'}}
+    assert not widget.valid
+    assert widget.invalid_fields() == ['client.name']
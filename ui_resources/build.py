@@ -3,9 +3,10 @@ import os
 
 resource_root = os.path.dirname(__file__)
 rcc_cmd = [
-    'pyside-rcc',
+    'rcc',
+    '-binary',
     '-o',
-    '../psforms/resource.py',
+    '../psforms/resource.rcc',
     'resource.qrc',
 ]
 subprocess.call(rcc_cmd, cwd=resource_root)